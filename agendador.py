@@ -0,0 +1,333 @@
+"""Agendador de relatórios em processo contínuo (substitui as execuções do routine.bat).
+
+O interpretador, os imports (pandas, openpyxl, fdb) e o pool de conexões ficam
+carregados entre as execuções; as tarefas são definidas em um arquivo TOML com
+horários no formato do cron e rodam em paralelo:
+
+    [geral]
+    max_paralelo = 4
+    historico = "agendador_historico.jsonl"
+
+    [[tarefas]]
+    nome = "contratos"
+    cron = "0 6 * * 1-5"          # minuto hora dia mês dia_da_semana
+    tipo = "exportar_contratos"
+    timeout_segundos = 900
+    [tarefas.argumentos]
+    caminho_saida = "C:/relatorios/contratos.xlsx"
+
+    python agendador.py --config agendador.toml
+"""
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+import tomllib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+import main as exportacao
+from atualizar_resumos import RESUMOS_DIRETORIO, atualizar
+from banco import credenciais_env, fechar_pools, obter_pool
+from relatorios import RELATORIOS_CATALOGO, carregar_catalogo, executar_pool
+from resumos import ArmazenamentoResumos
+
+# Carregar variáveis de ambiente do arquivo .env
+load_dotenv()
+
+AGENDADOR_CONFIG = os.getenv("AGENDADOR_CONFIG", "agendador.toml")
+
+# Tarefas com timeout rodam em um processo próprio, que pode ser encerrado à força.
+# "spawn" em todos os sistemas: um fork herdaria as conexões abertas do pool do agendador.
+CONTEXTO_PROCESSOS = multiprocessing.get_context("spawn")
+
+# Limites de cada campo do cron: minuto, hora, dia do mês, mês, dia da semana (0 = domingo)
+LIMITES_CRON = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 6)]
+
+
+class ExpressaoCron:
+    """Expressão cron de 5 campos: `*`, valores, listas (1,15), faixas (1-5) e passos (*/10, 8-18/2)."""
+
+    def __init__(self, texto):
+        self.texto = texto
+        campos = texto.split()
+        if len(campos) != 5:
+            raise ValueError(f"Expressão cron inválida '{texto}': são esperados 5 campos.")
+        self.minutos, self.horas, self.dias, self.meses, self.dias_semana = (
+            self._interpretar(campo, minimo, maximo) for campo, (minimo, maximo) in zip(campos, LIMITES_CRON)
+        )
+        self._dia_livre = campos[2] == "*"
+        self._dia_semana_livre = campos[4] == "*"
+
+    def _interpretar(self, campo, minimo, maximo):
+        valores = set()
+        for parte in campo.split(","):
+            faixa, _, passo = parte.partition("/")
+            if faixa == "*":
+                inicio, fim = minimo, maximo
+            elif "-" in faixa:
+                inicio, fim = (int(v) for v in faixa.split("-", 1))
+            else:
+                inicio = fim = int(faixa)
+            if maximo == 6:
+                # Domingo também pode ser escrito como 7
+                inicio, fim = min(inicio, 7), min(fim, 7)
+            if not minimo <= inicio <= fim <= (7 if maximo == 6 else maximo):
+                raise ValueError(f"Valor fora do intervalo em '{campo}' na expressão '{self.texto}'.")
+            valores.update(v % 7 if maximo == 6 else v for v in range(inicio, fim + 1, int(passo or 1)))
+        return valores
+
+    def _dia_corresponde(self, data):
+        dia_semana = (data.weekday() + 1) % 7
+        if self._dia_livre or self._dia_semana_livre:
+            return data.day in self.dias and dia_semana in self.dias_semana
+        # Como no cron: com os dois campos restritos, basta um deles corresponder
+        return data.day in self.dias or dia_semana in self.dias_semana
+
+    def proxima(self, apos):
+        """Próximo horário (minuto cheio) estritamente depois de `apos`."""
+        momento = apos.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limite = momento + timedelta(days=366 * 5)
+        while momento < limite:
+            if momento.month not in self.meses or not self._dia_corresponde(momento):
+                momento = (momento + timedelta(days=1)).replace(hour=0, minute=0)
+            elif momento.hour not in self.horas:
+                momento = (momento + timedelta(hours=1)).replace(minute=0)
+            elif momento.minute not in self.minutos:
+                momento += timedelta(minutes=1)
+            else:
+                return momento
+        raise ValueError(f"A expressão cron '{self.texto}' nunca ocorre.")
+
+
+def tarefa_exportar_contratos(pool, caminho_saida=None, caminho_watermark=None):
+    """Exportação da tabela CONTRATOS do main.py, usando o pool já aberto."""
+    linhas, arquivo, incremental = exportacao.exportar_pool(pool, caminho_saida or exportacao.OUTPUT_PATH, caminho_watermark)
+    return {"linhas": linhas, "arquivo": arquivo, "incremental": incremental}
+
+
+def tarefa_atualizar_resumos(pool, diretorio=RESUMOS_DIRETORIO, completo=False):
+    """Atualização dos resumos materializados usados pelo dashboard."""
+    return atualizar(pool, ArmazenamentoResumos(diretorio), completo)
+
+
+def tarefa_executar_catalogo(pool, catalogo=RELATORIOS_CATALOGO, apenas=None):
+    """Catálogo de relatórios (relatorios.py), relido a cada execução para pegar as alterações."""
+    geral, relatorios = carregar_catalogo(catalogo)
+    if apenas:
+        relatorios = [relatorio for relatorio in relatorios if relatorio.nome in apenas]
+    resultados = executar_pool(pool, relatorios, bool(geral.get("tipado", False)))
+    return {"relatorios": len(resultados), "linhas": sum(r["linhas"] for r in resultados)}
+
+
+TAREFAS_EMBUTIDAS = {
+    "exportar_contratos": tarefa_exportar_contratos,
+    "atualizar_resumos": tarefa_atualizar_resumos,
+    "executar_catalogo": tarefa_executar_catalogo,
+}
+
+
+def resolver_funcao(definicao):
+    """Função da tarefa: `tipo` embutido ou `funcao = "modulo:nome"` (recebe o pool como primeiro argumento)."""
+    if "funcao" in definicao:
+        modulo, _, nome = definicao["funcao"].partition(":")
+        return getattr(importlib.import_module(modulo), nome)
+    tipo = definicao.get("tipo")
+    if tipo not in TAREFAS_EMBUTIDAS:
+        raise ValueError(f"Tarefa '{definicao.get('nome')}': tipo '{tipo}' desconhecido. Use {', '.join(TAREFAS_EMBUTIDAS)} ou 'funcao'.")
+    return TAREFAS_EMBUTIDAS[tipo]
+
+
+def obter_pool_tarefa(dsn=None, tamanho_maximo=4):
+    """Pool do banco da tarefa; sem `dsn`, o DATABASE_PATH do .env."""
+    credenciais = credenciais_env()
+    if dsn:
+        credenciais["dsn"] = dsn
+    return obter_pool(credenciais, tamanho_maximo=tamanho_maximo)
+
+
+def _rodar_em_processo(envio, funcao, dsn, argumentos, tamanho_pool):
+    """Corpo do processo de uma tarefa com timeout: conexões próprias e resultado pelo pipe."""
+    try:
+        resultado = funcao(obter_pool_tarefa(dsn, tamanho_pool), **argumentos)
+        envio.send(("sucesso", resultado, None))
+    except Exception as e:
+        envio.send(("erro", None, f"{type(e).__name__}: {e}"))
+    finally:
+        fechar_pools()
+        envio.close()
+
+
+class Tarefa:
+    def __init__(self, definicao):
+        self.nome = definicao["nome"]
+        self.cron = ExpressaoCron(definicao["cron"])
+        self.funcao = resolver_funcao(definicao)
+        self.argumentos = dict(definicao.get("argumentos", {}))
+        self.timeout_segundos = definicao.get("timeout_segundos")
+        # Banco próprio da tarefa (ex.: uma filial); sem `dsn`, usa o DATABASE_PATH do .env
+        self.dsn = definicao.get("dsn")
+        self.proxima_execucao = self.cron.proxima(datetime.now())
+        # Futuro da execução em andamento
+        self.em_andamento = None
+
+
+class Historico:
+    """Histórico das execuções em JSON Lines (uma linha por execução)."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+
+    def registrar(self, tarefa, status, inicio=None, segundos=None, erro=None, resultado=None):
+        registro = {
+            "tarefa": tarefa,
+            "status": status,
+            "inicio": (inicio or datetime.now()).isoformat(timespec="seconds"),
+            "segundos": round(segundos, 3) if segundos is not None else None,
+            "erro": erro,
+            "resultado": resultado,
+        }
+        with self._lock:
+            with open(self.caminho, "a", encoding="utf-8") as arquivo:
+                arquivo.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+        print(f"[{registro['inicio']}] {tarefa}: {status}" + (f" ({segundos:.1f}s)" if segundos is not None else "") + (f" - {erro}" if erro else ""))
+
+
+class Agendador:
+    """Dispara as tarefas nos horários do cron, no máximo `max_paralelo` ao mesmo tempo.
+
+    Uma tarefa que ainda está rodando no horário seguinte é pulada (sem execuções
+    sobrepostas). Threads não podem ser interrompidas à força, então uma tarefa
+    com `timeout_segundos` roda em um processo próprio: ao passar do tempo o
+    processo é encerrado (e com ele as conexões com o banco) e a execução é
+    registrada como 'tempo_esgotado'. Sem timeout, a tarefa roda em uma thread
+    e aproveita o pool e os imports já carregados.
+    """
+
+    def __init__(self, tarefas, historico, max_paralelo=4):
+        self.tarefas = tarefas
+        self.historico = historico
+        self.max_paralelo = max_paralelo
+        self._executor = ThreadPoolExecutor(max_workers=max_paralelo, thread_name_prefix="agendador")
+        self._parar = threading.Event()
+
+    def _executar(self, tarefa, inicio):
+        inicio_relogio = time.perf_counter()
+        try:
+            if tarefa.timeout_segundos:
+                status, resultado, erro = self._executar_em_processo(tarefa)
+            else:
+                resultado = tarefa.funcao(obter_pool_tarefa(tarefa.dsn, self.max_paralelo), **tarefa.argumentos)
+                status, erro = "sucesso", None
+        except Exception as e:
+            resultado, status, erro = None, "erro", f"{type(e).__name__}: {e}"
+        segundos = time.perf_counter() - inicio_relogio
+        self.historico.registrar(tarefa.nome, status, inicio, segundos, erro, resultado)
+
+    def _executar_em_processo(self, tarefa):
+        """Roda a tarefa em um processo novo e o encerra se passar de `timeout_segundos`."""
+        recebimento, envio = CONTEXTO_PROCESSOS.Pipe(duplex=False)
+        processo = CONTEXTO_PROCESSOS.Process(
+            target=_rodar_em_processo,
+            args=(envio, tarefa.funcao, tarefa.dsn, tarefa.argumentos, self.max_paralelo),
+            name=f"tarefa-{tarefa.nome}",
+        )
+        processo.start()
+        # Sem a ponta de envio aqui, o recv() percebe quando o processo morre sem responder
+        envio.close()
+        try:
+            if not recebimento.poll(tarefa.timeout_segundos):
+                processo.terminate()
+                return "tempo_esgotado", None, f"passou de {tarefa.timeout_segundos}s; o processo foi encerrado"
+            try:
+                return recebimento.recv()
+            except EOFError:
+                processo.join()
+                return "erro", None, f"o processo da tarefa terminou sem resultado (código {processo.exitcode})"
+        finally:
+            processo.join(5)
+            if processo.is_alive():
+                processo.kill()
+                processo.join()
+            recebimento.close()
+
+    def disparar(self, tarefa, agora=None):
+        agora = agora or datetime.now()
+        if tarefa.em_andamento is not None and not tarefa.em_andamento.done():
+            self.historico.registrar(tarefa.nome, "pulada", agora, erro="execução anterior ainda em andamento")
+            return
+        tarefa.em_andamento = self._executor.submit(self._executar, tarefa, agora)
+
+    def executar(self):
+        """Laço principal: acorda a cada poucos segundos e dispara o que venceu."""
+        for tarefa in self.tarefas:
+            print(f"Tarefa '{tarefa.nome}' ({tarefa.cron.texto}): próxima execução em {tarefa.proxima_execucao:%d/%m/%Y %H:%M}")
+        while not self._parar.is_set():
+            agora = datetime.now()
+            for tarefa in self.tarefas:
+                if tarefa.proxima_execucao <= agora:
+                    self.disparar(tarefa, agora)
+                    tarefa.proxima_execucao = tarefa.cron.proxima(agora)
+            self._parar.wait(min(5.0, max(0.5, (min(t.proxima_execucao for t in self.tarefas) - datetime.now()).total_seconds())))
+
+    def parar(self, aguardar=True):
+        self._parar.set()
+        self._executor.shutdown(wait=aguardar)
+
+
+def carregar_configuracao(caminho):
+    with open(caminho, "rb") as arquivo:
+        configuracao = tomllib.load(arquivo)
+    geral = configuracao.get("geral", {})
+    tarefas = [Tarefa(definicao) for definicao in configuracao.get("tarefas", [])]
+    nomes = [tarefa.nome for tarefa in tarefas]
+    if len(set(nomes)) != len(nomes):
+        raise ValueError("Os nomes das tarefas devem ser únicos.")
+    if not tarefas:
+        raise ValueError(f"Nenhuma tarefa definida em '{caminho}'.")
+    return geral, tarefas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agendador contínuo dos relatórios.")
+    parser.add_argument("--config", default=AGENDADOR_CONFIG, help="Arquivo TOML com as tarefas")
+    parser.add_argument("--executar", metavar="TAREFA", help="Executa uma tarefa imediatamente e termina")
+    args = parser.parse_args()
+
+    agendador = None
+    try:
+        geral, tarefas = carregar_configuracao(args.config)
+        historico = Historico(geral.get("historico", "agendador_historico.jsonl"))
+        agendador = Agendador(tarefas, historico, int(geral.get("max_paralelo", 4)))
+
+        if args.executar:
+            selecionadas = [tarefa for tarefa in tarefas if tarefa.nome == args.executar]
+            if not selecionadas:
+                print(f"Tarefa '{args.executar}' não encontrada em '{args.config}'.")
+                return
+            agendador.disparar(selecionadas[0])
+            agendador.parar()
+            return
+
+        agendador.executar()
+
+    except KeyboardInterrupt:
+        print("Encerrando o agendador (aguardando as tarefas em andamento)...")
+
+    except (OSError, ValueError, KeyError, tomllib.TOMLDecodeError) as e:
+        print(f"Erro na configuração do agendador: {e}")
+
+    finally:
+        if agendador is not None:
+            agendador.parar()
+        fechar_pools()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+import math
+import pandas as pd
+
+from filtros import SEM_FILTRO
+
+# Junção base usada por todas as consultas do dashboard
+JUNCAO_PAGAMENTOS = """
+    FROM PAGAMENTOS pag
+    JOIN CONTRATOS con ON pag.CONTRATO_ID = con.ID
+    JOIN CLIENTES cli ON con.CLIENTE_ID = cli.ID
+    WHERE pag.DATA_PAGAMENTO IS NOT NULL AND pag.VALOR_PAGO IS NOT NULL
+"""
+
+# Consulta original: traz todos os pagamentos para o processamento no pandas
+# ({filtro} recebe os predicados " AND ..." do filtros.py)
+CONSULTA_PAGAMENTOS = """
+    SELECT
+        cli.ID AS cliente_id,
+        cli.NOME AS cliente_nome,
+        pag.ID AS pagamento_id,
+        pag.DATA_PAGAMENTO AS data_pagamento,
+        pag.VALOR_PAGO AS valor_pago
+    FROM PAGAMENTOS pag
+    JOIN CONTRATOS con ON pag.CONTRATO_ID = con.ID
+    JOIN CLIENTES cli ON con.CLIENTE_ID = cli.ID
+    WHERE 1 = 1{filtro}
+    ORDER BY pag.DATA_PAGAMENTO DESC
+"""
+
+# Consultas agregadas no servidor: só resultados pequenos trafegam pela rede
+CONSULTA_METRICAS = "SELECT SUM(pag.VALOR_PAGO), COUNT(*), COUNT(DISTINCT cli.ID)" + JUNCAO_PAGAMENTOS + "{filtro}"
+
+CONSULTA_MENSAL = (
+    "SELECT EXTRACT(YEAR FROM pag.DATA_PAGAMENTO), EXTRACT(MONTH FROM pag.DATA_PAGAMENTO), SUM(pag.VALOR_PAGO)"
+    + JUNCAO_PAGAMENTOS
+    + "{filtro} GROUP BY 1, 2 ORDER BY 1, 2"
+)
+
+CONSULTA_MENSAL_CLIENTES = (
+    "SELECT cli.ID, cli.NOME, EXTRACT(YEAR FROM pag.DATA_PAGAMENTO), EXTRACT(MONTH FROM pag.DATA_PAGAMENTO), SUM(pag.VALOR_PAGO)"
+    + JUNCAO_PAGAMENTOS
+    + "{filtro} GROUP BY 1, 2, 3, 4 ORDER BY 1, 3, 4"
+)
+
+CONSULTA_TOP_CLIENTES = (
+    "SELECT FIRST {limite} cli.NOME, SUM(pag.VALOR_PAGO)"
+    + JUNCAO_PAGAMENTOS
+    + "{filtro} GROUP BY cli.NOME ORDER BY 2 DESC, 1"
+)
+
+# Os nulos saem no WHERE, antes do FIRST: filtrados depois, a tabela teria menos de N linhas
+CONSULTA_ULTIMOS_PAGAMENTOS = """
+    SELECT FIRST {limite}
+        cli.ID AS cliente_id,
+        cli.NOME AS cliente_nome,
+        pag.ID AS pagamento_id,
+        pag.DATA_PAGAMENTO AS data_pagamento,
+        pag.VALOR_PAGO AS valor_pago
+    FROM PAGAMENTOS pag
+    JOIN CONTRATOS con ON pag.CONTRATO_ID = con.ID
+    JOIN CLIENTES cli ON con.CLIENTE_ID = cli.ID
+    WHERE pag.DATA_PAGAMENTO IS NOT NULL AND pag.VALOR_PAGO IS NOT NULL{filtro}
+    ORDER BY pag.DATA_PAGAMENTO DESC
+"""
+
+# Dados brutos: as primeiras linhas da CONSULTA_PAGAMENTOS como estão no banco, inclusive incompletas
+CONSULTA_PAGAMENTOS_BRUTOS = """
+    SELECT FIRST {limite}
+        cli.ID AS cliente_id,
+        cli.NOME AS cliente_nome,
+        pag.ID AS pagamento_id,
+        pag.DATA_PAGAMENTO AS data_pagamento,
+        pag.VALOR_PAGO AS valor_pago
+    FROM PAGAMENTOS pag
+    JOIN CONTRATOS con ON pag.CONTRATO_ID = con.ID
+    JOIN CLIENTES cli ON con.CLIENTE_ID = cli.ID
+    WHERE 1 = 1{filtro}
+    ORDER BY pag.DATA_PAGAMENTO DESC
+"""
+
+# Resumo por cliente e mês (base dos resumos materializados); {filtro} restringe o período
+CONSULTA_RESUMO_CLIENTES = (
+    "SELECT cli.ID, cli.NOME, EXTRACT(YEAR FROM pag.DATA_PAGAMENTO), EXTRACT(MONTH FROM pag.DATA_PAGAMENTO),"
+    " SUM(pag.VALOR_PAGO), COUNT(*)"
+    + JUNCAO_PAGAMENTOS
+    + "{filtro} GROUP BY 1, 2, 3, 4"
+)
+FILTRO_PERIODO = " AND pag.DATA_PAGAMENTO >= ? AND pag.DATA_PAGAMENTO < ?"
+
+COLUNAS_PAGAMENTOS = ['cliente_id', 'cliente_nome', 'pagamento_id', 'data_pagamento', 'valor_pago']
+
+
+def agregados_vazios():
+    """Estrutura padrão usada pelo dashboard quando não há dados."""
+    return {
+        'total_revenue': 0,
+        'num_unique_clients': 0,
+        'avg_payment_value': 0,
+        'df_mensal_sum': pd.DataFrame(),
+        'df_top_clients': pd.DataFrame(),
+        'df_mensal_clientes': pd.DataFrame(),
+        'df_latest_payments': pd.DataFrame(),
+        'df_brutos': pd.DataFrame(),
+    }
+
+
+def _normalizar_pagamentos(df):
+    """Padroniza os nomes das colunas da junção de pagamentos (o Firebird devolve em maiúsculas)."""
+    df = df.rename(columns=str.lower)
+    if not df.empty:
+        df['data_pagamento'] = pd.to_datetime(df['data_pagamento'], errors='coerce')
+        df['valor_pago'] = pd.to_numeric(df['valor_pago'], errors='coerce').astype(float)
+    return df
+
+
+def _formatar_mensal(meses, valores):
+    df_mensal_sum = pd.DataFrame({'Mês Referência': pd.to_datetime(meses), 'Total Pago': pd.Series(valores, dtype=float).values})
+    return df_mensal_sum.set_index('Mês Referência')
+
+
+def _formatar_top_clientes(nomes, valores):
+    df_top_clients = pd.DataFrame({'Cliente': list(nomes), 'Total Pago': pd.Series(valores, dtype=float).values})
+    return df_top_clients.set_index('Cliente')
+
+
+def calcular_agregados_pandas(df, limite_top=10, limite_ultimos=10, limite_brutos=100):
+    """Calcula as métricas do dashboard em memória a partir de todos os pagamentos (caminho original)."""
+    agregados = agregados_vazios()
+    if df.empty:
+        return agregados
+
+    agregados['df_brutos'] = df.head(limite_brutos)
+    df_processado = _normalizar_pagamentos(df).dropna(subset=['data_pagamento', 'valor_pago'])
+    if df_processado.empty:
+        return agregados
+
+    # Calcula métricas principais
+    agregados['total_revenue'] = float(df_processado['valor_pago'].sum())
+    agregados['num_unique_clients'] = int(df_processado['cliente_id'].nunique())
+    agregados['avg_payment_value'] = float(df_processado['valor_pago'].mean())
+
+    # Top clientes por total pago (empate desfeito pelo nome, como no SQL)
+    # observed=True: com o nome categórico (colunar.py), só as combinações existentes viram grupos
+    top = df_processado.groupby('cliente_nome', observed=True)['valor_pago'].sum().reset_index()
+    top = top.sort_values(['valor_pago', 'cliente_nome'], ascending=[False, True]).head(limite_top)
+    agregados['df_top_clients'] = _formatar_top_clientes(top['cliente_nome'], top['valor_pago'])
+
+    # Últimos pagamentos
+    agregados['df_latest_payments'] = df_processado.sort_values('data_pagamento', ascending=False, kind='stable').head(limite_ultimos)
+
+    # Total pago por mês
+    df_processado = df_processado.assign(mes_pagamento=df_processado['data_pagamento'].dt.to_period('M').dt.to_timestamp())
+    mensal = df_processado.groupby('mes_pagamento')['valor_pago'].sum().sort_index()
+    agregados['df_mensal_sum'] = _formatar_mensal(mensal.index, mensal.values)
+
+    # Total por cliente e mês (base do gráfico de crescimento acumulado)
+    agregados['df_mensal_clientes'] = (
+        df_processado.groupby(['cliente_id', 'cliente_nome', 'mes_pagamento'], observed=True)['valor_pago'].sum().reset_index()
+    )
+    return agregados
+
+
+def calcular_agregados_sql(cur, limite_top=10, limite_ultimos=10, limite_brutos=100, filtro=SEM_FILTRO):
+    """Calcula as mesmas métricas com agregações no Firebird (SUM, COUNT DISTINCT, GROUP BY, FIRST N)."""
+    agregados = agregados_vazios()
+
+    cur.execute(CONSULTA_METRICAS.format(filtro=filtro.sql), filtro.parametros)
+    soma, quantidade, clientes = cur.fetchone()
+    if not quantidade:
+        return agregados
+
+    agregados['total_revenue'] = float(soma)
+    agregados['num_unique_clients'] = int(clientes)
+    # Média calculada aqui: o AVG do Firebird em NUMERIC trunca na escala da coluna
+    agregados['avg_payment_value'] = float(soma) / int(quantidade)
+
+    cur.execute(CONSULTA_MENSAL.format(filtro=filtro.sql), filtro.parametros)
+    linhas = cur.fetchall()
+    meses = [pd.Timestamp(int(ano), int(mes), 1) for ano, mes, _ in linhas]
+    agregados['df_mensal_sum'] = _formatar_mensal(meses, [float(v) for _, _, v in linhas])
+
+    cur.execute(CONSULTA_TOP_CLIENTES.format(limite=int(limite_top), filtro=filtro.sql), filtro.parametros)
+    linhas = cur.fetchall()
+    agregados['df_top_clients'] = _formatar_top_clientes([n for n, _ in linhas], [float(v) for _, v in linhas])
+
+    cur.execute(CONSULTA_MENSAL_CLIENTES.format(filtro=filtro.sql), filtro.parametros)
+    linhas = cur.fetchall()
+    agregados['df_mensal_clientes'] = pd.DataFrame({
+        'cliente_id': [linha[0] for linha in linhas],
+        'cliente_nome': [linha[1] for linha in linhas],
+        'mes_pagamento': pd.to_datetime([pd.Timestamp(int(linha[2]), int(linha[3]), 1) for linha in linhas]),
+        'valor_pago': [float(linha[4]) for linha in linhas],
+    })
+
+    _carregar_ultimos_pagamentos(cur, agregados, limite_ultimos, limite_brutos, filtro)
+    return agregados
+
+
+def _carregar_ultimos_pagamentos(cur, agregados, limite_ultimos, limite_brutos, filtro=SEM_FILTRO):
+    # Apenas as linhas exibidas nas tabelas são trazidas do banco
+    cur.execute(CONSULTA_ULTIMOS_PAGAMENTOS.format(limite=int(limite_ultimos), filtro=filtro.sql), filtro.parametros)
+    df_ultimos = pd.DataFrame(cur.fetchall(), columns=[desc[0] for desc in cur.description])
+    agregados['df_latest_payments'] = _normalizar_pagamentos(df_ultimos)
+
+    cur.execute(CONSULTA_PAGAMENTOS_BRUTOS.format(limite=int(limite_brutos), filtro=filtro.sql), filtro.parametros)
+    agregados['df_brutos'] = pd.DataFrame(cur.fetchall(), columns=[desc[0] for desc in cur.description])
+
+
+def calcular_agregados_resumos(resumos, cur, limite_top=10, limite_ultimos=10, limite_brutos=100):
+    """Calcula as métricas a partir dos resumos materializados (resumos.py).
+
+    Só os últimos pagamentos continuam vindo do banco (consulta FIRST N), então
+    o tempo de carga não cresce com o histórico de pagamentos.
+    """
+    agregados = agregados_vazios()
+    clientes = resumos['clientes']
+    quantidade = int(clientes['quantidade'].sum()) if not clientes.empty else 0
+    if not quantidade:
+        return agregados
+
+    soma = float(clientes['valor_pago'].sum())
+    agregados['total_revenue'] = soma
+    agregados['num_unique_clients'] = int(clientes['cliente_id'].nunique())
+    agregados['avg_payment_value'] = soma / quantidade
+
+    mensal = resumos['mensal']
+    agregados['df_mensal_sum'] = _formatar_mensal(mensal['mes_pagamento'], mensal['valor_pago'])
+
+    # Agrupado pelo nome, como na CONSULTA_TOP_CLIENTES
+    top = clientes.groupby('cliente_nome', observed=True)['valor_pago'].sum().reset_index()
+    top = top.sort_values(['valor_pago', 'cliente_nome'], ascending=[False, True]).head(limite_top)
+    agregados['df_top_clients'] = _formatar_top_clientes(top['cliente_nome'], top['valor_pago'])
+
+    agregados['df_mensal_clientes'] = resumos['mensal_clientes'][['cliente_id', 'cliente_nome', 'mes_pagamento', 'valor_pago']]
+
+    _carregar_ultimos_pagamentos(cur, agregados, limite_ultimos, limite_brutos)
+    return agregados
+
+
+def diferencas_agregados(a, b, tolerancia=1e-6):
+    """Compara dois resultados (ex.: SQL x pandas) e devolve a lista das métricas divergentes."""
+    diferentes = []
+    for chave in ('total_revenue', 'num_unique_clients', 'avg_payment_value'):
+        if not math.isclose(float(a[chave]), float(b[chave]), rel_tol=tolerancia, abs_tol=tolerancia):
+            diferentes.append(chave)
+    for chave in ('df_mensal_sum', 'df_top_clients'):
+        try:
+            pd.testing.assert_frame_equal(a[chave], b[chave], check_exact=False, rtol=tolerancia, check_index_type=False)
+        except AssertionError:
+            diferentes.append(chave)
+    return diferentes
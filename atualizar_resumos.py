@@ -0,0 +1,96 @@
+import argparse
+import os
+import time
+
+import fdb
+from dotenv import load_dotenv
+
+from banco import com_retentativa, credenciais_env, fechar_pools, obter_pool
+from eventos import FonteEventosFirebird, OuvinteEventos, modo_resumos
+from resumos import ArmazenamentoResumos, atualizar_resumos
+
+# Carregar variáveis de ambiente do arquivo .env
+load_dotenv()
+
+# Diretório dos resumos materializados (o mesmo de `resumos_diretorio` no secrets.toml do dashboard)
+RESUMOS_DIRETORIO = os.getenv("RESUMOS_DIRETORIO", "resumos_pagamentos")
+# Intervalo entre atualizações, em segundos; 0 atualiza uma vez e termina
+RESUMOS_INTERVALO = int(os.getenv("RESUMOS_INTERVALO", "0"))
+
+
+def atualizar(pool, armazenamento, completo=False):
+    """Uma atualização dos resumos em transação snapshot, com retentativa."""
+    def executar():
+        with pool.leitura() as conexao:
+            return atualizar_resumos(conexao, armazenamento, completo)
+    return com_retentativa(executar)
+
+
+def atualizar_e_informar(pool, armazenamento, completo=False):
+    """Atualiza e mostra o resultado; retorna False se o banco ou a gravação falhar."""
+    inicio = time.perf_counter()
+    try:
+        resultado = atualizar(pool, armazenamento, completo)
+    except fdb.DatabaseError as e:
+        print("Erro ao conectar ou consultar o Banco de Dados!")
+        print(f"Detalhes: {e}")
+        return False
+    except (OSError, ValueError, TypeError, ImportError) as e:
+        print(f"Não foi possível gravar os resumos em '{armazenamento.diretorio}': {e}")
+        return False
+    segundos = time.perf_counter() - inicio
+    if resultado['modo'] == 'sem_alteracoes':
+        print(f"Resumos atualizados: nenhum pagamento novo ({segundos:.2f}s).")
+    else:
+        print(f"Resumos atualizados ({resultado['modo']}): {resultado['meses']} mês(es), "
+              f"até o pagamento {resultado['ultimo_pagamento_id']} ({segundos:.2f}s). 🚀")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Atualiza os resumos materializados de pagamentos usados pelo dashboard.")
+    parser.add_argument("--completo", action="store_true", help="Reconstrói os resumos do zero")
+    parser.add_argument("--diretorio", default=RESUMOS_DIRETORIO, help="Diretório dos resumos")
+    parser.add_argument("--intervalo", type=int, default=RESUMOS_INTERVALO, help="Repete a cada N segundos (0 = uma vez)")
+    parser.add_argument("--eventos", action="store_true",
+                        help="Depois da primeira atualização, atualiza só quando o banco avisar (gatilhos do eventos.py)")
+    args = parser.parse_args()
+
+    armazenamento = ArmazenamentoResumos(args.diretorio)
+    completo = args.completo
+    try:
+        pool = obter_pool(credenciais_env(), tamanho_maximo=1)
+        if args.eventos:
+            atualizar_e_informar(pool, armazenamento, completo)
+
+            def ao_alterar(eventos):
+                modo = modo_resumos(eventos)
+                if modo is not None:
+                    print(f"Eventos recebidos: {', '.join(f'{evento} ({contagem}x)' for evento, contagem in eventos.items())}")
+                    atualizar_e_informar(pool, armazenamento, completo=modo == "completo")
+
+            ouvinte = OuvinteEventos(lambda: FonteEventosFirebird(credenciais_env()), ao_alterar).iniciar()
+            print("Aguardando eventos do banco (Ctrl+C para sair)...")
+            while ouvinte.ativo():
+                time.sleep(1)
+            return
+
+        while True:
+            if atualizar_e_informar(pool, armazenamento, completo):
+                completo = False
+            if args.intervalo <= 0:
+                break
+            time.sleep(args.intervalo)
+
+    except KeyboardInterrupt:
+        pass
+
+    except Exception as e:
+        print(f"Erro inesperado: {e}")
+
+    finally:
+        fechar_pools()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import fdb
+from dotenv import load_dotenv
+
+# Códigos de erro do Firebird (gdscode) considerados transitórios: vale a pena tentar de novo
+ERROS_TRANSITORIOS = {
+    335544336,  # isc_deadlock
+    335544345,  # isc_lock_conflict
+    335544451,  # isc_update_conflict
+    335544721,  # isc_network_error
+    335544726,  # isc_net_read_err
+    335544727,  # isc_net_write_err
+    335544741,  # isc_lost_db_connection
+    335544856,  # isc_att_shutdown
+    335544878,  # isc_concurrent_transaction
+}
+
+# Transação somente leitura com snapshot: todas as consultas de um relatório
+# enxergam o mesmo estado do banco e não bloqueiam escritas
+TPB_SNAPSHOT_SOMENTE_LEITURA = fdb.TPB()
+TPB_SNAPSHOT_SOMENTE_LEITURA.access_mode = fdb.isc_tpb_read
+TPB_SNAPSHOT_SOMENTE_LEITURA.isolation_level = fdb.isc_tpb_concurrency
+
+
+def credenciais_env():
+    """Credenciais do arquivo .env (usado pelo main.py e pelo scripts-insert.py)."""
+    load_dotenv()
+    return {
+        "dsn": os.getenv("DATABASE_PATH"),
+        "user": os.getenv("USER"),
+        "password": os.getenv("PASSWORD"),
+    }
+
+
+def credenciais_streamlit(secrets):
+    """Credenciais da seção [connections.firebird] do .streamlit/secrets.toml."""
+    return {
+        "dsn": secrets.connections.firebird.dsn,
+        "user": secrets.connections.firebird.user,
+        "password": secrets.connections.firebird.password,
+    }
+
+
+def erro_transitorio(erro):
+    """Indica se um fdb.DatabaseError pode ser resolvido tentando novamente."""
+    if not isinstance(erro, fdb.DatabaseError):
+        return False
+    # fdb.DatabaseError.args = (mensagem, sqlcode, gdscode)
+    gdscode = erro.args[2] if len(erro.args) > 2 else None
+    return gdscode in ERROS_TRANSITORIOS
+
+
+def com_retentativa(funcao, tentativas=3, espera_inicial=0.5):
+    """Executa `funcao()` repetindo em erros transitórios, com espera exponencial."""
+    for tentativa in range(1, tentativas + 1):
+        try:
+            return funcao()
+        except fdb.DatabaseError as e:
+            if tentativa == tentativas or not erro_transitorio(e):
+                raise
+            espera = espera_inicial * 2 ** (tentativa - 1)
+            print(f"Erro transitório no banco ({e}); nova tentativa em {espera:.1f}s...") # Log para debug
+            time.sleep(espera)
+
+
+class Conexao:
+    """Conexão do pool com cache de comandos preparados (cursor.prep).
+
+    Tem a mesma interface de um cursor do fdb (execute, executemany, fetch*,
+    description), então pode ser passada para as funções que recebem `cur`.
+    """
+
+    def __init__(self, credenciais, max_preparados=32):
+        self.con = fdb.connect(**credenciais)
+        self.cur = self.con.cursor()
+        self.max_preparados = max_preparados
+        self._preparados = {}
+
+    def preparar(self, sql):
+        """Retorna o comando preparado para o SQL, reaproveitando o já existente."""
+        preparado = self._preparados.get(sql)
+        if preparado is None:
+            if len(self._preparados) >= self.max_preparados:
+                self._preparados.pop(next(iter(self._preparados)))
+            preparado = self.cur.prep(sql)
+            self._preparados[sql] = preparado
+        return preparado
+
+    def execute(self, sql, parametros=None):
+        """Executa o SQL usando o comando preparado em cache."""
+        self.cur.execute(self.preparar(sql), parametros or ())
+        return self
+
+    def executemany(self, sql, sequencia_parametros):
+        self.cur.executemany(self.preparar(sql), sequencia_parametros)
+        return self
+
+    def commit(self):
+        self.con.commit()
+
+    def rollback(self):
+        self.con.rollback()
+
+    def __getattr__(self, nome):
+        # fetchone, fetchall, fetchmany, description... vêm do cursor
+        return getattr(self.cur, nome)
+
+    def valida(self):
+        return not self.con.closed
+
+    def fechar(self):
+        self._preparados.clear()
+        try:
+            self.cur.close()
+        finally:
+            self.con.close()
+
+
+class PoolConexoes:
+    """Pool de conexões Firebird reaproveitadas dentro do processo.
+
+    A conexão é aberta uma vez e devolvida ao pool ao fim de cada uso, então o
+    custo de conexão é pago uma vez por processo e não a cada execução/clique.
+    """
+
+    def __init__(self, credenciais, tamanho_maximo=4, tentativas=3):
+        self.credenciais = dict(credenciais)
+        self.tamanho_maximo = tamanho_maximo
+        self.tentativas = tentativas
+        self._livres = queue.LifoQueue()
+        self._criadas = 0
+        self._lock = threading.Lock()
+
+    def _obter(self, timeout=30):
+        try:
+            conexao = self._livres.get_nowait()
+            if conexao.valida():
+                return conexao
+            self._descartar(conexao)
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            pode_criar = self._criadas < self.tamanho_maximo
+            if pode_criar:
+                self._criadas += 1
+        if pode_criar:
+            try:
+                return com_retentativa(lambda: Conexao(self.credenciais), self.tentativas)
+            except Exception:
+                with self._lock:
+                    self._criadas -= 1
+                raise
+        return self._livres.get(timeout=timeout)
+
+    def _descartar(self, conexao):
+        with self._lock:
+            self._criadas -= 1
+        try:
+            conexao.fechar()
+        except Exception:
+            pass
+
+    def _devolver(self, conexao, com_erro):
+        try:
+            if conexao.con.main_transaction.active:
+                conexao.con.rollback() if com_erro else conexao.con.commit()
+            self._livres.put(conexao)
+        except Exception:
+            self._descartar(conexao)
+
+    @contextmanager
+    def conexao(self):
+        """Empresta uma conexão do pool (commit ao final, rollback em caso de erro)."""
+        conexao = self._obter()
+        com_erro = False
+        try:
+            yield conexao
+        except Exception as e:
+            com_erro = True
+            if isinstance(e, fdb.DatabaseError) and erro_transitorio(e):
+                # Conexão pode ter caído: não volta para o pool
+                self._descartar(conexao)
+                conexao = None
+            raise
+        finally:
+            if conexao is not None:
+                self._devolver(conexao, com_erro)
+
+    @contextmanager
+    def leitura(self):
+        """Conexão dentro de uma transação snapshot somente leitura (para relatórios)."""
+        with self.conexao() as conexao:
+            if conexao.con.main_transaction.active:
+                conexao.con.commit()
+            conexao.con.begin(tpb=TPB_SNAPSHOT_SOMENTE_LEITURA)
+            yield conexao
+
+    def consultar(self, sql, parametros=None):
+        """Executa uma consulta de leitura com retentativa e retorna (colunas, linhas)."""
+        def executar():
+            with self.leitura() as conexao:
+                conexao.execute(sql, parametros)
+                linhas = conexao.fetchall()
+                return [desc[0] for desc in conexao.description], linhas
+        return com_retentativa(executar, self.tentativas)
+
+    def fechar(self):
+        while True:
+            try:
+                self._descartar(self._livres.get_nowait())
+            except queue.Empty:
+                break
+
+
+_pools = {}
+_lock_pools = threading.Lock()
+
+
+def obter_pool(credenciais, tamanho_maximo=4):
+    """Pool compartilhado do processo para as credenciais informadas."""
+    chave = (credenciais.get("dsn"), credenciais.get("user"))
+    with _lock_pools:
+        pool = _pools.get(chave)
+        if pool is None or pool.credenciais != credenciais:
+            if pool is not None:
+                pool.fechar()
+            pool = PoolConexoes(credenciais, tamanho_maximo)
+            _pools[chave] = pool
+        return pool
+
+
+def fechar_pools():
+    with _lock_pools:
+        for pool in _pools.values():
+            pool.fechar()
+        _pools.clear()
@@ -0,0 +1,272 @@
+"""Benchmark dos pipelines de exportação (main.py) e do dashboard.
+
+Roda totalmente offline: o banco Firebird é substituído por um SQLite local com
+o mesmo esquema (CATEGORIAS, ENDERECOS, CLIENTES, PRODUTOS, FUNCIONARIOS,
+CONTRATOS, PAGAMENTOS), populado pelo gerador_dados.py em várias escalas.
+
+Cada etapa (conexão, consulta, fetch, DataFrame, tratamento, gravação da
+planilha, agregações do dashboard) é medida com a instrumentacao.Instrumentacao
+em tempo e pico de memória (tracemalloc; use --sem-memoria para tempos sem esse
+custo). O resumo (mediana entre as repetições) é gravado em JSON para
+comparação entre execuções, e com METRICAS_LOG/METRICAS_PROMETHEUS cada
+repetição também vai para o log e o .prom, como no main.py:
+
+    python benchmark.py --escalas 10 100 --saida resultado.json
+    python benchmark.py --escalas 10 100 --comparar resultado.json
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import sqlite3
+import statistics
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+
+from agregacoes import CONSULTA_PAGAMENTOS, calcular_agregados_pandas, calcular_agregados_sql
+from colunar import ler_colunar
+from crescimento_acumulado import calcular_crescimento_acumulado
+from exportadores import criar_exportador, larguras_colunas
+from gerador_dados import COLUNAS, ORDEM_TABELAS, GeradorDados, calcular_linhas, sql_insert
+from instrumentacao import Instrumentacao, publicar_metricas
+from main import CONSULTA_CONTRATOS, exportar_streaming
+
+# Tipos das colunas no SQLite; "timestamp"/"date" fazem o sqlite3 devolver datetime/date
+TIPOS_SQLITE = {
+    "ID": "INTEGER PRIMARY KEY",
+    "DATA_NASCIMENTO": "date",
+    "DATA_ADMISSAO": "timestamp",
+    "DATA_INICIO": "timestamp",
+    "DATA_FIM": "timestamp",
+    "DATA_PAGAMENTO": "timestamp",
+    "PRECO_DIARIA": "NUMERIC",
+    "SALARIO": "NUMERIC",
+    "VALOR_PAGO": "NUMERIC",
+}
+
+# Índices equivalentes às chaves estrangeiras do Firebird
+INDICES_SQLITE = [
+    "CREATE INDEX IX_CONTRATOS_CLIENTE ON CONTRATOS (CLIENTE_ID)",
+    "CREATE INDEX IX_PAGAMENTOS_CONTRATO ON PAGAMENTOS (CONTRATO_ID)",
+    "CREATE INDEX IX_PAGAMENTOS_DATA ON PAGAMENTOS (DATA_PAGAMENTO)",
+]
+
+
+def traduzir_sql(sql):
+    """Converte as construções específicas do Firebird usadas no projeto para SQLite."""
+    sql = re.sub(
+        r"EXTRACT\((YEAR|MONTH) FROM ([\w.]+)\)",
+        lambda m: f"CAST(strftime('{'%Y' if m.group(1) == 'YEAR' else '%m'}', {m.group(2)}) AS INTEGER)",
+        sql,
+    )
+    primeiro = re.search(r"SELECT\s+FIRST\s+(\d+)", sql)
+    if primeiro:
+        sql = sql.replace(primeiro.group(0), "SELECT", 1).rstrip().rstrip(";") + f" LIMIT {primeiro.group(1)}"
+    return sql
+
+
+class CursorSQLite:
+    """Cursor com a mesma interface usada do fdb, traduzindo o SQL para o SQLite."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql, parametros=()):
+        self._cursor.execute(traduzir_sql(sql), parametros)
+        return self
+
+    def __getattr__(self, nome):
+        return getattr(self._cursor, nome)
+
+
+def conectar_sqlite(caminho):
+    return sqlite3.connect(caminho, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+
+
+def criar_banco(caminho, linhas_por_tabela, semente):
+    """Cria e popula o banco SQLite de teste (não entra na medição)."""
+    if os.path.exists(caminho):
+        os.remove(caminho)
+    con = conectar_sqlite(caminho)
+    gerador = GeradorDados(linhas_por_tabela, semente=semente)
+    for tabela in ORDEM_TABELAS:
+        colunas = ", ".join(f"{coluna} {TIPOS_SQLITE.get(coluna, '')}".strip() for coluna in COLUNAS[tabela])
+        con.execute(f"CREATE TABLE {tabela} ({colunas})")
+        for lote in gerador.lotes(tabela):
+            con.executemany(sql_insert(tabela), lote)
+    for indice in INDICES_SQLITE:
+        con.execute(indice)
+    con.commit()
+    con.close()
+
+
+def resumir(medidores):
+    """Resumo de cada etapa entre as repetições (uma Instrumentacao por repetição): mediana do tempo e maior pico."""
+    resumo = {}
+    for nome in medidores[0].etapas:
+        medicoes = [medidor.etapas[nome] for medidor in medidores if nome in medidor.etapas]
+        picos = [m["pico_memoria_bytes"] for m in medicoes if m["pico_memoria_bytes"] is not None]
+        resumo[nome] = {
+            "segundos": statistics.median(m["segundos"] for m in medicoes),
+            "segundos_min": min(m["segundos"] for m in medicoes),
+            "pico_mb": max(picos) / 1024 ** 2 if picos else None,
+            "repeticoes": len(medicoes),
+        }
+    return resumo
+
+
+def medir_exportacao(medidor, caminho_banco, diretorio, formato):
+    with medidor.etapa("exportacao.conectar"):
+        con = conectar_sqlite(caminho_banco)
+        cur = CursorSQLite(con.cursor())
+    try:
+        with medidor.etapa("exportacao.consultar"):
+            cur.execute(CONSULTA_CONTRATOS)
+        with medidor.etapa("exportacao.buscar") as etapa:
+            dados = cur.fetchall()
+            etapa.linhas = len(dados)
+        with medidor.etapa("exportacao.dataframe") as etapa:
+            df = pd.DataFrame(dados, columns=[desc[0] for desc in cur.description])
+            etapa.bytes = int(df.memory_usage(index=True).sum())
+        del dados
+        with medidor.etapa("exportacao.buscar_colunar") as etapa:
+            cur.execute(CONSULTA_CONTRATOS)
+            etapa.linhas = len(ler_colunar(cur))
+        with medidor.etapa("exportacao.tratar") as etapa:
+            df = df.dropna()
+            etapa.linhas = len(df)
+        with medidor.etapa("exportacao.larguras"):
+            larguras = larguras_colunas(df)
+        with medidor.etapa(f"exportacao.gravar_{formato}"):
+            with criar_exportador(formato, os.path.join(diretorio, "completo.xlsx")).abrir(df.columns, larguras) as exportador:
+                exportador.escrever(df)
+        del df
+
+        with medidor.etapa(f"exportacao.streaming_{formato}"):
+            cur.execute(CONSULTA_CONTRATOS)
+            exportar_streaming(cur, criar_exportador(formato, os.path.join(diretorio, "streaming.xlsx")))
+    finally:
+        con.close()
+
+
+def medir_dashboard(medidor, caminho_banco):
+    con = conectar_sqlite(caminho_banco)
+    cur = CursorSQLite(con.cursor())
+    try:
+        with medidor.etapa("dashboard.consultar_pagamentos") as etapa:
+            cur.execute(CONSULTA_PAGAMENTOS.format(filtro=""))
+            dados = cur.fetchall()
+            etapa.linhas = len(dados)
+        with medidor.etapa("dashboard.dataframe"):
+            df = pd.DataFrame(dados, columns=[desc[0] for desc in cur.description])
+        del dados
+        with medidor.etapa("dashboard.agregacoes_pandas"):
+            agregados = calcular_agregados_pandas(df)
+        del df
+        # Mesmo caminho com a leitura tipada (colunar.py)
+        with medidor.etapa("dashboard.buscar_colunar"):
+            cur.execute(CONSULTA_PAGAMENTOS.format(filtro=""))
+            df = ler_colunar(cur)
+        with medidor.etapa("dashboard.agregacoes_pandas_colunar"):
+            calcular_agregados_pandas(df)
+        del df
+        with medidor.etapa("dashboard.agregacoes_sql"):
+            agregados = calcular_agregados_sql(cur)
+        with medidor.etapa("dashboard.crescimento_acumulado"):
+            calcular_crescimento_acumulado(agregados["df_mensal_clientes"])
+    finally:
+        con.close()
+
+
+def executar(escalas, fator_pagamentos, repeticoes, formato, semente, medir_memoria=True):
+    resultados, todos_medidores = [], []
+    with tempfile.TemporaryDirectory(prefix="benchmark_") as diretorio:
+        for escala in escalas:
+            linhas = calcular_linhas(escala, {"PAGAMENTOS": fator_pagamentos, "CONTRATOS": fator_pagamentos / 2})
+            caminho_banco = os.path.join(diretorio, f"escala_{escala}.db")
+            print(f"Escala {escala}: criando banco de teste ({linhas['CONTRATOS']} contratos, {linhas['PAGAMENTOS']} pagamentos)...")
+            criar_banco(caminho_banco, linhas, semente)
+
+            medidores = []
+            for repeticao in range(1, repeticoes + 1):
+                medidor = Instrumentacao("benchmark", {"escala": escala, "repeticao": repeticao}, medir_memoria)
+                try:
+                    medir_exportacao(medidor, caminho_banco, diretorio, formato)
+                    medir_dashboard(medidor, caminho_banco)
+                except BaseException:
+                    medidor.finalizar(False)
+                    raise
+                medidores.append(medidor.finalizar(True))
+            resultados.append({"escala": escala, "linhas": linhas, "etapas": resumir(medidores)})
+            todos_medidores.extend(medidores)
+            os.remove(caminho_banco)
+
+    publicar_metricas(*todos_medidores)
+    return {
+        "metadados": {
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "plataforma": platform.platform(),
+            "formato": formato,
+            "repeticoes": repeticoes,
+            "semente": semente,
+            "medir_memoria": medir_memoria,
+        },
+        "resultados": resultados,
+    }
+
+
+def comparar(atual, anterior, limiar=0.10):
+    """Compara tempos medianos por escala e etapa; variações acima do limiar são destacadas."""
+    anteriores = {r["escala"]: r["etapas"] for r in anterior["resultados"]}
+    print(f"\n{'escala':>8}  {'etapa':<36} {'antes (s)':>10} {'agora (s)':>10} {'variação':>9}")
+    for resultado in atual["resultados"]:
+        etapas_anteriores = anteriores.get(resultado["escala"], {})
+        for nome, medicao in resultado["etapas"].items():
+            if nome not in etapas_anteriores:
+                continue
+            antes, agora = etapas_anteriores[nome]["segundos"], medicao["segundos"]
+            variacao = (agora - antes) / antes if antes else 0.0
+            marca = " <-- mais lento" if variacao > limiar else (" <-- mais rápido" if variacao < -limiar else "")
+            print(f"{resultado['escala']:>8}  {nome:<36} {antes:>10.4f} {agora:>10.4f} {variacao:>+8.1%}{marca}")
+
+
+def imprimir(resultado):
+    for item in resultado["resultados"]:
+        print(f"\nEscala {item['escala']}:")
+        for nome, medicao in item["etapas"].items():
+            memoria = f"{medicao['pico_mb']:>9.1f} MB" if medicao["pico_mb"] is not None else ""
+            print(f"  {nome:<36} {medicao['segundos']:>9.4f} s  {memoria}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos pipelines de exportação e do dashboard.")
+    parser.add_argument("--escalas", type=float, nargs="+", default=[10, 100], help="Fatores de escala do gerador_dados.py")
+    parser.add_argument("--fator-pagamentos", type=float, default=20, help="Multiplicador extra para PAGAMENTOS (CONTRATOS usa a metade)")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--formato", default="xlsx", help="Motor de saída medido (xlsx, csv ou parquet)")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--sem-memoria", action="store_true", help="Não mede memória (o tracemalloc deixa as etapas mais lentas)")
+    parser.add_argument("--saida", help="Arquivo JSON para gravar os resultados")
+    parser.add_argument("--comparar", help="Arquivo JSON de uma execução anterior para comparação")
+    args = parser.parse_args()
+
+    resultado = executar(args.escalas, args.fator_pagamentos, args.repeticoes, args.formato, args.semente, not args.sem_memoria)
+    imprimir(resultado)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+        print(f"\nResultados gravados em '{args.saida}'.")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            comparar(resultado, json.load(arquivo))
+
+
+if __name__ == "__main__":
+    main()
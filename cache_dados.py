@@ -0,0 +1,172 @@
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+
+class CacheTTL:
+    """Cache em memória com tempo de expiração (TTL) e limite de itens (LRU).
+
+    Fica no nível do módulo, então é compartilhado por todos os reruns e sessões
+    do Streamlit dentro do mesmo processo.
+    """
+
+    def __init__(self, ttl_segundos=300, max_itens=8):
+        self.ttl_segundos = ttl_segundos
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.hits_disco = 0
+        # Incrementada a cada invalidação: um valor calculado antes dela não é guardado
+        self.geracao = 0
+
+    def obter(self, chave):
+        """Retorna (encontrado, valor). Itens vencidos são removidos."""
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None:
+                criado_em, valor = item
+                if time.time() - criado_em < self.ttl_segundos:
+                    self._itens.move_to_end(chave)
+                    self.hits += 1
+                    return True, valor
+                del self._itens[chave]
+            self.misses += 1
+            return False, None
+
+    def guardar(self, chave, valor, criado_em=None):
+        with self._lock:
+            self._itens[chave] = (criado_em or time.time(), valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def invalidar(self, chave=None):
+        """Remove uma chave ou, sem argumento, todo o cache."""
+        with self._lock:
+            self.geracao += 1
+            if chave is None:
+                self._itens.clear()
+            else:
+                self._itens.pop(chave, None)
+
+    def obter_ou_calcular(self, chave, calcular, snapshot=None):
+        """Busca no cache em memória, depois no snapshot em disco e só então calcula.
+
+        Resultados None (falha no carregamento) não são guardados.
+        """
+        encontrado, valor = self.obter(chave)
+        if encontrado:
+            return valor
+
+        if snapshot is not None:
+            lido = snapshot.ler(chave, self.ttl_segundos)
+            if lido is not None:
+                criado_em, valor = lido
+                with self._lock:
+                    self.hits_disco += 1
+                self.guardar(chave, valor, criado_em)
+                return valor
+
+        geracao = self.geracao
+        valor = calcular()
+        # Invalidado durante o cálculo (ex.: evento de alteração no banco): o valor pode estar desatualizado
+        if valor is not None and geracao == self.geracao:
+            self.guardar(chave, valor)
+            if snapshot is not None:
+                snapshot.gravar(chave, valor)
+        return valor
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hits_disco": self.hits_disco,
+                "taxa_acerto": self.hits / consultas if consultas else 0.0,
+                "itens": len(self._itens),
+                "max_itens": self.max_itens,
+                "ttl_segundos": self.ttl_segundos,
+            }
+
+
+class SnapshotDisco:
+    """Snapshot colunar (Parquet) dos DataFrames carregados, compartilhado entre processos.
+
+    Cada chave vira um diretório com um arquivo .parquet por DataFrame e um
+    metadados.json com os valores escalares e o horário da carga. A gravação é
+    feita em um diretório temporário renomeado no final, então outros processos
+    nunca leem um snapshot pela metade. Requer o pacote `pyarrow`.
+    """
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+
+    def _caminho(self, chave):
+        nome = "_".join(str(parte) for parte in (chave if isinstance(chave, tuple) else (chave,)))
+        nome = "".join(c if c.isalnum() or c in "-_" else "_" for c in nome)
+        return os.path.join(self.diretorio, nome)
+
+    def ler(self, chave, ttl_segundos):
+        caminho = self._caminho(chave)
+        try:
+            with open(os.path.join(caminho, "metadados.json"), encoding="utf-8") as arquivo:
+                metadados = json.load(arquivo)
+            if time.time() - metadados["criado_em"] >= ttl_segundos:
+                return None
+            valor = dict(metadados["escalares"])
+            for nome in metadados["dataframes"]:
+                valor[nome] = pd.read_parquet(os.path.join(caminho, f"{nome}.parquet"))
+            return metadados["criado_em"], valor
+        except (OSError, ValueError, KeyError, ImportError):
+            return None
+
+    def gravar(self, chave, valor):
+        caminho = self._caminho(chave)
+        temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(temporario, exist_ok=True)
+            escalares, dataframes = {}, []
+            for nome, item in valor.items():
+                if isinstance(item, pd.DataFrame):
+                    item.to_parquet(os.path.join(temporario, f"{nome}.parquet"))
+                    dataframes.append(nome)
+                else:
+                    escalares[nome] = item.item() if hasattr(item, "item") else item
+            with open(os.path.join(temporario, "metadados.json"), "w", encoding="utf-8") as arquivo:
+                json.dump({"criado_em": time.time(), "escalares": escalares, "dataframes": dataframes}, arquivo)
+
+            antigo = f"{caminho}.{os.getpid()}.old"
+            if os.path.exists(caminho):
+                os.replace(caminho, antigo)
+            os.replace(temporario, caminho)
+            shutil.rmtree(antigo, ignore_errors=True)
+        except (OSError, ValueError, TypeError, ImportError) as e:
+            print(f"Não foi possível gravar o snapshot em disco: {e}") # Log para debug
+            shutil.rmtree(temporario, ignore_errors=True)
+
+    def invalidar(self):
+        shutil.rmtree(self.diretorio, ignore_errors=True)
+
+
+_cache_global = None
+_lock_global = threading.Lock()
+
+
+def obter_cache(ttl_segundos=300, max_itens=8):
+    """Retorna o cache do processo, atualizando TTL e limite se a configuração mudar."""
+    global _cache_global
+    with _lock_global:
+        if _cache_global is None:
+            _cache_global = CacheTTL(ttl_segundos, max_itens)
+        else:
+            _cache_global.ttl_segundos = ttl_segundos
+            _cache_global.max_itens = max_itens
+        return _cache_global
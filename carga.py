@@ -0,0 +1,157 @@
+"""Carga rápida dos dados de teste no Firebird (modo CARGA_RAPIDA do scripts-insert.py).
+
+Em relação à carga simples (DELETE + executemany em uma única transação):
+
+* índices que não pertencem a constraints (PK, FK, UNIQUE) ficam inativos
+  durante a limpeza e a carga e são reconstruídos uma vez no final;
+* as linhas são enviadas em blocos EXECUTE BLOCK com vários INSERTs, o que
+  reduz as idas e voltas ao servidor;
+* cada tabela é confirmada a cada `commit_a_cada` linhas, sem uma transação
+  gigante;
+* tabelas sem dependência entre si são carregadas em paralelo, cada uma em
+  sua própria conexão.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from gerador_dados import COLUNAS, ORDEM_TABELAS
+
+# Grupos carregados em sequência; as tabelas de um mesmo grupo não dependem
+# umas das outras (chaves estrangeiras) e são carregadas em paralelo
+GRUPOS_PARALELOS = [
+    ["CATEGORIAS", "ENDERECOS", "FUNCIONARIOS"],
+    ["CLIENTES", "PRODUTOS"],
+    ["CONTRATOS"],
+    ["PAGAMENTOS"],
+]
+
+# Índices ativos que podem ser desativados: os de constraints (PK, FK, UNIQUE) não podem
+CONSULTA_INDICES_CARGA = """
+    SELECT TRIM(idx.RDB$INDEX_NAME)
+    FROM RDB$INDICES idx
+    LEFT JOIN RDB$RELATION_CONSTRAINTS rc ON rc.RDB$INDEX_NAME = idx.RDB$INDEX_NAME
+    WHERE idx.RDB$RELATION_NAME = ?
+      AND rc.RDB$INDEX_NAME IS NULL
+      AND COALESCE(idx.RDB$SYSTEM_FLAG, 0) = 0
+      AND COALESCE(idx.RDB$INDEX_INACTIVE, 0) = 0
+    ORDER BY 1
+"""
+
+
+@lru_cache(maxsize=None)
+def sql_execute_block(tabela, linhas):
+    """EXECUTE BLOCK com `linhas` INSERTs; os parâmetros são os valores das linhas em sequência.
+
+    Os parâmetros do bloco usam TYPE OF COLUMN (Firebird 2.5+), então os tipos
+    vêm da própria tabela.
+    """
+    colunas = COLUNAS[tabela]
+    parametros = ", ".join(
+        f"p{linha}_{indice} TYPE OF COLUMN {tabela}.{coluna} = ?"
+        for linha in range(linhas)
+        for indice, coluna in enumerate(colunas)
+    )
+    inserts = "\n".join(
+        f"  INSERT INTO {tabela} ({', '.join(colunas)}) VALUES ({', '.join(f':p{linha}_{indice}' for indice in range(len(colunas)))});"
+        for linha in range(linhas)
+    )
+    return f"EXECUTE BLOCK ({parametros})\nAS\nBEGIN\n{inserts}\nEND"
+
+
+def indices_desativaveis(con, tabelas):
+    """Índices ativos das tabelas que não pertencem a constraints."""
+    indices = []
+    for tabela in tabelas:
+        con.execute(CONSULTA_INDICES_CARGA, (tabela,))
+        indices.extend(nome for (nome,) in con.fetchall())
+    return indices
+
+
+def alterar_indices(con, indices, ativo):
+    """Ativa (reconstrói) ou desativa os índices, confirmando cada um."""
+    for nome in indices:
+        con.cur.execute(f"ALTER INDEX {nome} {'ACTIVE' if ativo else 'INACTIVE'}")
+        con.commit()
+
+
+def limpar_tabelas(con, tabelas):
+    """Exclui os dados na ordem inversa das chaves estrangeiras, uma transação por tabela.
+
+    Depois de cada DELETE, um COUNT(*) percorre a tabela e faz a coleta das
+    versões excluídas agora, enquanto os índices desativados não precisam ser
+    atualizados, em vez de deixar esse custo para a carga.
+    """
+    for tabela in sorted(tabelas, key=ORDEM_TABELAS.index, reverse=True):
+        inicio = time.perf_counter()
+        con.cur.execute(f"DELETE FROM {tabela}")
+        con.commit()
+        con.cur.execute(f"SELECT COUNT(*) FROM {tabela}")
+        con.cur.fetchone()
+        con.commit()
+        print(f"Dados excluídos da tabela {tabela} ({time.perf_counter() - inicio:.1f}s).")
+
+
+def carregar_tabela(pool, gerador, tabela, linhas_por_bloco=50, commit_a_cada=100_000):
+    """Insere a tabela em blocos EXECUTE BLOCK, com commit a cada `commit_a_cada` linhas."""
+    inicio = time.perf_counter()
+    linhas = pendentes = 0
+    with pool.conexao() as con:
+        for lote in gerador.lotes(tabela):
+            for posicao in range(0, len(lote), linhas_por_bloco):
+                bloco = lote[posicao:posicao + linhas_por_bloco]
+                con.execute(sql_execute_block(tabela, len(bloco)), [valor for linha in bloco for valor in linha])
+                pendentes += len(bloco)
+                if pendentes >= commit_a_cada:
+                    con.commit()
+                    linhas += pendentes
+                    pendentes = 0
+        con.commit()
+        linhas += pendentes
+    return {"tabela": tabela, "linhas": linhas, "segundos": time.perf_counter() - inicio}
+
+
+def carga_rapida(pool, gerador, tabelas=ORDEM_TABELAS, linhas_por_bloco=50, commit_a_cada=100_000,
+                 desativar_indices=True, paralelo=3):
+    """Limpa e recarrega as tabelas; retorna a velocidade de carga de cada uma.
+
+    O pool precisa de até `paralelo` conexões. Os índices desativados são
+    reativados mesmo se a carga falhar.
+    """
+    with pool.conexao() as con:
+        indices = indices_desativaveis(con, tabelas) if desativar_indices else []
+    try:
+        with pool.conexao() as con:
+            if indices:
+                print(f"Desativando {len(indices)} índice(s): {', '.join(indices)}")
+                alterar_indices(con, indices, ativo=False)
+            limpar_tabelas(con, tabelas)
+
+        resultados = []
+        with ThreadPoolExecutor(max_workers=max(1, paralelo), thread_name_prefix="carga") as executor:
+            for grupo in GRUPOS_PARALELOS:
+                grupo = [tabela for tabela in grupo if tabela in tabelas]
+                futuros = [
+                    executor.submit(carregar_tabela, pool, gerador, tabela, linhas_por_bloco, commit_a_cada)
+                    for tabela in grupo
+                ]
+                # O próximo grupo depende deste (chaves estrangeiras): espera todas terminarem
+                for futuro in futuros:
+                    resultado = futuro.result()
+                    resultados.append(resultado)
+                    print(f"{resultado['linhas']} registros inseridos em {resultado['tabela']}.")
+        return resultados
+    finally:
+        if indices:
+            inicio = time.perf_counter()
+            print("Reativando (reconstruindo) os índices...")
+            with pool.conexao() as con:
+                alterar_indices(con, indices, ativo=True)
+            print(f"Índices reativados em {time.perf_counter() - inicio:.1f}s.")
+
+
+def imprimir_velocidades(resultados):
+    print(f"\n{'Tabela':<14} {'Linhas':>12} {'Tempo (s)':>10} {'Linhas/s':>12}")
+    for r in resultados:
+        velocidade = r["linhas"] / r["segundos"] if r["segundos"] else 0.0
+        print(f"{r['tabela']:<14} {r['linhas']:>12} {r['segundos']:>10.2f} {velocidade:>12,.0f}")
@@ -0,0 +1,259 @@
+"""Leitura do resultado de um cursor direto para colunas NumPy tipadas.
+
+`pd.DataFrame(cur.fetchall())` guarda cada valor como objeto Python (Decimal,
+datetime, str): as colunas ficam com dtype object e ainda precisam de
+`pd.to_numeric`/`pd.to_datetime`. Aqui o tipo de cada coluna vem do
+`cur.description` (no fdb, o `type_code` é o tipo Python da coluna) e os lotes
+do `fetchmany` são decodificados assim que chegam:
+
+* inteiros viram int32 (ou int64, se não couberem);
+* NUMERIC/DECIMAL viram float64 ou, com `centavos=True`, inteiros na menor unidade (int64);
+* datas viram datetime64;
+* textos repetitivos (nomes, status) viram categóricos.
+
+Só um lote de tuplas fica em memória por vez. Cursores sem tipo na descrição
+(ex.: o SQLite do benchmark) têm o tipo deduzido pelo primeiro valor não nulo.
+"""
+import datetime
+import decimal
+
+import numpy as np
+import pandas as pd
+
+TAMANHO_LOTE = 50000
+
+# Texto vira categórico quando tem no máximo esta proporção de valores distintos
+PROPORCAO_CATEGORICA = 0.5
+
+# Casas decimais usadas em `centavos=True` quando a descrição não informa a escala
+ESCALA_PADRAO = 2
+
+_INT32 = np.iinfo(np.int32)
+
+
+class _ColunaInteira:
+    """Inteiros; com `deduzida=True` (tipo deduzido dos valores) vira float64 se aparecer um float."""
+
+    def __init__(self, deduzida=False, reduzir=True):
+        self.deduzida = deduzida
+        self.reduzir = reduzir
+        self.real = False
+        self.valores, self.nulos = [], []
+
+    def acrescentar(self, valores):
+        if self.deduzida and not self.real and any(isinstance(v, float) for v in valores):
+            # Ex.: NUMERIC no SQLite, que devolve int quando o valor não tem casas decimais
+            self.real = True
+        tem_nulos = None in valores
+        if self.real:
+            self.valores.append(np.fromiter((np.nan if v is None else v for v in valores), np.float64, len(valores)))
+        elif tem_nulos:
+            self.valores.append(np.fromiter((0 if v is None else v for v in valores), np.int64, len(valores)))
+        else:
+            self.valores.append(np.fromiter(valores, np.int64, len(valores)))
+        if tem_nulos:
+            self.nulos.append(np.fromiter((v is None for v in valores), bool, len(valores)))
+        else:
+            self.nulos.append(np.zeros(len(valores), bool))
+
+    def finalizar(self):
+        if self.real:
+            valores = _concatenar([parte.astype(np.float64) for parte in self.valores], np.float64)
+            valores[_concatenar(self.nulos, bool)] = np.nan
+            return valores
+        valores, nulos = _concatenar(self.valores, np.int64), _concatenar(self.nulos, bool)
+        if self.reduzir and len(valores) and _INT32.min <= valores.min() and valores.max() <= _INT32.max:
+            valores = valores.astype(np.int32)
+        if nulos.any():
+            return pd.arrays.IntegerArray(valores, nulos)
+        return valores
+
+
+class _ColunaCentavos(_ColunaInteira):
+    """NUMERIC/DECIMAL como inteiro na menor unidade (ex.: centavos): somas exatas.
+
+    Sempre int64: somas em centavos estouram o int32 facilmente.
+    """
+
+    def __init__(self, escala):
+        super().__init__(reduzir=False)
+        self.escala = escala
+        self.fator = 10 ** escala
+
+    def _inteiro(self, valor):
+        if isinstance(valor, decimal.Decimal):
+            return int(valor.scaleb(self.escala).to_integral_value())
+        return round(valor * self.fator)
+
+    def acrescentar(self, valores):
+        super().acrescentar([None if v is None else self._inteiro(v) for v in valores])
+
+
+class _ColunaReal:
+    def __init__(self):
+        self.valores = []
+
+    def acrescentar(self, valores):
+        self.valores.append(np.fromiter((np.nan if v is None else float(v) for v in valores), np.float64, len(valores)))
+
+    def finalizar(self):
+        return _concatenar(self.valores, np.float64)
+
+
+class _ColunaData:
+    def __init__(self):
+        self.valores = []
+
+    def acrescentar(self, valores):
+        # Conversão do pandas (bem mais rápida que np.array para objetos datetime); None vira NaT
+        self.valores.append(np.asarray(pd.array(valores, dtype="datetime64[us]")))
+
+    def finalizar(self):
+        return _concatenar(self.valores, "datetime64[us]")
+
+
+class _ColunaTexto:
+    """Textos codificados em um dicionário conforme chegam (um código int32 por linha)."""
+
+    def __init__(self, categorica=None):
+        self.categorica = categorica
+        self.indices = {}
+        self.codigos = []
+
+    def acrescentar(self, valores):
+        # factorize codifica o lote em C; só os valores distintos do lote passam pelo dicionário global
+        codigos, distintos = pd.factorize(np.array(valores, dtype=object))
+        globais = np.fromiter((self.indices.setdefault(v, len(self.indices)) for v in distintos), np.int32, len(distintos))
+        self.codigos.append(np.where(codigos >= 0, globais[codigos] if len(globais) else -1, -1).astype(np.int32))
+
+    def finalizar(self):
+        codigos = _concatenar(self.codigos, np.int32)
+        categorias = list(self.indices)
+        coluna = pd.Categorical.from_codes(codigos, categories=categorias)
+        categorica = self.categorica
+        if categorica is None:
+            categorica = len(categorias) <= len(codigos) * PROPORCAO_CATEGORICA
+        if not categorica:
+            # Quase todos distintos: o dicionário não economiza nada
+            return np.asarray(coluna, dtype=object)
+        try:
+            return coluna.set_categories(sorted(categorias))
+        except TypeError:
+            return coluna
+
+
+class _ColunaObjeto:
+    """Tipos sem representação compacta (BLOB, TIME...): mantidos como objetos Python."""
+
+    def __init__(self):
+        self.valores = []
+
+    def acrescentar(self, valores):
+        self.valores.extend(valores)
+
+    def finalizar(self):
+        return np.array(self.valores, dtype=object)
+
+
+def _concatenar(partes, dtype):
+    return np.concatenate(partes) if partes else np.array([], dtype=dtype)
+
+
+def _tipo_coluna(descricao, valores):
+    """Tipo Python da coluna e se ele foi deduzido dos valores (descrição sem tipo)."""
+    tipo = descricao[1]
+    if isinstance(tipo, type):
+        return tipo, False
+    tipos = {type(v) for v in valores if v is not None}
+    if not tipos:
+        return None, True
+    if tipos <= {int, float}:
+        return (float if float in tipos else int), True
+    return next(iter(tipos)), True
+
+
+def _criar_coluna(descricao, tipo, deduzida, centavos, categoricas, reduzir_inteiros):
+    if tipo is None:
+        return None
+    # bool é subclasse de int e datetime é subclasse de date: a ordem importa
+    if issubclass(tipo, bool):
+        return _ColunaObjeto()
+    if issubclass(tipo, int):
+        return _ColunaInteira(deduzida, reduzir_inteiros)
+    if issubclass(tipo, decimal.Decimal):
+        if centavos:
+            escala = abs(descricao[5]) if len(descricao) > 5 and descricao[5] else ESCALA_PADRAO
+            return _ColunaCentavos(escala)
+        return _ColunaReal()
+    if issubclass(tipo, float):
+        return _ColunaReal()
+    if issubclass(tipo, datetime.date):
+        return _ColunaData()
+    if issubclass(tipo, str):
+        return _ColunaTexto(None if categoricas is None else descricao[0] in categoricas)
+    return _ColunaObjeto()
+
+
+class LeitorColunar:
+    """Acumula lotes de linhas (tuplas) em colunas tipadas.
+
+    `centavos=True` guarda os NUMERIC/DECIMAL (Decimal no fdb) em inteiros na
+    menor unidade da escala da coluna; FLOAT/DOUBLE continuam float64.
+    `categoricas` é a lista das colunas de texto a codificar como categóricas;
+    None decide pela proporção de valores distintos.
+
+    Para gravar lotes em um mesmo arquivo (ex.: Parquet), use `categoricas=()`
+    e `reduzir_inteiros=False`: os tipos não variam de um lote para outro.
+    """
+
+    def __init__(self, descricao, centavos=False, categoricas=None, reduzir_inteiros=True):
+        self.descricao = list(descricao)
+        self.nomes = [desc[0] for desc in self.descricao]
+        self.centavos = centavos
+        self.categoricas = None if categoricas is None else set(categoricas)
+        self.reduzir_inteiros = reduzir_inteiros
+        self.colunas = [None] * len(self.descricao)
+        self.pendentes = [0] * len(self.descricao)
+        self.linhas = 0
+
+    def acrescentar(self, linhas):
+        if not linhas:
+            return
+        for indice, valores in enumerate(zip(*linhas)):
+            coluna = self.colunas[indice]
+            if coluna is None:
+                descricao = self.descricao[indice]
+                coluna = _criar_coluna(descricao, *_tipo_coluna(descricao, valores), self.centavos, self.categoricas, self.reduzir_inteiros)
+                if coluna is None:
+                    # Coluna só com nulos até aqui: o tipo sai do próximo lote
+                    self.pendentes[indice] += len(valores)
+                    continue
+                if self.pendentes[indice]:
+                    coluna.acrescentar([None] * self.pendentes[indice])
+                self.colunas[indice] = coluna
+            coluna.acrescentar(valores)
+        self.linhas += len(linhas)
+
+    def dataframe(self):
+        dados = {}
+        for nome, coluna in zip(self.nomes, self.colunas):
+            dados[nome] = coluna.finalizar() if coluna is not None else np.full(self.linhas, None, dtype=object)
+        return pd.DataFrame(dados, columns=self.nomes)
+
+
+def dataframe_tipado(linhas, descricao, centavos=False, categoricas=None, reduzir_inteiros=True):
+    """DataFrame tipado a partir de linhas já buscadas (ex.: um lote do fetchmany)."""
+    leitor = LeitorColunar(descricao, centavos, categoricas, reduzir_inteiros)
+    leitor.acrescentar(linhas)
+    return leitor.dataframe()
+
+
+def ler_colunar(cur, tamanho_lote=TAMANHO_LOTE, centavos=False, categoricas=None):
+    """Busca o resultado do cursor em lotes e devolve um DataFrame tipado."""
+    leitor = LeitorColunar(cur.description, centavos, categoricas)
+    while True:
+        linhas = cur.fetchmany(tamanho_lote)
+        if not linhas:
+            break
+        leitor.acrescentar(linhas)
+    return leitor.dataframe()
@@ -0,0 +1,76 @@
+import pandas as pd
+
+COLUNA_DATA = 'Data Referência (Mês)'
+
+
+def _nomes_series(df_totais):
+    """Nome de cada série no gráfico; nomes repetidos recebem o ID do cliente."""
+    repetidos = df_totais['cliente_nome'].duplicated(keep=False)
+    nomes = df_totais['cliente_nome'].astype(str)
+    return nomes.where(~repetidos, nomes + ' (#' + df_totais['cliente_id'].astype(str) + ')')
+
+
+def reduzir_pontos(df_grafico, max_pontos):
+    """Reduz a quantidade de meses mantendo sempre o último mês.
+
+    Como os valores são acumulados, basta pegar o último ponto de cada janela
+    para que o gráfico continue correto.
+    """
+    if max_pontos is None or max_pontos <= 0 or len(df_grafico) <= max_pontos:
+        return df_grafico
+    passo = -(-len(df_grafico) // max_pontos)  # divisão arredondada para cima
+    posicoes = list(range(len(df_grafico) - 1, -1, -passo))[::-1]
+    return df_grafico.iloc[posicoes].reset_index(drop=True)
+
+
+def calcular_crescimento_acumulado(df_mensal_clientes, top_n=10, max_pontos=60, rotulo_outros='Outros'):
+    """Monta a tabela do gráfico "Crescimento do Pagamento Acumulado por Cliente".
+
+    Entrada no formato longo e esparso (uma linha por cliente e mês com pagamento):
+    colunas cliente_id, cliente_nome, mes_pagamento e valor_pago.
+
+    Apenas os `top_n` clientes com maior total viram séries próprias; os demais
+    são somados em uma série `rotulo_outros`. O acumulado é calculado no formato
+    longo e só então pivotado, então a tabela final tem no máximo
+    `max_pontos` linhas x (`top_n` + 2) colunas, independentemente da
+    quantidade de clientes.
+    """
+    if df_mensal_clientes.empty:
+        return pd.DataFrame()
+
+    df = df_mensal_clientes[['cliente_id', 'cliente_nome', 'mes_pagamento', 'valor_pago']]
+
+    # Seleção dos top N clientes pelo total pago
+    # observed=True: um cliente_nome categórico não pode virar o produto cartesiano com cliente_id
+    df_totais = df.groupby(['cliente_id', 'cliente_nome'], sort=False, observed=True)['valor_pago'].sum().reset_index()
+    df_totais = df_totais.nlargest(top_n, 'valor_pago') if top_n else df_totais
+    df_totais = df_totais.assign(serie=_nomes_series(df_totais).values)
+    series_top = df_totais.set_index('cliente_id')['serie']
+
+    # Clientes fora do top N entram na série "Outros"
+    serie = df['cliente_id'].map(series_top).astype(object)
+    tem_outros = bool(serie.isna().any())
+    serie = serie.fillna(rotulo_outros)
+
+    # Acumulado por série no formato longo (sem matriz densa meses x clientes)
+    df_series = (
+        df.assign(serie=serie.values)
+        .groupby(['serie', 'mes_pagamento'], sort=True)['valor_pago'].sum()
+        .groupby(level='serie').cumsum()
+        .rename('acumulado')
+        .reset_index()
+    )
+
+    # Pivot pequeno: meses x (top N + Outros), preenchendo meses sem pagamento
+    df_grafico = df_series.pivot(index='mes_pagamento', columns='serie', values='acumulado')
+    meses = pd.date_range(df_grafico.index.min(), df_grafico.index.max(), freq='MS')
+    df_grafico = df_grafico.reindex(meses).ffill().fillna(0)
+
+    colunas = list(df_totais['serie'])
+    if tem_outros:
+        colunas.append(rotulo_outros)
+    df_grafico = df_grafico[colunas]
+    df_grafico.columns.name = None
+    df_grafico = df_grafico.rename_axis(COLUNA_DATA).reset_index()
+
+    return reduzir_pontos(df_grafico, max_pontos)
@@ -5,6 +5,27 @@ import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 import locale
 import google.generativeai as genai
+from contextlib import ExitStack
+
+from agregacoes import (
+    CONSULTA_PAGAMENTOS,
+    agregados_vazios,
+    calcular_agregados_pandas,
+    calcular_agregados_resumos,
+    calcular_agregados_sql,
+    diferencas_agregados,
+)
+from banco import com_retentativa, credenciais_streamlit, obter_pool
+from cache_dados import SnapshotDisco, obter_cache
+from colunar import ler_colunar
+from eventos import EVENTOS, FonteEventosFirebird, FonteEventosSimulada, modo_resumos, obter_ouvinte
+from crescimento_acumulado import calcular_crescimento_acumulado
+from insights_ia import MODELO_PADRAO, MODELO_STUB, CacheRespostas, chave_resposta, obter_gerador
+from filtros import SEM_FILTRO, Filtro
+from instrumentacao import SEM_MEDICAO, Instrumentacao, gravar_prometheus, registrar_json
+from paginacao import ORDENACOES, TAMANHOS_PAGINA, buscar_pagina
+from prompt_ia import compactar_prompt
+from resumos import ArmazenamentoResumos, atualizar_resumos
 
 # Configura a localização para formato monetário brasileiro
 try:
@@ -32,133 +53,240 @@ st.set_page_config(layout="wide")
 st.title("Dashboard de Crescimento de Negócios 📈")
 st.write("Explore métricas, gráficos e dados de pagamentos e crescimento.")
 
-# Inicializa variáveis para evitar NameError caso a conexão falhe
-con = None
-cur = None
-df = pd.DataFrame()
-df_grafico_acumulado = pd.DataFrame()
-df_mensal_sum = pd.DataFrame()
-total_revenue = 0
-num_unique_clients = 0
-avg_payment_value = 0
-df_top_clients = pd.DataFrame()
-df_latest_payments = pd.DataFrame()
-
-# --- Conecta ao banco de dados e carrega dados de pagamentos ---
-# Usando as credenciais do arquivo .streamlit/secrets.toml
+# Opções do dashboard na seção [dashboard] do secrets.toml (todas opcionais)
 try:
-    # Acessa as credenciais Firebird a partir de st.secrets
-    # As chaves devem corresponder à estrutura definida no secrets.toml
-    db_dsn = st.secrets.connections.firebird.dsn
-    db_user = st.secrets.connections.firebird.user
-    db_password = st.secrets.connections.firebird.password
-
-    print("Tentando conectar ao banco de dados usando secrets...") # Log para debug
-    con = fdb.connect(dsn=db_dsn, user=db_user, password=db_password)
-    cur = con.cursor()
-    print("Conexão com banco de dados bem-sucedida.") # Log para debug
-
-    query = """
-    SELECT
-        cli.ID AS cliente_id,
-        cli.NOME AS cliente_nome,
-        pag.ID AS pagamento_id,
-        pag.DATA_PAGAMENTO AS data_pagamento,
-        pag.VALOR_PAGO AS valor_pago
-    FROM PAGAMENTOS pag
-    JOIN CONTRATOS con ON pag.CONTRATO_ID = con.ID
-    JOIN CLIENTES cli ON con.CLIENTE_ID = cli.ID
-    ORDER BY pag.DATA_PAGAMENTO DESC; -- Ordenado por data descendente para os últimos pagamentos
-    """
-    cur.execute(query)
-    dados = cur.fetchall()
-    colunas = [desc[0] for desc in cur.description]
-    df = pd.DataFrame(dados, columns=colunas)
-
-    # --- Processamento dos Dados no Pandas ---
-    if not df.empty:
-        df_processado = df.copy()
-        df_processado.rename(columns={
-            'DATA_PAGAMENTO': 'data_pagamento',
-            'CLIENTE_NOME': 'cliente_nome',
-            'CLIENTE_ID': 'cliente_id',
-            'VALOR_PAGO': 'valor_pago'
-        }, inplace=True)
-
+    config_dashboard = dict(st.secrets.get("dashboard", {}))
+except Exception:
+    config_dashboard = {}
+
+# "resumos" lê os resumos materializados pelo atualizar_resumos.py (tempo de carga constante);
+# "sql" agrega no Firebird e traz só os resultados; "pandas" traz todos os pagamentos
+MODO_AGREGACAO = str(config_dashboard.get("agregacao", "resumos")).lower()
+RESUMOS_DIRETORIO = config_dashboard.get("resumos_diretorio", "resumos_pagamentos")
+# Calcula pelos dois caminhos e avisa se os números divergirem
+VALIDAR_AGREGACAO = bool(config_dashboard.get("validar_agregacao", False))
+
+# Gráfico de crescimento acumulado: top N clientes + "Outros", limitado a N pontos no tempo
+GRAFICO_TOP_CLIENTES = int(config_dashboard.get("grafico_top_clientes", 10))
+GRAFICO_MAX_PONTOS = int(config_dashboard.get("grafico_max_pontos", 60))
+
+# Invalidação por eventos do banco (gatilhos criados com `python eventos.py --aplicar`):
+# "firebird" escuta o banco; "simulado" dispara os eventos por um botão (testes offline)
+EVENTOS_MODO = str(config_dashboard.get("eventos", "")).lower()
+EVENTOS_AGRUPAR_SEGUNDOS = float(config_dashboard.get("eventos_agrupar_segundos", 1.0))
+# Atualiza os resumos materializados ao receber os eventos (desligue se o atualizar_resumos.py --eventos já faz isso)
+EVENTOS_ATUALIZAR_RESUMOS = bool(config_dashboard.get("eventos_atualizar_resumos", True))
+
+# Cache compartilhado entre reruns e sessões (e, opcionalmente, entre processos via disco).
+# Com eventos, o cache só é recarregado quando o banco muda: o TTL vira só uma garantia
+CACHE_TTL_SEGUNDOS = int(config_dashboard.get("cache_ttl_segundos", 24 * 3600 if EVENTOS_MODO else 300))
+CACHE_MAX_ITENS = int(config_dashboard.get("cache_max_itens", 8))
+CACHE_DIRETORIO = config_dashboard.get("cache_diretorio")
+
+# Análise por IA: "stub" usa um modelo local (testes offline, sem chave da API)
+IA_MODELO = str(config_dashboard.get("ia_modelo", MODELO_PADRAO))
+IA_CACHE_DIRETORIO = config_dashboard.get("ia_cache_diretorio", ".cache_insights")
+IA_CACHE_MAX_ITENS = int(config_dashboard.get("ia_cache_max_itens", 50))
+IA_CACHE_TTL_SEGUNDOS = int(config_dashboard.get("ia_cache_ttl_segundos", 7 * 24 * 3600))
+# Métricas por etapa de cada carga (cache miss): log em JSON Lines e arquivo .prom do node exporter
+METRICAS_LOG = config_dashboard.get("metricas_log")
+METRICAS_PROMETHEUS = config_dashboard.get("metricas_prometheus")
+METRICAS_MEMORIA = bool(config_dashboard.get("metricas_memoria", False))
+
+# Orçamento do prompt e preço de entrada do modelo (US$ por milhão de tokens) para a estimativa de custo
+IA_ORCAMENTO_TOKENS = int(config_dashboard.get("ia_orcamento_tokens", 1500))
+IA_PRECO_MILHAO_TOKENS = float(config_dashboard.get("ia_preco_milhao_tokens", 0.10))
+
+
+def processar_dados(pool, filtro=SEM_FILTRO, medidor=SEM_MEDICAO):
+    """Carrega e processa os dados em uma transação snapshot somente leitura."""
+    with ExitStack() as pilha:
+        with medidor.etapa("conectar"):
+            cur = pilha.enter_context(pool.leitura())
+        agregados = None
+        # Os resumos materializados cobrem o histórico inteiro: com filtros, agrega no banco
+        if MODO_AGREGACAO == "resumos" and not filtro.ativo:
+            with medidor.etapa("agregacoes_resumos"):
+                resumos = ArmazenamentoResumos(RESUMOS_DIRETORIO).ler()
+                if resumos is not None:
+                    agregados = calcular_agregados_resumos(resumos, cur, limite_brutos=0)
+            if resumos is None:
+                st.info(f"Resumos materializados não encontrados em '{RESUMOS_DIRETORIO}'; usando agregação no banco. Execute `python atualizar_resumos.py` para criá-los.")
+
+        if agregados is None and MODO_AGREGACAO in ("sql", "resumos"):
+            try:
+                with medidor.etapa("agregacoes_sql"):
+                    agregados = calcular_agregados_sql(cur, limite_brutos=0, filtro=filtro)
+            except fdb.DatabaseError as e:
+                # Fallback: se a agregação no servidor falhar, usa o caminho em pandas
+                st.warning(f"Agregação no banco falhou, usando processamento em pandas: {e}")
+
+        if agregados is None or VALIDAR_AGREGACAO:
+            with medidor.etapa("consultar"):
+                cur.execute(CONSULTA_PAGAMENTOS.format(filtro=filtro.sql), filtro.parametros)
+            # Cada lote do fetchmany já vira colunas tipadas (int32, float64, datetime64, categórico)
+            with medidor.etapa("buscar") as etapa:
+                df_pagamentos = ler_colunar(cur)
+                etapa.linhas = len(df_pagamentos)
+                etapa.bytes = int(df_pagamentos.memory_usage(index=True, deep=True).sum())
+            with medidor.etapa("agregacoes_pandas"):
+                agregados_pandas = calcular_agregados_pandas(df_pagamentos, limite_brutos=0)
+            if agregados is None:
+                agregados = agregados_pandas
+            else:
+                divergencias = diferencas_agregados(agregados, agregados_pandas)
+                if divergencias:
+                    st.warning(f"Agregações SQL e pandas divergem em: {', '.join(divergencias)}")
+
+        # Prepara dados para gráfico de crescimento acumulado
         try:
-            df_processado['data_pagamento'] = pd.to_datetime(df_processado['data_pagamento'], errors='coerce')
-            df_processado['valor_pago'] = pd.to_numeric(df_processado['valor_pago'], errors='coerce')
-            df_processado.dropna(subset=['data_pagamento', 'valor_pago'], inplace=True)
+            with medidor.etapa("crescimento_acumulado") as etapa:
+                agregados['df_grafico_acumulado'] = calcular_crescimento_acumulado(
+                    agregados['df_mensal_clientes'], top_n=GRAFICO_TOP_CLIENTES, max_pontos=GRAFICO_MAX_PONTOS
+                )
+                etapa.linhas = len(agregados['df_mensal_clientes'])
         except Exception as e:
-            st.error(f"Erro ao processar colunas de data ou valor: {e}")
-            df_processado = pd.DataFrame()
+            st.error(f"Erro ao calcular crescimento acumulado: {e}")
+            agregados['df_grafico_acumulado'] = pd.DataFrame()
 
-        if not df_processado.empty:
-            # Calcula métricas principais
-            total_revenue = df_processado['valor_pago'].sum()
-            num_unique_clients = df_processado['cliente_id'].nunique()
-            avg_payment_value = df_processado['valor_pago'].mean()
+        return agregados
 
-            # Prepara dados para gráfico de top clientes
-            df_top_clients = df_processado.groupby('cliente_nome')['valor_pago'].sum().sort_values(ascending=False).head(10).reset_index()
-            df_top_clients.rename(columns={'cliente_nome': 'Cliente', 'valor_pago': 'Total Pago'}, inplace=True)
-            df_top_clients = df_top_clients.set_index('Cliente')
 
-            # Prepara dados para tabela de últimos pagamentos
-            df_latest_payments = df_processado.head(10)
-
-            # Prepara dados para gráfico de crescimento acumulado
-            try:
-                df_crescimento = df_processado.sort_values(by=['cliente_id', 'data_pagamento']).copy()
-                df_crescimento['total_pago_cliente_acumulado'] = df_crescimento.groupby('cliente_id')['valor_pago'].cumsum()
-                df_crescimento['mes_pagamento'] = df_crescimento['data_pagamento'].dt.to_period('M').dt.to_timestamp()
-
-                df_mensal_acumulado = df_crescimento.groupby(['cliente_id', 'cliente_nome', 'mes_pagamento'])['total_pago_cliente_acumulado'].max().reset_index()
-                df_grafico_acumulado = df_mensal_acumulado.pivot_table(index='mes_pagamento', columns='cliente_nome', values='total_pago_cliente_acumulado', aggfunc='max')
-                df_grafico_acumulado = df_grafico_acumulado.fillna(method='ffill').fillna(0).reset_index()
-                df_grafico_acumulado.rename(columns={'mes_pagamento': 'Data Referência (Mês)'}, inplace=True)
-            except Exception as e:
-                st.error(f"Erro ao calcular crescimento acumulado: {e}")
-                df_grafico_acumulado = pd.DataFrame()
-
-            # Prepara dados para gráfico de total pago por mês
-            try:
-                df_mensal_sum = df_processado.copy()
-                df_mensal_sum['mes_pagamento'] = df_mensal_sum['data_pagamento'].dt.to_period('M').dt.to_timestamp()
-                df_mensal_sum = df_mensal_sum.groupby('mes_pagamento')['valor_pago'].sum().reset_index()
-                df_mensal_sum.rename(columns={'mes_pagamento': 'Mês Referência', 'valor_pago': 'Total Pago'}, inplace=True)
-                df_mensal_sum = df_mensal_sum.set_index('Mês Referência')
-            except Exception as e:
-                st.error(f"Erro ao calcular total pago por mês: {e}")
-                df_mensal_sum = pd.DataFrame()
-
-except fdb.DatabaseError as e:
-    st.error("Erro ao conectar ou operar no Banco de Dados Firebird!")
-    st.error(f"Detalhes: {e}")
-    st.warning("Verifique suas credenciais de banco de dados no arquivo `.streamlit/secrets.toml`.")
+def publicar_metricas(medidor):
+    """Grava as métricas da carga no log JSON e no arquivo do Prometheus, quando configurados."""
+    try:
+        if METRICAS_LOG:
+            registrar_json(METRICAS_LOG, medidor)
+        if METRICAS_PROMETHEUS:
+            gravar_prometheus(METRICAS_PROMETHEUS, medidor)
+    except OSError as e:
+        print(f"Não foi possível gravar as métricas: {e}") # Log para debug
 
-except AttributeError as e:
-     st.error(f"Erro ao acessar credenciais no secrets.toml: {e}")
-     st.warning(f"Verifique se as chaves 'connections.firebird.dsn', 'connections.firebird.user' e 'connections.firebird.password' estão corretamente definidas no seu arquivo `.streamlit/secrets.toml`.")
 
+def carregar_dados(filtro=SEM_FILTRO):
+    """Conecta ao banco, carrega e processa os dados do dashboard.
 
-except Exception as e:
-    st.error(f"Erro inesperado ao carregar dados do banco: {e}")
-
-finally:
-    # Garante que a conexão seja fechada mesmo que ocorra um erro
-    if cur is not None:
+    Retorna um dicionário com as métricas e DataFrames, ou None se a carga falhar
+    (os erros já são exibidos na página).
+    """
+    # --- Conecta ao banco de dados e carrega dados de pagamentos ---
+    # Usando as credenciais do arquivo .streamlit/secrets.toml
+    try:
+        # Acessa as credenciais Firebird a partir de st.secrets
+        # As chaves devem corresponder à estrutura definida no secrets.toml
+        pool = obter_pool(credenciais_streamlit(st.secrets))
+        medidor = Instrumentacao("dashboard", {"modo": MODO_AGREGACAO, "filtrado": int(filtro.ativo)}, METRICAS_MEMORIA)
         try:
-            cur.close()
-            # print("Cursor do banco de dados fechado.") # Log para debug
-        except Exception as e:
-            print(f"Erro ao fechar cursor: {e}") # Log para debug
-    if con is not None:
+            dados = com_retentativa(lambda: processar_dados(pool, filtro, medidor))
+        except BaseException:
+            publicar_metricas(medidor.finalizar(False))
+            raise
+        publicar_metricas(medidor.finalizar(True))
+        return dados
+
+    except fdb.DatabaseError as e:
+        st.error("Erro ao conectar ou operar no Banco de Dados Firebird!")
+        st.error(f"Detalhes: {e}")
+        st.warning("Verifique suas credenciais de banco de dados no arquivo `.streamlit/secrets.toml`.")
+
+    except AttributeError as e:
+         st.error(f"Erro ao acessar credenciais no secrets.toml: {e}")
+         st.warning(f"Verifique se as chaves 'connections.firebird.dsn', 'connections.firebird.user' e 'connections.firebird.password' estão corretamente definidas no seu arquivo `.streamlit/secrets.toml`.")
+
+
+    except Exception as e:
+        st.error(f"Erro inesperado ao carregar dados do banco: {e}")
+
+    return None
+
+
+# --- Filtros: vão para o WHERE das consultas, então só os dados do recorte saem do banco ---
+with st.sidebar.expander("Filtros", expanded=True):
+    periodo = st.date_input("Período dos pagamentos", value=())
+    cliente_filtro = st.text_input("Cliente (parte do nome)")
+periodo = tuple(periodo) if isinstance(periodo, (tuple, list)) else (periodo,)
+filtro = Filtro(
+    data_inicio=periodo[0] if len(periodo) >= 1 else None,
+    data_fim=periodo[1] if len(periodo) >= 2 else None,
+    cliente=cliente_filtro,
+)
+if filtro.ativo:
+    st.caption(f"Filtros: {filtro.descricao()}")
+
+cache = obter_cache(CACHE_TTL_SEGUNDOS, CACHE_MAX_ITENS)
+snapshot = SnapshotDisco(CACHE_DIRETORIO) if CACHE_DIRETORIO else None
+
+
+def ao_alterar_banco(eventos, credenciais):
+    """Roda na thread do ouvinte: atualiza os resumos afetados e descarta os dados carregados."""
+    print(f"Eventos do banco: {', '.join(f'{evento} ({contagem}x)' for evento, contagem in eventos.items())}") # Log para debug
+    modo = modo_resumos(eventos)
+    if MODO_AGREGACAO == "resumos" and EVENTOS_ATUALIZAR_RESUMOS and modo is not None and credenciais is not None:
         try:
-            con.close()
-            # print("Conexão com banco de dados fechada.") # Log para debug
+            pool = obter_pool(credenciais)
+            def atualizar():
+                with pool.leitura() as conexao:
+                    atualizar_resumos(conexao, ArmazenamentoResumos(RESUMOS_DIRETORIO), completo=modo == "completo")
+            com_retentativa(atualizar)
         except Exception as e:
-             print(f"Erro ao fechar conexão: {e}") # Log para debug
+            print(f"Não foi possível atualizar os resumos: {e}") # Log para debug
+    # Depois dos resumos: a próxima carga já lê os resumos novos
+    cache.invalidar()
+    if snapshot is not None:
+        snapshot.invalidar()
+
+
+ouvinte = None
+if EVENTOS_MODO in ("firebird", "simulado"):
+    try:
+        credenciais_eventos = credenciais_streamlit(st.secrets)
+    except Exception:
+        credenciais_eventos = None
+    if EVENTOS_MODO == "firebird" and credenciais_eventos is None:
+        st.warning("Eventos do banco desativados: credenciais não encontradas no `.streamlit/secrets.toml`.")
+    else:
+        criar_fonte = (lambda: FonteEventosFirebird(credenciais_eventos)) if EVENTOS_MODO == "firebird" else FonteEventosSimulada
+        ouvinte = obter_ouvinte(criar_fonte, lambda eventos: ao_alterar_banco(eventos, credenciais_eventos), EVENTOS_AGRUPAR_SEGUNDOS)
+elif EVENTOS_MODO:
+    st.warning(f"Opção `eventos = \"{EVENTOS_MODO}\"` inválida na seção [dashboard]; use \"firebird\" ou \"simulado\".")
+
+chave_cache = ("dashboard", MODO_AGREGACAO, VALIDAR_AGREGACAO, GRAFICO_TOP_CLIENTES, GRAFICO_MAX_PONTOS, *filtro.chave())
+dados_dashboard = cache.obter_ou_calcular(chave_cache, lambda: carregar_dados(filtro), snapshot)
+
+# Inicializa variáveis para evitar NameError caso a carga falhe
+conexao_ok = dados_dashboard is not None
+dados_dashboard = dados_dashboard or agregados_vazios()
+df_grafico_acumulado = dados_dashboard.get('df_grafico_acumulado', pd.DataFrame())
+df_mensal_sum = dados_dashboard['df_mensal_sum']
+total_revenue = dados_dashboard['total_revenue']
+num_unique_clients = dados_dashboard['num_unique_clients']
+avg_payment_value = dados_dashboard['avg_payment_value']
+df_top_clients = dados_dashboard['df_top_clients']
+df_latest_payments = dados_dashboard['df_latest_payments']
+
+# Estatísticas do cache para ajuste do TTL
+with st.sidebar.expander("Cache de dados"):
+    estatisticas_cache = cache.estatisticas()
+    st.write(f"Hits: {estatisticas_cache['hits']} (disco: {estatisticas_cache['hits_disco']})")
+    st.write(f"Misses: {estatisticas_cache['misses']}")
+    st.write(f"Taxa de acerto: {estatisticas_cache['taxa_acerto']:.0%}")
+    st.write(f"Itens: {estatisticas_cache['itens']}/{estatisticas_cache['max_itens']} · TTL: {estatisticas_cache['ttl_segundos']}s")
+    if ouvinte is not None:
+        estatisticas_eventos = ouvinte.estatisticas()
+        st.write(f"Eventos ({EVENTOS_MODO}): {'escutando' if estatisticas_eventos['ativo'] else 'parado'} · "
+                 f"{estatisticas_eventos['eventos_recebidos']} recebido(s), {estatisticas_eventos['alteracoes']} recarga(s)")
+        if estatisticas_eventos['ultimo_erro']:
+            st.caption(f"Último erro: {estatisticas_eventos['ultimo_erro']}")
+        if isinstance(ouvinte.fonte, FonteEventosSimulada):
+            evento_simulado = st.selectbox("Evento simulado", list(EVENTOS))
+            if st.button("Disparar evento"):
+                ouvinte.fonte.disparar(evento_simulado)
+                st.caption("Evento disparado: os dados serão recarregados no próximo rerun.")
+    if st.button("Recarregar dados"):
+        cache.invalidar()
+        if snapshot is not None:
+            snapshot.invalidar()
+        st.rerun()
 
 # Exibe métricas principais no topo
 st.subheader("Métricas Principais")
@@ -186,6 +314,7 @@ st.markdown("---")
 
 # Exibe gráfico de crescimento acumulado
 st.subheader("Crescimento do Pagamento Acumulado por Cliente")
+st.caption(f"Top {GRAFICO_TOP_CLIENTES} clientes por total pago; os demais aparecem somados em \"Outros\".")
 if not df_grafico_acumulado.empty:
     coluna_data_x = 'Data Referência (Mês)'
     if coluna_data_x in df_grafico_acumulado.columns and len(df_grafico_acumulado.columns) > 1:
@@ -217,11 +346,49 @@ with col_latest_payments:
 
 st.markdown("---")
 
+def navegar_pagamentos():
+    """Navegação paginada pelos pagamentos: cada página é buscada no banco sob demanda."""
+    col_ordem, col_tamanho = st.columns(2)
+    ordem = col_ordem.selectbox("Ordenação", list(ORDENACOES), key="paginacao_ordem")
+    tamanho = col_tamanho.selectbox("Linhas por página", TAMANHOS_PAGINA, index=1, key="paginacao_tamanho")
+
+    # Pilha com o cursor de início de cada página visitada; muda a ordenação ou o tamanho, volta ao início
+    if st.session_state.get("paginacao_config") != (ordem, tamanho, filtro.chave()):
+        st.session_state["paginacao_config"] = (ordem, tamanho, filtro.chave())
+        st.session_state["paginacao_cursores"] = [None]
+    cursores = st.session_state["paginacao_cursores"]
+
+    try:
+        pool = obter_pool(credenciais_streamlit(st.secrets))
+        df_pagina, proximo_cursor = buscar_pagina(pool.consultar, ORDENACOES[ordem], tamanho, cursores[-1], filtro)
+    except Exception as e:
+        st.error(f"Erro ao buscar a página de pagamentos: {e}")
+        return
+
+    if df_pagina.empty:
+        st.info("Nenhum pagamento encontrado.")
+        return
+    st.caption(f"Página {len(cursores)} · {len(df_pagina)} linha(s)")
+    st.dataframe(df_pagina)
+
+    def voltar_ao_inicio():
+        del cursores[1:]
+
+    col_primeira, col_anterior, col_proxima = st.columns(3)
+    col_primeira.button("Primeira página", disabled=len(cursores) == 1, on_click=voltar_ao_inicio)
+    col_anterior.button("Página anterior", disabled=len(cursores) == 1, on_click=cursores.pop)
+    col_proxima.button("Próxima página", disabled=proximo_cursor is None, on_click=cursores.append, args=(proximo_cursor,))
+
+
+# Com st.fragment, trocar de página reexecuta só a navegação e não o dashboard inteiro
+if hasattr(st, "fragment"):
+    navegar_pagamentos = st.fragment(navegar_pagamentos)
+
 # Expander para exibir os dados brutos
 with st.expander("Ver Dados Brutos de Pagamentos"):
-    st.subheader("Dados Brutos da Tabela PAGAMENTOS (Primeiras 100 Linhas)")
-    if not df.empty:
-        st.dataframe(df.head(100))
+    st.subheader("Dados Brutos da Tabela PAGAMENTOS")
+    if conexao_ok:
+        navegar_pagamentos()
     else:
         st.info("Nenhum dado bruto carregado.")
 
@@ -233,7 +400,10 @@ st.write("Clique no botão abaixo para que a IA gere insights sobre seus dados d
 # --- Configurar API da IA (sem listar modelos para evitar erro) ---
 # Esta parte já estava usando st.secrets, mantida e ajustada para melhor feedback de erro
 try:
-    if "GOOGLE_API_KEY" in st.secrets:
+    if IA_MODELO == MODELO_STUB:
+        # Modelo local de teste: não chama a API nem precisa de chave
+        api_configured = True
+    elif "GOOGLE_API_KEY" in st.secrets:
         genai.configure(api_key=st.secrets["GOOGLE_API_KEY"])
         # st.success("API da IA configurada.") # Removido para manter a interface limpa
         api_configured = True
@@ -246,63 +416,71 @@ except Exception as e:
     api_configured = False
 # --- Fim da Configuração da API ---
 
+# Respostas ficam em cache no disco (mesmos dados + mesmo modelo = sem nova chamada)
+# e a geração roda em segundo plano, sem travar o restante do dashboard
+cache_insights = CacheRespostas(IA_CACHE_DIRETORIO, IA_CACHE_MAX_ITENS, IA_CACHE_TTL_SEGUNDOS)
+gerador_insights = obter_gerador()
+
+
+# --- Preparar os dados para a IA ---
+# Estatísticas compactas (tendência, crescimento, quantis) no lugar das tabelas completas,
+# dentro do orçamento de tokens; o tamanho e o custo aparecem antes da chamada
+dados_suficientes = not df_mensal_sum.empty and not df_top_clients.empty and conexao_ok
+if dados_suficientes:
+    prompt_ia = compactar_prompt(
+        df_mensal_sum, df_top_clients, total_revenue, num_unique_clients, avg_payment_value,
+        orcamento_tokens=IA_ORCAMENTO_TOKENS, preco_milhao_tokens=IA_PRECO_MILHAO_TOKENS, formatar=formatar_moeda,
+    )
+    st.caption(
+        f"Prompt: ~{prompt_ia.tokens} tokens (orçamento {prompt_ia.orcamento_tokens}), "
+        f"{len(prompt_ia.texto)} caracteres, custo estimado de entrada US$ {prompt_ia.custo_estimado:.6f}"
+    )
+    if not prompt_ia.dentro_do_orcamento:
+        st.warning("O prompt mais resumido ainda excede o orçamento de tokens configurado.")
 
 # Botão para gerar insights usando IA
 if st.button("Gerar Insights de Negócios por IA"):
     # Só tenta gerar insights se a API estiver configurada, houver dados e a conexão com DB foi bem sucedida
-    if api_configured and not df_mensal_sum.empty and not df_top_clients.empty and con is not None: # Verifica se con não é None
-
-        # --- Preparar os dados para a IA ---
-        insights_data = {
-            "Receita Total Geral": formatar_moeda(total_revenue),
-            "Número de Clientes Únicos com Pagamento": num_unique_clients,
-            "Valor Médio por Pagamento": formatar_moeda(avg_payment_value),
-            "Total Pago por Mês (Dados)": df_mensal_sum.to_markdown(),
-            "Top 10 Clientes por Total Pago (Dados)": df_top_clients.to_markdown(),
-        }
-
-        # --- Construir o Prompt para a IA ---
-        prompt = """
-        Analise os dados de pagamentos de uma empresa fornecidos abaixo.
-        Forneça insights de negócios em formato de bullet points fáceis de entender.
-        Identifique tendências no crescimento mensal total e nos pagamentos por cliente.
-        Sugira possíveis áreas para focar para aumentar a receita ou reter clientes.
-
-        Dados para Análise:
-        """
-        for key, value in insights_data.items():
-            prompt += f"\n\n## {key}:\n{value}"
-        prompt += """
-
-        Com base nesses dados, quais são os principais insights e recomendações de negócios?
-        """
-
-        # --- Chamar a API da IA ---
-        try:
-         
-            model_name_to_try = 'models/gemini-2.0-flash'
-
-            model = genai.GenerativeModel(model_name_to_try)
-
-            # Mostra um indicador de carregamento
-            with st.spinner(f"A IA ({model_name_to_try}) está analisando os dados e gerando insights..."):
-                response = model.generate_content(prompt)
-
-            # --- Exibir os Insights ---
-            st.subheader("Insights Gerados pela IA:")
-            st.write(response.text)
-
-        except Exception as e:
-            # Este except agora vai capturar erros como o 404 de modelo não encontrado
-            # ou outros erros na chamada da API
-            st.error(f"Erro ao chamar a API da IA: {e}")
-            st.warning(f"Pode ser que o modelo '{model_name_to_try}' não esteja disponível para sua chave ou região, ou que haja outro problema na chamada.")
-            st.info("Se o erro persistir, tente alterar o nome do modelo na linha `model_name_to_try` para outro nome como 'models/gemini-1.0-pro'.")
+    if api_configured and dados_suficientes: # Verifica se os dados foram carregados do banco
 
+        # --- Pedir os insights (do cache ou em segundo plano) ---
+        chave_insights = chave_resposta(prompt_ia.dados, IA_MODELO)
+        gerador_insights.solicitar(chave_insights, prompt_ia.texto, IA_MODELO, cache_insights)
+        st.session_state["insights_chave"] = chave_insights
 
     elif not api_configured:
         st.warning("Não é possível gerar insights: A API da IA não foi configurada corretamente. Verifique o arquivo `.streamlit/secrets.toml`.")
-    elif con is None: # Verifica se a conexão com o DB falhou
+    elif not conexao_ok: # Verifica se a conexão com o DB falhou
          st.warning("Não é possível gerar insights: Falha ao conectar ao banco de dados.")
     else:
-        st.info("Dados insuficientes para gerar insights. Verifique se os DataFrames de resumo não estão vazios após carregar os dados.")
\ No newline at end of file
+        st.info("Dados insuficientes para gerar insights. Verifique se os DataFrames de resumo não estão vazios após carregar os dados.")
+
+
+def exibir_insights():
+    """Mostra a situação do último pedido de insights desta sessão."""
+    chave_insights = st.session_state.get("insights_chave")
+    if chave_insights is None:
+        return
+    situacao, resultado = gerador_insights.situacao(chave_insights, cache_insights)
+
+    if situacao == "gerando":
+        st.info(f"A IA ({IA_MODELO}) está analisando os dados e gerando insights... O restante do dashboard continua disponível.")
+        if not hasattr(st, "fragment"):
+            st.button("Verificar resultado")
+    elif situacao == "pronto":
+        # --- Exibir os Insights ---
+        st.subheader("Insights Gerados pela IA:")
+        st.write(resultado)
+    else:
+        del st.session_state["insights_chave"]
+        if situacao == "erro":
+            # Erros como o 404 de modelo não encontrado ou outros erros na chamada da API
+            st.error(f"Erro ao chamar a API da IA: {resultado}")
+            st.warning(f"Pode ser que o modelo '{IA_MODELO}' não esteja disponível para sua chave ou região, ou que haja outro problema na chamada.")
+            st.info("Se o erro persistir, altere `ia_modelo` na seção [dashboard] do secrets.toml para outro nome como 'models/gemini-1.0-pro'.")
+
+
+# Nas versões do Streamlit com st.fragment, só este trecho é reexecutado para acompanhar a geração
+if hasattr(st, "fragment"):
+    exibir_insights = st.fragment(run_every=2)(exibir_insights)
+exibir_insights()
@@ -0,0 +1,287 @@
+"""Invalidação do cache por eventos do Firebird (POST_EVENT), sem consultas periódicas.
+
+Gatilhos em PAGAMENTOS, CONTRATOS e CLIENTES publicam eventos com POST_EVENT.
+O Firebird só entrega o evento quando a transação é confirmada e junta os
+eventos repetidos de uma mesma transação, então uma carga com milhares de
+linhas gera um único aviso. Uma thread do processo (OuvinteEventos) espera os
+eventos em uma conexão própria e chama `ao_alterar` com os nomes recebidos:
+os dados só são recarregados quando algo mudou de fato.
+
+Para testes sem banco, FonteEventosSimulada faz o papel do Firebird.
+
+Uso: python eventos.py [--aplicar | --remover]  (cria ou remove os gatilhos)
+"""
+import argparse
+import queue
+import threading
+import time
+
+import fdb
+from dotenv import load_dotenv
+
+from banco import credenciais_env
+
+# Eventos publicados pelos gatilhos: nome -> (tabela, operações do gatilho, atualização dos resumos).
+# Inserções em PAGAMENTOS entram nos resumos de forma incremental (pelo ID); alterações e
+# exclusões, ou mudanças de contrato e cliente (nome, vínculo), exigem a reconstrução completa.
+# Inserir um cliente ou contrato sem pagamentos não muda o dashboard e não publica evento.
+EVENTOS = {
+    "PAGAMENTOS_INSERIDOS": ("PAGAMENTOS", "INSERT", "incremental"),
+    "PAGAMENTOS_ALTERADOS": ("PAGAMENTOS", "UPDATE OR DELETE", "completo"),
+    "CONTRATOS_ALTERADOS": ("CONTRATOS", "UPDATE OR DELETE", "completo"),
+    "CLIENTES_ALTERADOS": ("CLIENTES", "UPDATE OR DELETE", "completo"),
+}
+
+# Espera máxima de cada `aguardar`: define em quanto tempo a thread percebe o pedido de parada
+ESPERA_SEGUNDOS = 1.0
+
+
+def nome_gatilho(evento):
+    return f"TRG_EVT_{evento}"
+
+
+def ddl_gatilhos():
+    """CREATE OR ALTER TRIGGER de cada evento (podem ser reaplicados)."""
+    comandos = []
+    for evento, (tabela, operacoes, _) in EVENTOS.items():
+        comandos.append(
+            f"CREATE OR ALTER TRIGGER {nome_gatilho(evento)} FOR {tabela}\n"
+            f"ACTIVE AFTER {operacoes} POSITION 100\n"
+            f"AS\nBEGIN\n  POST_EVENT '{evento}';\nEND"
+        )
+    return comandos
+
+
+def ddl_remover_gatilhos():
+    return [f"DROP TRIGGER {nome_gatilho(evento)}" for evento in EVENTOS]
+
+
+def modo_resumos(eventos):
+    """'completo', 'incremental' ou None (os eventos não afetam os resumos)."""
+    modos = {EVENTOS[evento][2] for evento in eventos if evento in EVENTOS}
+    if "completo" in modos:
+        return "completo"
+    return "incremental" if modos else None
+
+
+class FonteEventosFirebird:
+    """Eventos do banco via `event_conduit` do fdb, em uma conexão exclusiva.
+
+    A conexão não vem do pool: ela fica bloqueada esperando eventos. O
+    servidor entrega os eventos por uma segunda porta (RemoteAuxPort no
+    firebird.conf), que precisa estar liberada no firewall.
+    """
+
+    def __init__(self, credenciais, eventos=tuple(EVENTOS)):
+        self.con = fdb.connect(**credenciais)
+        try:
+            self.conduit = self.con.event_conduit(list(eventos))
+            # No fdb 2.x a escuta só começa com begin(); no 1.x já começa ao criar
+            if hasattr(self.conduit, "begin"):
+                self.conduit.begin()
+        except Exception:
+            self.con.close()
+            raise
+
+    def aguardar(self, timeout):
+        """{evento: contagem} dos eventos recebidos; vazio se o tempo acabar."""
+        recebidos = self.conduit.wait(timeout) or {}
+        return {evento: contagem for evento, contagem in recebidos.items() if contagem}
+
+    def fechar(self):
+        try:
+            self.conduit.close()
+        finally:
+            self.con.close()
+
+
+class FonteEventosSimulada:
+    """Substitui o banco em testes offline: `disparar` faz o papel de um commit com POST_EVENT."""
+
+    def __init__(self, eventos=tuple(EVENTOS)):
+        self.eventos = set(eventos)
+        self._fila = queue.Queue()
+
+    def disparar(self, evento, contagem=1):
+        if evento not in self.eventos:
+            raise ValueError(f"Evento '{evento}' não registrado. Use um de: {', '.join(sorted(self.eventos))}.")
+        self._fila.put((evento, contagem))
+
+    def aguardar(self, timeout):
+        try:
+            evento, contagem = self._fila.get(timeout=timeout)
+        except queue.Empty:
+            return {}
+        # Como no Firebird, os eventos pendentes chegam juntos em uma única entrega
+        recebidos = {evento: contagem}
+        while True:
+            try:
+                evento, contagem = self._fila.get_nowait()
+            except queue.Empty:
+                return recebidos
+            recebidos[evento] = recebidos.get(evento, 0) + contagem
+
+    def fechar(self):
+        pass
+
+
+class OuvinteEventos:
+    """Thread que espera os eventos e chama `ao_alterar(eventos)` quando algo muda.
+
+    Eventos que chegam em até `agrupar_segundos` depois do primeiro são
+    entregues juntos (várias transações seguidas geram uma recarga só). Se a
+    conexão cair, a fonte é recriada com espera crescente; como eventos podem
+    ter se perdido nesse intervalo, a reconexão conta como alteração em todas
+    as tabelas.
+    """
+
+    def __init__(self, criar_fonte, ao_alterar, agrupar_segundos=1.0, espera_reconexao=5.0):
+        self.criar_fonte = criar_fonte
+        self.ao_alterar = ao_alterar
+        self.agrupar_segundos = agrupar_segundos
+        self.espera_reconexao = espera_reconexao
+        self.fonte = None
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.eventos_recebidos = 0
+        self.alteracoes = 0
+        self.reconexoes = 0
+        self.ultima_alteracao = None
+        self.ultimo_erro = None
+
+    def iniciar(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._parar.clear()
+                self._thread = threading.Thread(target=self._executar, name="ouvinte-eventos", daemon=True)
+                self._thread.start()
+        return self
+
+    def _conectar(self):
+        espera = self.espera_reconexao
+        while not self._parar.is_set():
+            try:
+                self.fonte = self.criar_fonte()
+                return True
+            except Exception as e:
+                self.ultimo_erro = f"{type(e).__name__}: {e}"
+                print(f"Não foi possível escutar os eventos do banco ({e}); nova tentativa em {espera:.0f}s...") # Log para debug
+                self._parar.wait(espera)
+                espera = min(espera * 2, 300)
+        return False
+
+    def _executar(self):
+        primeira = True
+        while self._conectar():
+            if not primeira:
+                self.reconexoes += 1
+                self._notificar({evento: 1 for evento in EVENTOS})
+            primeira = False
+            try:
+                while not self._parar.is_set():
+                    recebidos = self.fonte.aguardar(ESPERA_SEGUNDOS)
+                    if not recebidos:
+                        continue
+                    limite = time.monotonic() + self.agrupar_segundos
+                    while (restante := limite - time.monotonic()) > 0:
+                        for evento, contagem in self.fonte.aguardar(restante).items():
+                            recebidos[evento] = recebidos.get(evento, 0) + contagem
+                    self._notificar(recebidos)
+            except Exception as e:
+                self.ultimo_erro = f"{type(e).__name__}: {e}"
+                print(f"Escuta de eventos interrompida: {e}") # Log para debug
+                self._fechar_fonte()
+                self._parar.wait(self.espera_reconexao)
+            finally:
+                self._fechar_fonte()
+
+    def _notificar(self, recebidos):
+        self.eventos_recebidos += sum(recebidos.values())
+        try:
+            self.ao_alterar(recebidos)
+            self.alteracoes += 1
+            self.ultima_alteracao = time.time()
+        except Exception as e:
+            self.ultimo_erro = f"{type(e).__name__}: {e}"
+            print(f"Erro ao tratar os eventos {', '.join(recebidos)}: {e}") # Log para debug
+
+    def _fechar_fonte(self):
+        fonte, self.fonte = self.fonte, None
+        if fonte is not None:
+            try:
+                fonte.fechar()
+            except Exception:
+                pass
+
+    def ativo(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def parar(self, timeout=None):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout if timeout is not None else ESPERA_SEGUNDOS + self.agrupar_segundos + 1)
+
+    def estatisticas(self):
+        return {
+            "ativo": self.ativo(),
+            "eventos_recebidos": self.eventos_recebidos,
+            "alteracoes": self.alteracoes,
+            "reconexoes": self.reconexoes,
+            "ultima_alteracao": self.ultima_alteracao,
+            "ultimo_erro": self.ultimo_erro,
+        }
+
+
+_ouvinte_global = None
+_lock_global = threading.Lock()
+
+
+def obter_ouvinte(criar_fonte, ao_alterar, agrupar_segundos=1.0):
+    """Ouvinte do processo (compartilhado por reruns e sessões do Streamlit), já iniciado."""
+    global _ouvinte_global
+    with _lock_global:
+        if _ouvinte_global is None:
+            _ouvinte_global = OuvinteEventos(criar_fonte, ao_alterar, agrupar_segundos)
+        return _ouvinte_global.iniciar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cria os gatilhos que publicam eventos de alteração (POST_EVENT).")
+    acao = parser.add_mutually_exclusive_group()
+    acao.add_argument("--aplicar", action="store_true", help="Cria ou atualiza os gatilhos (sem isso, só mostra o DDL)")
+    acao.add_argument("--remover", action="store_true", help="Remove os gatilhos")
+    args = parser.parse_args()
+
+    comandos = ddl_remover_gatilhos() if args.remover else ddl_gatilhos()
+    if not (args.aplicar or args.remover):
+        print("Simulação: nada foi alterado. Rode com --aplicar para executar:\n")
+        for comando in comandos:
+            print(f"{comando};\n")
+        return
+
+    load_dotenv()
+    con = None
+    try:
+        con = fdb.connect(**credenciais_env())
+        cur = con.cursor()
+        for comando in comandos:
+            print(f"Executando: {comando.splitlines()[0]}")
+            cur.execute(comando)
+        con.commit()
+        print(f"\n{len(comandos)} gatilho(s) {'removido(s)' if args.remover else 'criado(s) ou atualizado(s)'}. 🚀")
+
+    except fdb.DatabaseError as e:
+        print("Erro ao conectar ou alterar o Banco de Dados!")
+        print(f"Detalhes: {e}")
+
+    except Exception as e:
+        print(f"Erro inesperado: {e}")
+
+    finally:
+        if con is not None:
+            con.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+import os
+import re
+from decimal import Decimal
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+from instrumentacao import SEM_MEDICAO
+
+# Linhas de dados por aba: o Excel aceita 1.048.576 linhas, uma delas é o cabeçalho
+LIMITE_LINHAS_XLSX = 1_048_575
+
+# Estilo do cabeçalho das planilhas
+HEADER_FONT = Font(bold=True, color="FFFFFF")
+HEADER_FILL = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
+HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="center")
+
+
+def larguras_colunas(df, colunas=None):
+    """Calcula a largura de cada coluna (maior texto + 2) de forma vetorizada.
+
+    Colunas inteiras usam apenas o mínimo e o máximo; as demais são convertidas
+    para texto de uma vez com `astype(str).str.len()`. Valores nulos são ignorados.
+    """
+    colunas = list(df.columns) if colunas is None else list(colunas)
+    larguras = []
+    for coluna in colunas:
+        max_length = len(str(coluna))
+        serie = df[coluna].dropna() if coluna in df.columns else pd.Series(dtype=object)
+        if not serie.empty:
+            if pd.api.types.is_integer_dtype(serie):
+                max_length = max(max_length, len(str(serie.min())), len(str(serie.max())))
+            else:
+                max_length = max(max_length, int(serie.astype(str).str.len().max()))
+        larguras.append(max_length + 2)
+    return larguras
+
+
+def decimais_para_float(df):
+    """Converte as colunas NUMERIC/DECIMAL (Decimal no fdb) para float64.
+
+    Sem isso, o CSV grava Decimal com ponto (o `decimal=","` só vale para
+    float) e o Parquet fixa a precisão decimal pelo primeiro lote.
+    """
+    colunas = []
+    for coluna in df.columns:
+        if df[coluna].dtype != object:
+            continue
+        valores = df[coluna].dropna()
+        if not valores.empty and isinstance(valores.iloc[0], Decimal):
+            colunas.append(coluna)
+    if not colunas:
+        return df
+    return df.astype({coluna: float for coluna in colunas})
+
+
+def ajustar_extensao(caminho, extensao):
+    """Troca a extensão do caminho de saída pela extensão do motor escolhido."""
+    base, atual = os.path.splitext(caminho)
+    if atual.lower() == extensao:
+        return caminho
+    return base + extensao
+
+
+class Exportador:
+    """Base dos motores de saída.
+
+    Uso:
+        with criar_exportador("xlsx", caminho).abrir(colunas, larguras) as exp:
+            exp.escrever(df_lote)
+
+    Os dados são gravados em um arquivo temporário que só substitui o arquivo
+    final quando o bloco termina sem erros.
+    """
+
+    extensao = ""
+    # Se o motor consegue acrescentar linhas ao arquivo existente sem reescrevê-lo
+    suporta_acrescimo = False
+    # Instrumentação das etapas "gravar" (append das linhas) e "salvar" (fechamento do arquivo)
+    medidor = SEM_MEDICAO
+
+    def __init__(self, caminho):
+        self.caminho = ajustar_extensao(caminho, self.extensao)
+        self.caminho_temporario = self.caminho + ".tmp"
+        self.colunas = []
+        self.linhas_escritas = 0
+
+    def abrir(self, colunas, larguras=None):
+        self.colunas = list(colunas)
+        if os.path.exists(self.caminho_temporario):
+            os.remove(self.caminho_temporario)
+        self._abrir(larguras)
+        return self
+
+    def escrever(self, df):
+        if df.empty:
+            return
+        with self.medidor.etapa("gravar", linhas=len(df)):
+            self._escrever(df)
+        self.linhas_escritas += len(df)
+
+    def fechar(self):
+        with self.medidor.etapa("salvar") as etapa:
+            self._fechar()
+            # os.replace falha com PermissionError se o arquivo final estiver aberto
+            os.replace(self.caminho_temporario, self.caminho)
+            etapa.bytes = os.path.getsize(self.caminho)
+
+    def descartar(self):
+        try:
+            self._fechar()
+        except Exception:
+            pass
+        if os.path.exists(self.caminho_temporario):
+            os.remove(self.caminho_temporario)
+
+    def reescrever(self, df):
+        """Regrava o arquivo inteiro a partir de um DataFrame (usado na mesclagem incremental)."""
+        with self.abrir(df.columns, larguras_colunas(df)):
+            self.escrever(df)
+
+    def ler(self):
+        """Lê o arquivo de saída existente em um DataFrame."""
+        raise NotImplementedError
+
+    def acrescentar(self, df):
+        raise NotImplementedError(f"O formato '{self.extensao}' não permite acrescentar linhas.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.fechar()
+        else:
+            self.descartar()
+        return False
+
+    def _abrir(self, larguras):
+        raise NotImplementedError
+
+    def _escrever(self, df):
+        raise NotImplementedError
+
+    def _fechar(self):
+        raise NotImplementedError
+
+
+class ExportadorXlsx(Exportador):
+    """Planilha Excel gravada em modo write-only (uma linha por vez, sem manter células em memória).
+
+    Ao passar de `limite_linhas` linhas, a aba continua em uma nova aba
+    ("Dados Tratados (2)", ...); `partes` lista a faixa de linhas de cada aba.
+    """
+
+    extensao = ".xlsx"
+    titulo_planilha = "Dados Tratados"
+    limite_linhas = LIMITE_LINHAS_XLSX
+
+    def _abrir(self, larguras):
+        self.wb = Workbook(write_only=True)
+        self.partes = []
+        self._criar_planilha(self.titulo_planilha, larguras)
+
+    def nova_planilha(self, titulo, colunas, larguras=None):
+        """Começa outra aba no mesmo arquivo; as abas anteriores não recebem mais linhas (write-only)."""
+        self.colunas = list(colunas)
+        self._criar_planilha(titulo, larguras)
+
+    def _criar_planilha(self, titulo, larguras, continuacao=False):
+        if not continuacao:
+            self._titulo_base = titulo
+            self._larguras = larguras
+            self._continuacoes = 1
+        self.ws = self.wb.create_sheet(titulo)
+        self._linhas_planilha = 0
+        # Uma continuação pode começar no meio de um lote, antes de linhas_escritas ser atualizado
+        primeira = self.partes[-1]["ultima_linha"] + 1 if continuacao else self.linhas_escritas + 1
+        self.partes.append({"planilha": titulo, "primeira_linha": primeira, "ultima_linha": primeira - 1})
+
+        # No modo write-only as larguras precisam ser definidas antes da primeira linha
+        for indice, largura in enumerate(larguras or [], start=1):
+            self.ws.column_dimensions[get_column_letter(indice)].width = largura
+
+        cabecalho = []
+        for coluna in self.colunas:
+            cell = WriteOnlyCell(self.ws, value=coluna)
+            cell.font = HEADER_FONT
+            cell.fill = HEADER_FILL
+            cell.alignment = HEADER_ALIGNMENT
+            cabecalho.append(cell)
+        self.ws.append(cabecalho)
+
+    def ler(self):
+        # A aba principal e as continuações ("Dados Tratados (2)", ...), na ordem
+        planilhas = pd.read_excel(self.caminho, sheet_name=None)
+        partes = [df for titulo, df in planilhas.items() if titulo == self.titulo_planilha or _continuacao_de(titulo, self.titulo_planilha)]
+        return pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0]
+
+    def _escrever(self, df):
+        inicio = 0
+        while inicio < len(df):
+            if self._linhas_planilha >= self.limite_linhas:
+                self._continuacoes += 1
+                self._criar_planilha(_titulo_continuacao(self._titulo_base, self._continuacoes), self._larguras, continuacao=True)
+            fim = min(len(df), inicio + self.limite_linhas - self._linhas_planilha)
+            for row in df.iloc[inicio:fim].itertuples(index=False, name=None):
+                self.ws.append(row)
+            self._linhas_planilha += fim - inicio
+            # linhas_escritas só é atualizado depois do lote inteiro (Exportador.escrever)
+            self.partes[-1]["ultima_linha"] = self.linhas_escritas + fim
+            inicio = fim
+
+    def _fechar(self):
+        if getattr(self, "wb", None) is not None:
+            # Grava com o nome final do arquivo temporário (o openpyxl não exige a extensão)
+            self.wb.save(self.caminho_temporario)
+            self.wb = None
+
+
+def _titulo_continuacao(titulo, numero):
+    sufixo = f" ({numero})"
+    # O Excel limita o nome da aba a 31 caracteres
+    return titulo[:31 - len(sufixo)] + sufixo
+
+
+def _continuacao_de(titulo, titulo_base):
+    numero = re.fullmatch(r".* \((\d+)\)", titulo)
+    return numero is not None and titulo == _titulo_continuacao(titulo_base, int(numero.group(1)))
+
+
+class ExportadorCsv(Exportador):
+    """Arquivo CSV no padrão do Excel brasileiro (separador ';' e UTF-8 com BOM)."""
+
+    extensao = ".csv"
+    suporta_acrescimo = True
+
+    def __init__(self, caminho, separador=";", decimal=","):
+        super().__init__(caminho)
+        self.separador = separador
+        self.decimal = decimal
+
+    def _abrir(self, larguras):
+        self.arquivo = open(self.caminho_temporario, "w", encoding="utf-8-sig", newline="")
+        pd.DataFrame(columns=self.colunas).to_csv(self.arquivo, sep=self.separador, index=False)
+
+    def _escrever(self, df):
+        decimais_para_float(df).to_csv(self.arquivo, sep=self.separador, decimal=self.decimal, index=False, header=False)
+
+    def ler(self):
+        return pd.read_csv(self.caminho, sep=self.separador, decimal=self.decimal, encoding="utf-8-sig")
+
+    def acrescentar(self, df):
+        if df.empty:
+            return
+        with open(self.caminho, "a", encoding="utf-8", newline="") as arquivo:
+            decimais_para_float(df).to_csv(arquivo, sep=self.separador, decimal=self.decimal, index=False, header=False)
+        self.linhas_escritas += len(df)
+
+    def _fechar(self):
+        if getattr(self, "arquivo", None) is not None:
+            self.arquivo.close()
+            self.arquivo = None
+
+
+class ExportadorParquet(Exportador):
+    """Arquivo Parquet colunar (requer o pacote `pyarrow`). Cada lote vira um row group."""
+
+    extensao = ".parquet"
+
+    def _abrir(self, larguras):
+        try:
+            import pyarrow  # noqa: F401
+            import pyarrow.parquet  # noqa: F401
+        except ImportError as e:
+            raise RuntimeError("O formato 'parquet' requer o pacote 'pyarrow' (pip install pyarrow).") from e
+        self.escritor = None
+
+    def _escrever(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # Decimal viraria decimal128 com a precisão do primeiro lote: um valor maior depois não caberia
+        tabela = pa.Table.from_pandas(decimais_para_float(df), preserve_index=False)
+        if self.escritor is None:
+            self.escritor = pq.ParquetWriter(self.caminho_temporario, tabela.schema)
+        else:
+            tabela = tabela.cast(self.escritor.schema)
+        self.escritor.write_table(tabela)
+
+    def ler(self):
+        return pd.read_parquet(self.caminho)
+
+    def _fechar(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if getattr(self, "escritor", None) is not None:
+            self.escritor.close()
+            self.escritor = None
+        elif not os.path.exists(self.caminho_temporario):
+            # Nenhum lote gravado: gera um arquivo vazio apenas com as colunas
+            vazio = pa.Table.from_pandas(pd.DataFrame(columns=self.colunas), preserve_index=False)
+            pq.write_table(vazio, self.caminho_temporario)
+
+
+MOTORES = {
+    "xlsx": ExportadorXlsx,
+    "csv": ExportadorCsv,
+    "parquet": ExportadorParquet,
+}
+
+
+def criar_exportador(formato, caminho, medidor=None, **opcoes):
+    """Cria o motor de saída correspondente ao formato configurado."""
+    try:
+        motor = MOTORES[formato.strip().lower()]
+    except KeyError:
+        raise ValueError(f"Formato de saída '{formato}' não suportado. Use um de: {', '.join(MOTORES)}.")
+    exportador = motor(caminho, **opcoes)
+    if medidor is not None:
+        exportador.medidor = medidor
+    return exportador
@@ -0,0 +1,60 @@
+from datetime import date, datetime, time, timedelta
+
+
+class Filtro:
+    """Filtros do dashboard aplicados no WHERE das consultas (não no pandas).
+
+    `sql` é um trecho " AND ..." sobre os aliases `pag` (PAGAMENTOS) e `cli`
+    (CLIENTES) das consultas do projeto; `parametros` são os valores dos `?`,
+    na mesma ordem.
+    """
+
+    def __init__(self, data_inicio=None, data_fim=None, cliente=None):
+        self.data_inicio = data_inicio
+        self.data_fim = data_fim
+        self.cliente = (cliente or "").strip() or None
+
+        predicados, parametros = [], []
+        if data_inicio is not None:
+            predicados.append("pag.DATA_PAGAMENTO >= ?")
+            parametros.append(_inicio_do_dia(data_inicio))
+        if data_fim is not None:
+            # Data final inclusiva: até o início do dia seguinte (mantém o uso do índice)
+            predicados.append("pag.DATA_PAGAMENTO < ?")
+            parametros.append(_inicio_do_dia(data_fim) + timedelta(days=1))
+        if self.cliente is not None:
+            # CONTAINING: busca por parte do nome, sem diferenciar maiúsculas e minúsculas
+            predicados.append("cli.NOME CONTAINING ?")
+            parametros.append(self.cliente)
+
+        self.sql = "".join(f" AND {predicado}" for predicado in predicados)
+        self.parametros = tuple(parametros)
+
+    @property
+    def ativo(self):
+        return bool(self.parametros)
+
+    def chave(self):
+        """Identifica o filtro na chave do cache."""
+        return (self.data_inicio, self.data_fim, self.cliente)
+
+    def descricao(self):
+        partes = []
+        if self.data_inicio is not None:
+            partes.append(f"de {self.data_inicio:%d/%m/%Y}")
+        if self.data_fim is not None:
+            partes.append(f"até {self.data_fim:%d/%m/%Y}")
+        if self.cliente is not None:
+            partes.append(f"cliente contendo '{self.cliente}'")
+        return ", ".join(partes) or "sem filtros"
+
+
+def _inicio_do_dia(valor):
+    if isinstance(valor, datetime):
+        return valor.replace(hour=0, minute=0, second=0, microsecond=0)
+    if isinstance(valor, date):
+        return datetime.combine(valor, time.min)
+    raise TypeError(f"Data inválida no filtro: {valor!r}")
+
+
+SEM_FILTRO = Filtro()
@@ -0,0 +1,172 @@
+import zlib
+
+import numpy as np
+
+# Ordem de inserção respeitando as chaves estrangeiras:
+# CATEGORIAS/ENDERECOS -> CLIENTES/PRODUTOS -> CONTRATOS -> PAGAMENTOS
+ORDEM_TABELAS = [
+    "CATEGORIAS",
+    "ENDERECOS",
+    "CLIENTES",
+    "PRODUTOS",
+    "FUNCIONARIOS",
+    "CONTRATOS",
+    "PAGAMENTOS",
+]
+
+COLUNAS = {
+    "CATEGORIAS": ("ID", "NOME"),
+    "ENDERECOS": ("ID", "RUA", "NUMERO", "BAIRRO", "CIDADE", "ESTADO", "CEP"),
+    "CLIENTES": ("ID", "NOME", "EMAIL", "TELEFONE", "DATA_NASCIMENTO", "ENDERECO_ID"),
+    "PRODUTOS": ("ID", "NOME", "CATEGORIA_ID", "PRECO_DIARIA", "QUANTIDADE_DISPONIVEL"),
+    "FUNCIONARIOS": ("ID", "NOME", "CARGO", "SALARIO", "DATA_ADMISSAO"),
+    "CONTRATOS": ("ID", "CLIENTE_ID", "PRODUTO_ID", "DATA_INICIO", "DATA_FIM", "STATUS"),
+    "PAGAMENTOS": ("ID", "CONTRATO_ID", "VALOR_PAGO", "DATA_PAGAMENTO"),
+}
+
+# Quantidade de registros por tabela com fator de escala 1
+LINHAS_BASE = {tabela: 50 for tabela in ORDEM_TABELAS}
+
+CARGOS = np.array(["Gerente", "Analista", "Suporte", "Vendedor", "Estagiário"])
+PESOS_CARGOS = np.array([0.05, 0.30, 0.25, 0.35, 0.05])
+STATUS_CONTRATO = np.array(["ativo", "inativo", "pendente", "cancelado"])
+PESOS_STATUS = np.array([0.55, 0.25, 0.10, 0.10])
+ESTADOS = np.array(["SP", "RJ", "MG", "RS", "PR", "SC", "BA", "PE", "GO", "DF"])
+
+# Faixa de datas dos pagamentos e sazonalidade mensal (jan..dez)
+INICIO_PAGAMENTOS = np.datetime64("2022-01-01")
+FIM_PAGAMENTOS = np.datetime64("2024-12-31")
+SAZONALIDADE_MENSAL = np.array([0.85, 0.90, 1.05, 1.00, 1.00, 0.95, 0.90, 0.95, 1.00, 1.05, 1.15, 1.30])
+# Crescimento da quantidade de pagamentos ao longo do período (final / início)
+CRESCIMENTO_PERIODO = 1.8
+
+
+def calcular_linhas(escala=1.0, escalas_tabela=None):
+    """Quantidade de linhas por tabela: LINHAS_BASE x escala global x escala da tabela."""
+    escalas_tabela = escalas_tabela or {}
+    return {
+        tabela: max(1, int(round(LINHAS_BASE[tabela] * escala * escalas_tabela.get(tabela, 1.0))))
+        for tabela in ORDEM_TABELAS
+    }
+
+
+def sql_insert(tabela):
+    colunas = COLUNAS[tabela]
+    return f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES ({', '.join('?' * len(colunas))})"
+
+
+def _cdf(pesos):
+    """Distribuição acumulada normalizada, usada com searchsorted para sorteios ponderados."""
+    cdf = np.cumsum(pesos, dtype=float)
+    return cdf / cdf[-1]
+
+
+def _para_datetime(datas):
+    return datas.astype("datetime64[us]").tolist()
+
+
+class GeradorDados:
+    """Gera os dados sintéticos de todas as tabelas em lotes vetorizados com NumPy.
+
+    Com a mesma semente e a mesma quantidade de linhas o conjunto gerado é
+    sempre o mesmo: cada coluna tem seu próprio gerador aleatório derivado da
+    semente, então nem a ordem das tabelas nem o tamanho do lote alteram o
+    resultado.
+    """
+
+    def __init__(self, linhas_por_tabela, semente=42, tamanho_lote=50_000):
+        self.linhas = dict(linhas_por_tabela)
+        self.semente = semente
+        self.tamanho_lote = tamanho_lote
+
+        rng = self._rng("distribuicoes")
+        # Poucos clientes concentram muitos contratos (cauda longa, tipo Pareto)
+        self.cdf_clientes = _cdf(rng.pareto(1.2, self.linhas["CLIENTES"]) + 1.0)
+        # Quantidade de pagamentos por contrato também é assimétrica (lognormal)
+        self.cdf_contratos = _cdf(rng.lognormal(0.0, 1.0, self.linhas["CONTRATOS"]))
+        # Categorias mais populares concentram mais produtos (Zipf)
+        self.cdf_categorias = _cdf(1.0 / np.arange(1, self.linhas["CATEGORIAS"] + 1))
+
+        # Dias do período de pagamentos com peso por tendência de crescimento e sazonalidade
+        self.dias_pagamento = np.arange(INICIO_PAGAMENTOS, FIM_PAGAMENTOS + 1, dtype="datetime64[D]")
+        meses = self.dias_pagamento.astype("datetime64[M]").astype(int) % 12
+        tendencia = np.linspace(1.0, CRESCIMENTO_PERIODO, len(self.dias_pagamento))
+        self.cdf_dias_pagamento = _cdf(tendencia * SAZONALIDADE_MENSAL[meses])
+
+    def _rng(self, nome):
+        return np.random.default_rng([self.semente, zlib.crc32(nome.encode())])
+
+    def _ponderado(self, rng, cdf, quantidade):
+        """Sorteia índices (base 1) segundo a distribuição acumulada."""
+        return np.searchsorted(cdf, rng.random(quantidade), side="right") + 1
+
+    def lotes(self, tabela):
+        """Gera a tabela em lotes de no máximo `tamanho_lote` tuplas (prontas para executemany)."""
+        gerar = getattr(self, f"_gerar_{tabela.lower()}")
+        geradores = {}
+
+        def rng(coluna):
+            if coluna not in geradores:
+                geradores[coluna] = self._rng(f"{tabela}.{coluna}")
+            return geradores[coluna]
+
+        total = self.linhas[tabela]
+        for inicio in range(1, total + 1, self.tamanho_lote):
+            ids = np.arange(inicio, min(inicio + self.tamanho_lote, total + 1))
+            yield gerar(rng, ids)
+
+    def _gerar_categorias(self, rng, ids):
+        return [(i, f"Categoria {i}") for i in ids.tolist()]
+
+    def _gerar_enderecos(self, rng, ids):
+        numeros = rng("NUMERO").integers(1, 3000, len(ids)).tolist()
+        estados = ESTADOS[rng("ESTADO").integers(0, len(ESTADOS), len(ids))].tolist()
+        ceps = rng("CEP").integers(1_000_000, 99_999_999, len(ids)).tolist()
+        return [
+            (i, f"Rua {i}", str(n), f"Bairro {i}", f"Cidade {i}", uf, f"{cep:08d}"[:5] + "-" + f"{cep:08d}"[5:])
+            for i, n, uf, cep in zip(ids.tolist(), numeros, estados, ceps)
+        ]
+
+    def _gerar_clientes(self, rng, ids):
+        n = len(ids)
+        enderecos = rng("ENDERECO_ID").integers(1, self.linhas["ENDERECOS"] + 1, n).tolist()
+        ddd = rng("DDD").integers(11, 100, n).tolist()
+        telefone = rng("TELEFONE").integers(0, 100_000_000, n).tolist()
+        nascimento = _para_datetime(np.datetime64("1950-01-01") + rng("DATA_NASCIMENTO").integers(0, 365 * 55, n).astype("timedelta64[D]"))
+        return [
+            (i, f"Cliente {i}", f"cliente{i}@email.com", f"({d}) 9{t // 10_000:04d}-{t % 10_000:04d}", nasc.date(), e)
+            for i, e, d, t, nasc in zip(ids.tolist(), enderecos, ddd, telefone, nascimento)
+        ]
+
+    def _gerar_produtos(self, rng, ids):
+        n = len(ids)
+        categorias = self._ponderado(rng("CATEGORIA_ID"), self.cdf_categorias, n).tolist()
+        precos = np.round(rng("PRECO_DIARIA").uniform(50.0, 500.0, n), 2).tolist()
+        quantidades = rng("QUANTIDADE_DISPONIVEL").integers(5, 101, n).tolist()
+        return [(i, f"Produto {i}", c, p, q) for i, c, p, q in zip(ids.tolist(), categorias, precos, quantidades)]
+
+    def _gerar_funcionarios(self, rng, ids):
+        n = len(ids)
+        cargos = CARGOS[np.searchsorted(_cdf(PESOS_CARGOS), rng("CARGO").random(n), side="right")].tolist()
+        salarios = np.round(rng("SALARIO").lognormal(np.log(4000.0), 0.4, n).clip(1500.0, 30000.0), 2).tolist()
+        # Datas de admissão de 1 a 5 anos antes do fim do período (data fixa para ser reprodutível)
+        admissao = _para_datetime(FIM_PAGAMENTOS - rng("DATA_ADMISSAO").integers(365, 1826, n).astype("timedelta64[D]"))
+        return [(i, f"Funcionario {i}", c, s, a) for i, c, s, a in zip(ids.tolist(), cargos, salarios, admissao)]
+
+    def _gerar_contratos(self, rng, ids):
+        n = len(ids)
+        clientes = self._ponderado(rng("CLIENTE_ID"), self.cdf_clientes, n).tolist()
+        produtos = rng("PRODUTO_ID").integers(1, self.linhas["PRODUTOS"] + 1, n).tolist()
+        # Início nos últimos 2 anos a partir de 2022; contratos duram 1-12 meses
+        inicio = np.datetime64("2022-01-01") + rng("DATA_INICIO").integers(0, 731, n).astype("timedelta64[D]")
+        fim = inicio + rng("DATA_FIM").integers(30, 366, n).astype("timedelta64[D]")
+        status = STATUS_CONTRATO[np.searchsorted(_cdf(PESOS_STATUS), rng("STATUS").random(n), side="right")].tolist()
+        return list(zip(ids.tolist(), clientes, produtos, _para_datetime(inicio), _para_datetime(fim), status))
+
+    def _gerar_pagamentos(self, rng, ids):
+        n = len(ids)
+        contratos = self._ponderado(rng("CONTRATO_ID"), self.cdf_contratos, n).tolist()
+        # Valores assimétricos: maioria entre 200 e 700, com cauda de pagamentos altos
+        valores = np.round(rng("VALOR_PAGO").lognormal(np.log(400.0), 0.5, n).clip(100.0, 5000.0), 2).tolist()
+        datas = self.dias_pagamento[self._ponderado(rng("DATA_PAGAMENTO"), self.cdf_dias_pagamento, n) - 1]
+        return list(zip(ids.tolist(), contratos, valores, _para_datetime(datas)))
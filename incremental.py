@@ -0,0 +1,128 @@
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+
+import pandas as pd
+
+# Versão do formato do arquivo de watermark
+VERSAO_WATERMARK = 1
+
+
+def caminho_watermark_padrao(caminho_saida):
+    """Arquivo de watermark salvo ao lado do arquivo exportado."""
+    return caminho_saida + ".watermark.json"
+
+
+def _serializar_valor(valor):
+    if isinstance(valor, datetime):
+        return {"tipo": "datetime", "valor": valor.isoformat()}
+    if isinstance(valor, date):
+        return {"tipo": "date", "valor": valor.isoformat()}
+    if isinstance(valor, Decimal):
+        return {"tipo": "decimal", "valor": str(valor)}
+    if hasattr(valor, "item"):  # tipos numpy
+        valor = valor.item()
+    return {"tipo": "valor", "valor": valor}
+
+
+def _desserializar_valor(dados):
+    tipo, valor = dados["tipo"], dados["valor"]
+    if tipo == "datetime":
+        return datetime.fromisoformat(valor)
+    if tipo == "date":
+        return date.fromisoformat(valor)
+    if tipo == "decimal":
+        return Decimal(valor)
+    return valor
+
+
+def ler_watermark(caminho):
+    """Lê o watermark salvo. Retorna None se não existir ou estiver corrompido."""
+    if not os.path.exists(caminho):
+        return None
+    try:
+        with open(caminho, encoding="utf-8") as arquivo:
+            dados = json.load(arquivo)
+        if dados.get("versao") != VERSAO_WATERMARK:
+            return None
+        dados["valor"] = _desserializar_valor(dados["valor"])
+        return dados
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Aviso: watermark '{caminho}' ignorado ({e}). Será feita uma exportação completa.")
+        return None
+
+
+def salvar_watermark(caminho, tabela, coluna, valor, arquivo_saida):
+    """Grava o watermark de forma atômica (arquivo temporário + os.replace)."""
+    dados = {
+        "versao": VERSAO_WATERMARK,
+        "tabela": tabela,
+        "coluna": coluna,
+        "valor": _serializar_valor(valor),
+        "arquivo": os.path.abspath(arquivo_saida),
+        "atualizado_em": datetime.now().isoformat(timespec="seconds"),
+    }
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(dados, arquivo, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+
+
+def watermark_valido(estado, tabela, coluna, arquivo_saida):
+    """O watermark só vale para a mesma tabela, coluna e arquivo de saída existente."""
+    return (
+        estado is not None
+        and estado.get("valor") is not None
+        and estado.get("tabela") == tabela
+        and estado.get("coluna") == coluna
+        and estado.get("arquivo") == os.path.abspath(arquivo_saida)
+        and os.path.exists(arquivo_saida)
+    )
+
+
+def consultar_maximo(cur, tabela, coluna):
+    """Valor atual do watermark no banco (MAX da coluna)."""
+    cur.execute(f"SELECT MAX({coluna}) FROM {tabela}")
+    linha = cur.fetchone()
+    return linha[0] if linha else None
+
+
+def motivo_sem_incremental(exportador, coluna, chave):
+    """Por que a exportação incremental não vale nesta configuração (None se vale).
+
+    Só compensa quando o delta é acrescentado ao final do arquivo: mesclar
+    linhas alteradas exige reler e regravar a saída inteira, o que custa tanto
+    quanto (no xlsx, mais que) a exportação completa.
+    """
+    if not exportador.suporta_acrescimo:
+        return f"o formato '{exportador.extensao.lstrip('.')}' não permite acrescentar linhas; use OUTPUT_FORMAT=csv"
+    if coluna != chave:
+        return f"o watermark '{coluna}' não é a chave '{chave}': linhas alteradas exigiriam regravar o arquivo"
+    return None
+
+
+def consulta_delta(tabela, coluna):
+    """Consulta das linhas novas desde o último watermark (IDs crescentes)."""
+    return f"SELECT * FROM {tabela} WHERE {coluna} > ? ORDER BY {coluna}"
+
+
+def exportar_incremental(cur, exportador, estado, tabela, coluna):
+    """Busca apenas as linhas novas desde o watermark e as acrescenta ao arquivo existente.
+
+    Retorna (linhas_novas, novo_valor_do_watermark). Sem linhas novas, o
+    arquivo não é tocado. Use só quando `motivo_sem_incremental` retorna None.
+    """
+    valor_anterior = estado["valor"]
+    cur.execute(consulta_delta(tabela, coluna), (valor_anterior,))
+    dados = cur.fetchall()
+    if not dados:
+        return 0, valor_anterior
+
+    colunas = [desc[0] for desc in cur.description]
+    df_delta = pd.DataFrame(dados, columns=colunas)
+    # O watermark avança pelas linhas lidas, inclusive as descartadas pelo dropna
+    novo_valor = df_delta[coluna].max()
+    df_delta = df_delta.dropna()
+    exportador.acrescentar(df_delta)
+    return len(df_delta), novo_valor
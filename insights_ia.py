@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Modelo padrão da análise por IA e nome do modelo local usado em testes offline
+MODELO_PADRAO = 'models/gemini-2.0-flash'
+MODELO_STUB = 'stub'
+
+# Versão do texto do prompt: mudar invalida as respostas em cache
+VERSAO_PROMPT = 1
+
+PROMPT_INICIO = """
+        Analise os dados de pagamentos de uma empresa fornecidos abaixo.
+        Forneça insights de negócios em formato de bullet points fáceis de entender.
+        Identifique tendências no crescimento mensal total e nos pagamentos por cliente.
+        Sugira possíveis áreas para focar para aumentar a receita ou reter clientes.
+
+        Dados para Análise:
+        """
+
+PROMPT_FIM = """
+
+        Com base nesses dados, quais são os principais insights e recomendações de negócios?
+        """
+
+
+def montar_prompt(insights_data):
+    """Monta o prompt enviado à IA a partir dos dados resumidos do dashboard."""
+    prompt = PROMPT_INICIO
+    for key, value in insights_data.items():
+        prompt += f"\n\n## {key}:\n{value}"
+    return prompt + PROMPT_FIM
+
+
+def chave_resposta(insights_data, nome_modelo):
+    """Hash do conteúdo dos dados + modelo: mesma entrada, mesma resposta em cache."""
+    conteudo = json.dumps(
+        {"dados": insights_data, "modelo": nome_modelo, "versao": VERSAO_PROMPT},
+        sort_keys=True, ensure_ascii=False, default=str,
+    )
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+
+class CacheRespostas:
+    """Cache persistente das respostas da IA (um arquivo JSON por resposta).
+
+    Mantém no máximo `max_itens` respostas; as menos usadas recentemente
+    (pela data de modificação do arquivo) são removidas primeiro. Respostas
+    mais antigas que `ttl_segundos` são ignoradas.
+    """
+
+    def __init__(self, diretorio, max_itens=50, ttl_segundos=7 * 24 * 3600):
+        self.diretorio = diretorio
+        self.max_itens = max_itens
+        self.ttl_segundos = ttl_segundos
+        self._lock = threading.Lock()
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, f"{chave}.json")
+
+    def obter(self, chave):
+        caminho = self._caminho(chave)
+        try:
+            with open(caminho, encoding="utf-8") as arquivo:
+                item = json.load(arquivo)
+            if time.time() - item["criado_em"] > self.ttl_segundos:
+                return None
+            os.utime(caminho)  # marca como usado recentemente
+            return item["texto"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def guardar(self, chave, texto, nome_modelo):
+        with self._lock:
+            os.makedirs(self.diretorio, exist_ok=True)
+            temporario = self._caminho(chave) + ".tmp"
+            with open(temporario, "w", encoding="utf-8") as arquivo:
+                json.dump({"modelo": nome_modelo, "criado_em": time.time(), "texto": texto}, arquivo, ensure_ascii=False)
+            os.replace(temporario, self._caminho(chave))
+            self._remover_excedentes()
+
+    def _remover_excedentes(self):
+        arquivos = [
+            os.path.join(self.diretorio, nome)
+            for nome in os.listdir(self.diretorio)
+            if nome.endswith(".json")
+        ]
+        if len(arquivos) <= self.max_itens:
+            return
+        arquivos.sort(key=os.path.getmtime)
+        for caminho in arquivos[:len(arquivos) - self.max_itens]:
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+
+
+class RespostaStub:
+    def __init__(self, text):
+        self.text = text
+
+
+class ModeloStub:
+    """Modelo local para testes offline: mesma interface do genai.GenerativeModel."""
+
+    def __init__(self, atraso_segundos=0.0):
+        self.atraso_segundos = atraso_segundos
+
+    def generate_content(self, prompt):
+        if self.atraso_segundos:
+            time.sleep(self.atraso_segundos)
+        secoes = [linha[3:].rstrip(":") for linha in prompt.splitlines() if linha.startswith("## ")]
+        texto = "**Resposta do modelo local de teste (stub).**\n\n"
+        texto += "\n".join(f"* Seção analisada: {secao}" for secao in secoes)
+        texto += f"\n\n_Prompt com {len(prompt)} caracteres._"
+        return RespostaStub(texto)
+
+
+def criar_modelo(nome_modelo):
+    """Cria o modelo da IA. Com o nome 'stub' usa o modelo local, sem chamar a API."""
+    if nome_modelo == MODELO_STUB:
+        return ModeloStub(atraso_segundos=1.0)
+    import google.generativeai as genai
+    return genai.GenerativeModel(nome_modelo)
+
+
+class GeradorInsights:
+    """Gera os insights em segundo plano, sem bloquear a sessão do Streamlit.
+
+    Fica no nível do módulo (compartilhado por reruns e sessões): pedidos
+    iguais em andamento são reaproveitados e as respostas vão para o cache.
+    """
+
+    def __init__(self, max_paralelo=2):
+        self._executor = ThreadPoolExecutor(max_workers=max_paralelo, thread_name_prefix="insights-ia")
+        self._tarefas = {}
+        self._lock = threading.Lock()
+
+    def solicitar(self, chave, prompt, nome_modelo, cache):
+        """Retorna a resposta em cache ou inicia a geração em segundo plano."""
+        texto = cache.obter(chave)
+        if texto is not None:
+            return "pronto", texto
+        with self._lock:
+            if chave not in self._tarefas:
+                self._tarefas[chave] = self._executor.submit(self._gerar, chave, prompt, nome_modelo, cache)
+        return self.situacao(chave, cache)
+
+    def situacao(self, chave, cache):
+        """Retorna (situação, texto_ou_erro): 'pronto', 'gerando', 'erro' ou 'desconhecido'."""
+        with self._lock:
+            tarefa = self._tarefas.get(chave)
+        if tarefa is None:
+            texto = cache.obter(chave)
+            return ("pronto", texto) if texto is not None else ("desconhecido", None)
+        if not tarefa.done():
+            return "gerando", None
+        with self._lock:
+            self._tarefas.pop(chave, None)
+        erro = tarefa.exception()
+        if erro is not None:
+            return "erro", erro
+        return "pronto", tarefa.result()
+
+    def _gerar(self, chave, prompt, nome_modelo, cache):
+        response = criar_modelo(nome_modelo).generate_content(prompt)
+        cache.guardar(chave, response.text, nome_modelo)
+        return response.text
+
+
+_gerador_global = None
+_lock_global = threading.Lock()
+
+
+def obter_gerador():
+    global _gerador_global
+    with _lock_global:
+        if _gerador_global is None:
+            _gerador_global = GeradorInsights()
+        return _gerador_global
@@ -0,0 +1,256 @@
+"""Medição por etapa (tempo, linhas, bytes e pico de memória) do main.py e do dashboard.
+
+Cada etapa medida com `etapa()` acumula tempo, linhas, bytes e chamadas (no
+modo streaming a mesma etapa roda uma vez por lote). Ao final, os resultados
+podem ser gravados como log JSON (uma linha por etapa) e como arquivo texto no
+formato do Prometheus, lido pelo textfile collector do node exporter.
+
+O pico de memória usa o tracemalloc, que é global do processo e deixa o código
+mais lento: só é medido quando habilitado, e com etapas em paralelo (vários
+alvos) o pico de uma etapa inclui a memória das outras.
+"""
+import cProfile
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+# Carregar variáveis de ambiente do arquivo .env
+load_dotenv()
+
+PREFIXO_METRICAS = "relatorios"
+
+# Configuração das métricas do main.py e do relatorios.py: log em JSON Lines e
+# arquivo .prom para o textfile collector do node exporter. METRICAS_MEMORIA=1 mede
+# o pico de memória (mais lento) e METRICAS_PERFIL grava um perfil cProfile da execução.
+METRICAS_LOG = os.getenv("METRICAS_LOG")
+METRICAS_PROMETHEUS = os.getenv("METRICAS_PROMETHEUS")
+METRICAS_MEMORIA = os.getenv("METRICAS_MEMORIA", "0").strip().lower() in ("1", "true", "sim")
+METRICAS_PERFIL = os.getenv("METRICAS_PERFIL")
+
+# Instrumentações medindo memória ao mesmo tempo (ex.: vários alvos em paralelo):
+# o tracemalloc só é parado quando a última delas termina
+_usuarios_tracemalloc = 0
+_iniciou_tracemalloc = False
+_lock_tracemalloc = threading.Lock()
+
+
+def _iniciar_tracemalloc():
+    global _usuarios_tracemalloc, _iniciou_tracemalloc
+    with _lock_tracemalloc:
+        if _usuarios_tracemalloc == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _iniciou_tracemalloc = True
+        _usuarios_tracemalloc += 1
+
+
+def _parar_tracemalloc():
+    global _usuarios_tracemalloc, _iniciou_tracemalloc
+    with _lock_tracemalloc:
+        _usuarios_tracemalloc -= 1
+        if _usuarios_tracemalloc == 0 and _iniciou_tracemalloc:
+            tracemalloc.stop()
+            _iniciou_tracemalloc = False
+
+
+class Etapa:
+    """Valores informados pelo código durante a etapa (linhas e bytes processados)."""
+
+    def __init__(self, linhas=None, bytes=None):
+        self.linhas = linhas
+        self.bytes = bytes
+
+
+class Instrumentacao:
+    def __init__(self, processo, rotulos=None, medir_memoria=False):
+        self.processo = processo
+        self.rotulos = dict(rotulos or {})
+        self.medir_memoria = medir_memoria
+        self.etapas = {}
+        self.inicio = time.time()
+        self._inicio_relogio = time.perf_counter()
+        self._lock = threading.Lock()
+        self._medindo_memoria = medir_memoria
+        if medir_memoria:
+            _iniciar_tracemalloc()
+
+    @contextmanager
+    def etapa(self, nome, linhas=None, bytes=None):
+        """Mede o bloco; o código pode preencher `.linhas` e `.bytes` do objeto retornado."""
+        medicao = Etapa(linhas, bytes)
+        memoria_inicial = None
+        if self.medir_memoria and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            memoria_inicial = tracemalloc.get_traced_memory()[0]
+        inicio = time.perf_counter()
+        try:
+            yield medicao
+        finally:
+            segundos = time.perf_counter() - inicio
+            pico = None
+            if memoria_inicial is not None and tracemalloc.is_tracing():
+                pico = max(tracemalloc.get_traced_memory()[1] - memoria_inicial, 0)
+            self._acumular(nome, segundos, medicao, pico)
+
+    def _acumular(self, nome, segundos, medicao, pico):
+        with self._lock:
+            total = self.etapas.setdefault(nome, {"segundos": 0.0, "chamadas": 0, "linhas": None, "bytes": None, "pico_memoria_bytes": None})
+            total["segundos"] += segundos
+            total["chamadas"] += 1
+            for chave, valor in (("linhas", medicao.linhas), ("bytes", medicao.bytes)):
+                if valor is not None:
+                    total[chave] = (total[chave] or 0) + int(valor)
+            if pico is not None:
+                total["pico_memoria_bytes"] = max(total["pico_memoria_bytes"] or 0, pico)
+
+    def finalizar(self, sucesso):
+        """Encerra a medição da execução (e o tracemalloc, se for a última medindo memória)."""
+        self.sucesso = bool(sucesso)
+        self.segundos_total = time.perf_counter() - self._inicio_relogio
+        if self._medindo_memoria:
+            self._medindo_memoria = False
+            _parar_tracemalloc()
+        return self
+
+    def registros(self):
+        """Linhas do log JSON: uma por etapa e uma com o total da execução."""
+        base = {"momento": datetime.now().isoformat(timespec="seconds"), "processo": self.processo, **self.rotulos}
+        with self._lock:
+            etapas = {nome: dict(valores) for nome, valores in self.etapas.items()}
+        registros = [{**base, "evento": "etapa", "etapa": nome, **valores} for nome, valores in etapas.items()]
+        registros.append({
+            **base,
+            "evento": "execucao",
+            "inicio": self.inicio,
+            "sucesso": getattr(self, "sucesso", None),
+            "segundos": getattr(self, "segundos_total", time.perf_counter() - self._inicio_relogio),
+        })
+        return registros
+
+    @classmethod
+    def de_registros(cls, registros):
+        """Reconstrói a medição a partir de `registros()` (ex.: devolvidos por outro processo)."""
+        execucao = next(registro for registro in registros if registro["evento"] == "execucao")
+        rotulos = {chave: valor for chave, valor in execucao.items() if chave not in ("momento", "processo", "evento", "inicio", "sucesso", "segundos")}
+        instrumentacao = cls(execucao["processo"], rotulos)
+        instrumentacao.inicio = execucao["inicio"]
+        for registro in registros:
+            if registro["evento"] == "etapa":
+                instrumentacao.etapas[registro["etapa"]] = {chave: registro[chave] for chave in ("segundos", "chamadas", "linhas", "bytes", "pico_memoria_bytes")}
+        if execucao["sucesso"] is not None:
+            instrumentacao.sucesso = execucao["sucesso"]
+            instrumentacao.segundos_total = execucao["segundos"]
+        return instrumentacao
+
+
+def registrar_json(caminho, *instrumentacoes):
+    """Acrescenta as medições ao log em JSON Lines."""
+    with open(caminho, "a", encoding="utf-8") as arquivo:
+        for instrumentacao in instrumentacoes:
+            for registro in instrumentacao.registros():
+                arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+
+def _rotulos(valores):
+    itens = []
+    for chave, valor in valores.items():
+        valor = str(valor).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        itens.append(f'{chave}="{valor}"')
+    return "{" + ",".join(itens) + "}"
+
+
+def gravar_prometheus(caminho, *instrumentacoes):
+    """Grava as medições no formato texto do Prometheus (substitui o arquivo de forma atômica)."""
+    metricas = {
+        "etapa_segundos": ("gauge", "Tempo gasto na etapa na última execução"),
+        "etapa_chamadas": ("gauge", "Vezes que a etapa rodou na última execução (lotes)"),
+        "etapa_linhas": ("gauge", "Linhas processadas na etapa na última execução"),
+        "etapa_bytes": ("gauge", "Bytes processados ou gravados na etapa na última execução"),
+        "etapa_pico_memoria_bytes": ("gauge", "Pico de memória alocada durante a etapa (tracemalloc)"),
+        "execucao_segundos": ("gauge", "Duração total da última execução"),
+        "execucao_sucesso": ("gauge", "1 se a última execução terminou sem erro"),
+        "execucao_timestamp_segundos": ("gauge", "Horário de início da última execução (epoch)"),
+    }
+    amostras = {nome: [] for nome in metricas}
+    for instrumentacao in instrumentacoes:
+        base = {"processo": instrumentacao.processo, **instrumentacao.rotulos}
+        with instrumentacao._lock:
+            etapas = {nome: dict(valores) for nome, valores in instrumentacao.etapas.items()}
+        for nome_etapa, valores in etapas.items():
+            rotulos = _rotulos({**base, "etapa": nome_etapa})
+            for chave in ("segundos", "chamadas", "linhas", "bytes", "pico_memoria_bytes"):
+                if valores[chave] is not None:
+                    amostras[f"etapa_{chave}"].append(f"{rotulos} {valores[chave]}")
+        rotulos = _rotulos(base)
+        if hasattr(instrumentacao, "segundos_total"):
+            amostras["execucao_segundos"].append(f"{rotulos} {instrumentacao.segundos_total}")
+            amostras["execucao_sucesso"].append(f"{rotulos} {int(instrumentacao.sucesso)}")
+        amostras["execucao_timestamp_segundos"].append(f"{rotulos} {instrumentacao.inicio}")
+
+    linhas = []
+    for nome, (tipo, descricao) in metricas.items():
+        if not amostras[nome]:
+            continue
+        metrica = f"{PREFIXO_METRICAS}_{nome}"
+        linhas.append(f"# HELP {metrica} {descricao}")
+        linhas.append(f"# TYPE {metrica} {tipo}")
+        linhas.extend(f"{metrica}{amostra}" for amostra in amostras[nome])
+
+    # O node exporter não pode ler o arquivo pela metade: grava em .tmp e renomeia
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        arquivo.write("\n".join(linhas) + "\n")
+    os.replace(temporario, caminho)
+
+
+def imprimir_etapas(*medidores):
+    for medidor in medidores:
+        titulo = ", ".join(f"{chave}={valor}" for chave, valor in medidor.rotulos.items())
+        print(f"\nEtapas{f' ({titulo})' if titulo else ''}:")
+        for nome, etapa in medidor.etapas.items():
+            linhas = "" if etapa["linhas"] is None else f"{etapa['linhas']} linhas"
+            tamanho = "" if etapa["bytes"] is None else f"{etapa['bytes'] / 1024 ** 2:.1f} MB"
+            memoria = "" if etapa["pico_memoria_bytes"] is None else f"pico {etapa['pico_memoria_bytes'] / 1024 ** 2:.1f} MB"
+            print(f"  {nome:<12} {etapa['segundos']:>9.3f} s  {linhas:>14} {tamanho:>10} {memoria:>14}")
+
+
+def publicar_metricas(*medidores):
+    """Grava o log JSON e o arquivo do Prometheus, quando configurados."""
+    try:
+        if METRICAS_LOG:
+            registrar_json(METRICAS_LOG, *medidores)
+        if METRICAS_PROMETHEUS:
+            gravar_prometheus(METRICAS_PROMETHEUS, *medidores)
+    except OSError as e:
+        print(f"Não foi possível gravar as métricas: {e}")
+
+
+@contextmanager
+def perfil(caminho):
+    """Captura um perfil cProfile do bloco e grava em `caminho` (abra com pstats ou snakeviz)."""
+    if not caminho:
+        yield None
+        return
+    perfilador = cProfile.Profile()
+    perfilador.enable()
+    try:
+        yield perfilador
+    finally:
+        perfilador.disable()
+        perfilador.dump_stats(caminho)
+
+
+class _SemMedicao:
+    """Instrumentação desligada: mesma interface, sem custo."""
+
+    @contextmanager
+    def etapa(self, nome, linhas=None, bytes=None):
+        yield Etapa(linhas, bytes)
+
+
+SEM_MEDICAO = _SemMedicao()
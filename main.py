@@ -1,93 +1,430 @@
+import argparse
 import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, closing
+
 import fdb
 import pandas as pd
 from dotenv import load_dotenv
-from openpyxl import Workbook
-from openpyxl.styles import Alignment, Font, PatternFill
-from openpyxl.utils.dataframe import dataframe_to_rows
+
+from banco import com_retentativa, credenciais_env, fechar_pools, obter_pool
+from colunar import dataframe_tipado, ler_colunar
+from exportadores import LIMITE_LINHAS_XLSX, criar_exportador, larguras_colunas
+from incremental import (
+    caminho_watermark_padrao,
+    consultar_maximo,
+    exportar_incremental,
+    ler_watermark,
+    motivo_sem_incremental,
+    salvar_watermark,
+    watermark_valido,
+)
+from instrumentacao import (
+    METRICAS_MEMORIA,
+    METRICAS_PERFIL,
+    SEM_MEDICAO,
+    Instrumentacao,
+    imprimir_etapas,
+    perfil,
+    publicar_metricas,
+)
+from partes import ExportadorPartes, caminho_manifesto, gravar_manifesto
 
 # Carregar variáveis de ambiente do arquivo .env
 load_dotenv()
 
-DATABASE_PATH = os.getenv("DATABASE_PATH")
-USER = os.getenv("USER")
-PASSWORD = os.getenv("PASSWORD")
 OUTPUT_PATH = os.getenv("OUTPUT_PATH", "C:\\Users\\Gabriel Anselmo\\Desktop\\dados_tratados_formatados.xlsx")
 
-con = None
-cur = None
+# Modo de exportação: "completo" (carrega a tabela inteira em memória) ou
+# "streaming" (lê em lotes com fetchmany e grava em um Workbook write-only)
+EXPORT_MODE = os.getenv("EXPORT_MODE", "completo").strip().lower()
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "10000"))
 
-try:
-    # Conectar ao banco Firebird
-    con = fdb.connect(dsn=DATABASE_PATH, user=USER, password=PASSWORD)
-    cur = con.cursor()
+# Leitura tipada (colunar.py): decodifica as linhas direto em colunas NumPy (int32,
+# float64, datetime64, categórico) em vez de um DataFrame de objetos Python.
+# Colunas DATE passam a ser gravadas como data e hora (00:00).
+EXPORT_TIPADO = os.getenv("EXPORT_TIPADO", "0").strip().lower() in ("1", "true", "sim")
 
-    # Executar consulta
-    cur.execute("SELECT * FROM contratos;")
-    dados = cur.fetchall()
+# Formato de saída: "xlsx" (padrão), "csv" ou "parquet" (requer pyarrow)
+OUTPUT_FORMAT = os.getenv("OUTPUT_FORMAT", "xlsx").strip().lower()
+
+# Divisão da saída a cada LIMITE_LINHAS linhas (padrão: o limite de uma aba do Excel):
+# "planilhas" continua em novas abas do mesmo xlsx; "arquivos" grava partes
+# separadas em PROCESSOS_GRAVACAO processos paralelos. Com mais de uma parte,
+# um manifesto JSON (<saida>.manifesto.json) lista a faixa de linhas de cada uma.
+LIMITE_LINHAS = int(os.getenv("LIMITE_LINHAS", str(LIMITE_LINHAS_XLSX)))
+DIVIDIR_EM = os.getenv("DIVIDIR_EM", "planilhas").strip().lower()
+PROCESSOS_GRAVACAO = int(os.getenv("PROCESSOS_GRAVACAO", str(min(4, os.cpu_count() or 1))))
+
+# Exportação incremental: guarda um watermark (maior ID) e nas próximas execuções
+# acrescenta ao arquivo apenas as linhas novas. Só vale para o formato csv com o
+# watermark na própria chave; nas demais configurações a exportação é completa.
+# Use FULL_REBUILD=1 ou o argumento --full-rebuild para forçar a exportação completa.
+EXPORT_INCREMENTAL = os.getenv("EXPORT_INCREMENTAL", "0").strip().lower() in ("1", "true", "sim")
+WATERMARK_COLUMN = os.getenv("WATERMARK_COLUMN", "ID")
+KEY_COLUMN = os.getenv("KEY_COLUMN", "ID")
+WATERMARK_PATH = os.getenv("WATERMARK_PATH")
+FULL_REBUILD = os.getenv("FULL_REBUILD", "0").strip().lower() in ("1", "true", "sim")
+
+# Vários bancos (um por filial) exportados em paralelo: "filial1=host:/dados/f1.fdb;filial2=..."
+# Também aceita --alvo NOME=DSN na linha de comando. USER e PASSWORD são os mesmos para todos.
+DATABASE_TARGETS = os.getenv("DATABASE_TARGETS", "")
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", "4"))
+
+TABELA_CONTRATOS = "contratos"
+CONSULTA_CONTRATOS = "SELECT * FROM contratos;"
+
+
+def ler_lotes(cur, tamanho_lote=BATCH_SIZE, lotes_em_espera=2):
+    """Lê o resultado do cursor em lotes usando fetchmany.
 
+    A leitura do próximo lote acontece em uma thread separada enquanto o lote
+    atual é processado, e no máximo `lotes_em_espera` lotes ficam em memória.
+    """
+    fila = queue.Queue(maxsize=lotes_em_espera)
+    parar = threading.Event()
+    fim = object()
+
+    def enfileirar(item):
+        while not parar.is_set():
+            try:
+                fila.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produtor():
+        try:
+            while not parar.is_set():
+                linhas = cur.fetchmany(tamanho_lote)
+                if not linhas:
+                    break
+                if not enfileirar(linhas):
+                    return
+        except Exception as e:
+            enfileirar(e)
+            return
+        enfileirar(fim)
+
+    thread = threading.Thread(target=produtor, name="leitor-lotes", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = fila.get()
+            if item is fim:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        parar.set()
+        thread.join()
+
+
+def exportar_completo(cur, exportador, medidor=SEM_MEDICAO):
+    """Exporta o resultado inteiro de uma vez.
+
+    Retorna o número de linhas gravadas, ou None se a consulta não trouxe dados.
+    """
     # Obter nomes das colunas
     colunas = [desc[0] for desc in cur.description]
 
-    # Criar DataFrame Pandas
-    df = pd.DataFrame(dados, columns=colunas)
+    if EXPORT_TIPADO:
+        # Busca em lotes decodificados na hora: a lista com todas as tuplas nunca existe
+        with medidor.etapa("buscar") as etapa:
+            df = ler_colunar(cur, BATCH_SIZE)
+            etapa.linhas = len(df)
+            etapa.bytes = int(df.memory_usage(index=True, deep=True).sum())
+    else:
+        with medidor.etapa("buscar") as etapa:
+            dados = cur.fetchall()
+            etapa.linhas = len(dados)
+
+        # Criar DataFrame Pandas
+        with medidor.etapa("dataframe") as etapa:
+            df = pd.DataFrame(dados, columns=colunas)
+            etapa.bytes = int(df.memory_usage(index=True).sum())
 
     if df.empty:
-        print("Nenhum dado encontrado na tabela 'contratos'.")
-    else:
-        # Tratamento de dados
+        return None
+
+    # Tratamento de dados
+    with medidor.etapa("tratar") as etapa:
         df.dropna(inplace=True)
+        etapa.linhas = len(df)
+
+    # Larguras calculadas de forma vetorizada sobre o DataFrame inteiro
+    with medidor.etapa("larguras"):
+        larguras = larguras_colunas(df, colunas)
+
+    with exportador.abrir(colunas, larguras):
+        exportador.escrever(df)
+    return exportador.linhas_escritas
+
+
+def exportar_streaming(cur, exportador, tamanho_lote=BATCH_SIZE, medidor=SEM_MEDICAO):
+    """Exporta o resultado em lotes, com uso de memória constante.
+
+    Cada lote é convertido em DataFrame, limpo com dropna e entregue ao motor
+    de saída. Como o xlsx write-only exige que as larguras sejam definidas
+    antes da primeira linha, elas são estimadas pelo primeiro lote.
+
+    Retorna o número de linhas gravadas, ou None se a consulta não trouxe dados.
+    """
+    colunas = [desc[0] for desc in cur.description]
+    # closing: se o exportador falhar, a thread de leitura para antes de a conexão voltar ao pool
+    with closing(ler_lotes(cur, tamanho_lote)) as lotes:
+        def proximo_df():
+            # "buscar" mede a espera pelo lote lido em paralelo, não o fetchmany em si
+            with medidor.etapa("buscar") as etapa:
+                lote = next(lotes, None)
+                etapa.linhas = len(lote) if lote is not None else 0
+            if lote is None:
+                return None
+            with medidor.etapa("dataframe") as etapa:
+                if EXPORT_TIPADO:
+                    # Tipos fixos entre lotes (sem categóricos nem int32), como o Parquet exige
+                    df = dataframe_tipado(lote, cur.description, categoricas=(), reduzir_inteiros=False)
+                else:
+                    df = pd.DataFrame(lote, columns=colunas)
+                etapa.bytes = int(df.memory_usage(index=True).sum())
+            with medidor.etapa("tratar") as etapa:
+                df = df.dropna()
+                etapa.linhas = len(df)
+            return df
+
+        df = proximo_df()
+        if df is None:
+            return None
+
+        with medidor.etapa("larguras"):
+            larguras = larguras_colunas(df, colunas)
+
+        with exportador.abrir(colunas, larguras):
+            while df is not None:
+                exportador.escrever(df)
+                df = proximo_df()
+        return exportador.linhas_escritas
+
+
+def exportar_contratos(cur, caminho_saida, caminho_watermark=None, medidor=SEM_MEDICAO):
+    """Exporta a tabela CONTRATOS conforme a configuração (completa, streaming ou incremental).
+
+    Deve rodar dentro de uma transação snapshot, para que o watermark e os
+    dados exportados enxerguem o mesmo estado do banco.
+    Retorna (linhas, caminho_do_arquivo, incremental); linhas é None se não houver dados.
+    """
+    exportador = criar_exportador(OUTPUT_FORMAT, caminho_saida, medidor=medidor)
+    exportador.limite_linhas = LIMITE_LINHAS
+
+    incremental = EXPORT_INCREMENTAL
+    if incremental:
+        motivo = motivo_sem_incremental(exportador, WATERMARK_COLUMN, KEY_COLUMN)
+        if motivo:
+            print(f"Aviso: exportação incremental desativada ({motivo}). Será feita a exportação completa.")
+            incremental = False
+
+    if incremental:
+        caminho_watermark = caminho_watermark or WATERMARK_PATH or caminho_watermark_padrao(exportador.caminho)
+        estado = None if FULL_REBUILD else ler_watermark(caminho_watermark)
+
+        if watermark_valido(estado, TABELA_CONTRATOS, WATERMARK_COLUMN, exportador.caminho):
+            with medidor.etapa("incremental") as etapa:
+                linhas, valor = exportar_incremental(cur, exportador, estado, TABELA_CONTRATOS, WATERMARK_COLUMN)
+                etapa.linhas = linhas
+            salvar_watermark(caminho_watermark, TABELA_CONTRATOS, WATERMARK_COLUMN, valor, exportador.caminho)
+            return linhas, exportador.caminho, True
+
+        # Sem watermark válido: exportação completa e novo watermark
+        valor_watermark = consultar_maximo(cur, TABELA_CONTRATOS, WATERMARK_COLUMN)
+
+    # A exportação incremental acrescenta ao arquivo: as partes em arquivos só valem para a completa
+    if DIVIDIR_EM == "arquivos" and not incremental:
+        exportador = ExportadorPartes(OUTPUT_FORMAT, caminho_saida, LIMITE_LINHAS, PROCESSOS_GRAVACAO, medidor)
+
+    # Executar consulta
+    with medidor.etapa("consultar"):
+        cur.execute(CONSULTA_CONTRATOS)
+
+    if EXPORT_MODE == "streaming":
+        total_linhas = exportar_streaming(cur, exportador, medidor=medidor)
+    else:
+        total_linhas = exportar_completo(cur, exportador, medidor)
+
+    # Abas de continuação: o manifesto indica a faixa de linhas de cada uma
+    if total_linhas is not None and not isinstance(exportador, ExportadorPartes):
+        if len(getattr(exportador, "partes", [])) > 1:
+            gravar_manifesto(exportador.caminho, OUTPUT_FORMAT, exportador.colunas, [
+                {"arquivo": os.path.basename(exportador.caminho), **parte} for parte in exportador.partes
+            ])
+        elif os.path.exists(caminho_manifesto(exportador.caminho)):
+            # Manifesto de uma execução anterior com várias abas: não descreve mais o arquivo
+            os.remove(caminho_manifesto(exportador.caminho))
+
+    if incremental and total_linhas is not None:
+        salvar_watermark(caminho_watermark, TABELA_CONTRATOS, WATERMARK_COLUMN, valor_watermark, exportador.caminho)
+    return total_linhas, exportador.caminho, False
+
+
+def carregar_alvos(argumentos_alvo=None):
+    """Lista de (nome, dsn) a partir de DATABASE_TARGETS e dos argumentos --alvo."""
+    itens = [item for item in DATABASE_TARGETS.split(";") if item.strip()] + list(argumentos_alvo or [])
+    alvos = []
+    for item in itens:
+        nome, separador, dsn = item.partition("=")
+        if not separador or not nome.strip() or not dsn.strip():
+            raise ValueError(f"Alvo inválido '{item}'. Use o formato NOME=DSN.")
+        alvos.append((nome.strip(), dsn.strip()))
+    nomes = [nome for nome, _ in alvos]
+    if len(set(nomes)) != len(nomes):
+        raise ValueError("Os nomes dos alvos devem ser únicos.")
+    return alvos
+
+
+def caminho_por_alvo(caminho, nome):
+    """Acrescenta o nome do alvo ao arquivo: dados.xlsx -> dados_filial1.xlsx."""
+    base, extensao = os.path.splitext(caminho)
+    return f"{base}_{re.sub(r'[^0-9A-Za-z_-]+', '_', nome)}{extensao}"
+
+
+def exportar_pool(pool, caminho_saida, caminho_watermark=None, medidor=SEM_MEDICAO):
+    """Exporta usando uma conexão do pool em transação snapshot, com retentativa."""
+    def exportar():
+        with ExitStack() as pilha:
+            with medidor.etapa("conectar"):
+                conexao = pilha.enter_context(pool.leitura())
+            return exportar_contratos(conexao, caminho_saida, caminho_watermark, medidor)
+
+    # Erros transitórios (rede, deadlock) refazem a exportação inteira
+    return com_retentativa(exportar)
+
+
+def exportar_alvo(nome, dsn, credenciais):
+    """Exporta um alvo isoladamente: qualquer erro fica registrado no resultado."""
+    inicio = time.perf_counter()
+    medidor = Instrumentacao("main", {"alvo": nome}, METRICAS_MEMORIA)
+    resultado = {"alvo": nome, "linhas": None, "arquivo": None, "incremental": False, "erro": None}
+    try:
+        pool = obter_pool({**credenciais, "dsn": dsn}, tamanho_maximo=1)
+        caminho_watermark = caminho_por_alvo(WATERMARK_PATH, nome) if WATERMARK_PATH else None
+        resultado["linhas"], resultado["arquivo"], resultado["incremental"] = exportar_pool(
+            pool, caminho_por_alvo(OUTPUT_PATH, nome), caminho_watermark, medidor
+        )
+    except Exception as e:
+        resultado["erro"] = f"{type(e).__name__}: {e}"
+    # O resultado volta ao processo principal por pickle: só dicts e listas (a Instrumentacao tem um Lock)
+    resultado["registros"] = medidor.finalizar(resultado["erro"] is None).registros()
+    resultado["segundos"] = time.perf_counter() - inicio
+    return resultado
+
+
+def _configurar_processo(full_rebuild):
+    # No Windows (spawn) o processo filho reimporta o módulo e perderia o --full-rebuild
+    global FULL_REBUILD
+    FULL_REBUILD = full_rebuild
+
+
+def exportar_alvos(alvos, credenciais, max_workers=MAX_WORKERS):
+    """Exporta todos os alvos em paralelo, um processo por alvo e no máximo `max_workers` ao mesmo tempo.
+
+    A limpeza e a gravação do arquivo usam CPU: em processos separados os alvos
+    não disputam o GIL.
+    """
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=max(1, min(max_workers, len(alvos))),
+        initializer=_configurar_processo,
+        initargs=(FULL_REBUILD,),
+    ) as executor:
+        futuros = [(nome, executor.submit(exportar_alvo, nome, dsn, credenciais)) for nome, dsn in alvos]
+        resultados = []
+        for nome, futuro in futuros:
+            try:
+                resultados.append(futuro.result())
+            except Exception as e:
+                # Processo morto (falta de memória, segfault): BrokenProcessPool nos alvos que ainda não terminaram
+                resultados.append({
+                    "alvo": nome, "linhas": None, "arquivo": None, "incremental": False,
+                    "erro": f"{type(e).__name__}: {e}",
+                    "registros": Instrumentacao("main", {"alvo": nome}).finalizar(False).registros(),
+                    "segundos": time.perf_counter() - inicio,
+                })
+        return resultados
+
+
+def imprimir_resumo(resultados, segundos_total):
+    print(f"\n{'Alvo':<20} {'Status':<10} {'Linhas':>10} {'Tempo (s)':>10}  Arquivo / Erro")
+    for r in resultados:
+        status = "ERRO" if r["erro"] else ("SEM DADOS" if r["linhas"] is None else "OK")
+        linhas = "" if r["linhas"] is None else str(r["linhas"])
+        detalhe = r["erro"] or r["arquivo"] or ""
+        print(f"{r['alvo']:<20} {status:<10} {linhas:>10} {r['segundos']:>10.1f}  {detalhe}")
+    falhas = sum(1 for r in resultados if r["erro"])
+    print(f"\n{len(resultados) - falhas} de {len(resultados)} alvo(s) exportado(s) em {segundos_total:.1f}s.")
+
+
+def main():
+    global FULL_REBUILD
+
+    parser = argparse.ArgumentParser(description="Exporta a tabela CONTRATOS do Firebird.")
+    parser.add_argument("--full-rebuild", action="store_true", help="Ignora o watermark e refaz a exportação completa")
+    parser.add_argument("--alvo", action="append", metavar="NOME=DSN", help="Banco a exportar (pode repetir)")
+    parser.add_argument("--metricas", action="store_true", help="Mostra o tempo, as linhas e os bytes de cada etapa")
+    parser.add_argument("--perfil", default=METRICAS_PERFIL, metavar="ARQUIVO", help="Grava um perfil cProfile da execução")
+    args = parser.parse_args()
+    FULL_REBUILD = FULL_REBUILD or args.full_rebuild
+
+    medidores = []
+    try:
+        with perfil(args.perfil):
+            alvos = carregar_alvos(args.alvo)
+            if alvos:
+                inicio = time.perf_counter()
+                resultados = exportar_alvos(alvos, credenciais_env())
+                medidores = [Instrumentacao.de_registros(r.pop("registros")) for r in resultados]
+                imprimir_resumo(resultados, time.perf_counter() - inicio)
+                return
+
+            medidor = Instrumentacao("main", medir_memoria=METRICAS_MEMORIA)
+            medidores = [medidor]
+            try:
+                # Conexão do pool compartilhado, em transação snapshot somente leitura
+                pool = obter_pool(credenciais_env())
+                total_linhas, caminho, incremental = exportar_pool(pool, OUTPUT_PATH, medidor=medidor)
+            except BaseException:
+                medidor.finalizar(False)
+                raise
+            medidor.finalizar(True)
+
+        if total_linhas is None:
+            print("Nenhum dado encontrado na tabela 'contratos'.")
+        elif incremental:
+            print(f"Exportação incremental: {total_linhas} linha(s) nova(s) acrescentada(s) em '{caminho}'. 🚀")
+        else:
+            print(f"Arquivo '{caminho}' criado com sucesso! 🚀")
+
+    except fdb.DatabaseError as e:
+        print("Erro ao conectar ou consultar o Banco de Dados!")
+        print(f"Detalhes: {e}")
+
+    except PermissionError:
+        print("Permissão negada ao tentar sobrescrever o arquivo de saída. Feche o arquivo se ele estiver aberto e tente novamente.")
+
+    except Exception as e:
+        print(f"Erro inesperado: {e}")
+
+    finally:
+        if medidores:
+            if args.metricas:
+                imprimir_etapas(*medidores)
+            publicar_metricas(*medidores)
+        fechar_pools()
+
 
-        # Criar Workbook no openpyxl
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Dados Tratados"
-
-        # Adicionar o DataFrame à planilha
-        for row in dataframe_to_rows(df, index=False, header=True):
-            ws.append(row)
-
-        # Estilizar cabeçalho
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-        for cell in ws[1]:  # Linha 1 = Cabeçalho
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = Alignment(horizontal="center", vertical="center")
-
-        # Ajustar largura das colunas automaticamente
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if cell.value:
-                        max_length = max(max_length, len(str(cell.value)))
-                except Exception:
-                    pass
-            ws.column_dimensions[column_letter].width = max_length + 2
-
-        # Verificar se o arquivo já existe
-        if os.path.exists(OUTPUT_PATH):
-            os.remove(OUTPUT_PATH)
-
-        # Salvar arquivo
-        wb.save(OUTPUT_PATH)
-
-        print(f"Arquivo Excel '{OUTPUT_PATH}' criado com sucesso! 🚀")
-
-except fdb.DatabaseError as e:
-    print("Erro ao conectar ou consultar o Banco de Dados!")
-    print(f"Detalhes: {e}")
-
-except PermissionError:
-    print("Permissão negada ao tentar sobrescrever o arquivo Excel. Feche o arquivo se ele estiver aberto e tente novamente.")
-
-except Exception as e:
-    print(f"Erro inesperado: {e}")
-
-finally:
-    if cur is not None:
-        cur.close()
-    if con is not None:
-        con.close()
+if __name__ == "__main__":
+    main()
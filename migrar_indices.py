@@ -0,0 +1,144 @@
+import argparse
+from datetime import date, timedelta
+
+import fdb
+from dotenv import load_dotenv
+
+from agregacoes import CONSULTA_MENSAL, CONSULTA_MENSAL_CLIENTES, CONSULTA_ULTIMOS_PAGAMENTOS
+from banco import credenciais_env, fechar_pools, obter_pool
+from filtros import Filtro
+from paginacao import consulta_pagina
+
+# Carregar variáveis de ambiente do arquivo .env
+load_dotenv()
+
+# Índices usados pelas consultas filtradas: (nome, tabela, colunas, descendente).
+# O Firebird só percorre um índice no sentido em que foi criado, então o
+# ORDER BY DATA_PAGAMENTO DESC (últimos pagamentos, paginação) precisa de um
+# índice descendente próprio.
+INDICES_NECESSARIOS = [
+    ("IX_PAGAMENTOS_DATA", "PAGAMENTOS", ("DATA_PAGAMENTO",), False),
+    ("IX_PAGAMENTOS_DATA_DESC", "PAGAMENTOS", ("DATA_PAGAMENTO",), True),
+    ("IX_PAGAMENTOS_CONTRATO", "PAGAMENTOS", ("CONTRATO_ID",), False),
+    ("IX_CONTRATOS_CLIENTE", "CONTRATOS", ("CLIENTE_ID",), False),
+]
+
+# Índices existentes, inclusive os criados pelas chaves estrangeiras
+CONSULTA_INDICES = """
+    SELECT TRIM(idx.RDB$INDEX_NAME), TRIM(idx.RDB$RELATION_NAME),
+           COALESCE(idx.RDB$INDEX_TYPE, 0), COALESCE(idx.RDB$INDEX_INACTIVE, 0),
+           TRIM(seg.RDB$FIELD_NAME)
+    FROM RDB$INDICES idx
+    JOIN RDB$INDEX_SEGMENTS seg ON seg.RDB$INDEX_NAME = idx.RDB$INDEX_NAME
+    WHERE idx.RDB$RELATION_NAME IN ('PAGAMENTOS', 'CONTRATOS')
+    ORDER BY idx.RDB$INDEX_NAME, seg.RDB$FIELD_POSITION
+"""
+
+
+def consultas_filtradas():
+    """Consultas do dashboard com um filtro de exemplo (período e cliente), para conferir os planos."""
+    hoje = date.today()
+    filtro = Filtro(data_inicio=hoje - timedelta(days=90), data_fim=hoje, cliente="exemplo")
+    return {
+        "mensal": CONSULTA_MENSAL.format(filtro=filtro.sql),
+        "mensal por cliente": CONSULTA_MENSAL_CLIENTES.format(filtro=filtro.sql),
+        "últimos pagamentos": CONSULTA_ULTIMOS_PAGAMENTOS.format(limite=10, filtro=filtro.sql),
+        "paginação (recentes)": consulta_pagina("DESC", 100, True, filtro),
+        "paginação (antigos)": consulta_pagina("ASC", 100, True, filtro),
+    }
+
+
+def listar_indices(conexao):
+    """{nome: (tabela, colunas, descendente, ativo)} dos índices existentes."""
+    conexao.execute(CONSULTA_INDICES)
+    indices = {}
+    for nome, tabela, tipo, inativo, coluna in conexao.fetchall():
+        _, colunas, descendente, ativo = indices.get(nome, (tabela, (), tipo == 1, inativo == 0))
+        indices[nome] = (tabela, colunas + (coluna,), descendente, ativo)
+    return indices
+
+
+def indice_equivalente(indices, tabela, colunas, descendente):
+    """Nome de um índice existente que atende (mesmas colunas iniciais e sentido), ou None.
+
+    Prefere um índice ativo; um inativo só é retornado se não houver outro.
+    """
+    candidatos = [
+        (ativo, nome) for nome, (tabela_idx, colunas_idx, descendente_idx, ativo) in indices.items()
+        if tabela_idx == tabela and descendente_idx == descendente and colunas_idx[:len(colunas)] == colunas
+    ]
+    return max(candidatos)[1] if candidatos else None
+
+
+def imprimir_planos(conexao, titulo):
+    print(f"\n--- Planos {titulo} ---")
+    for nome, sql in consultas_filtradas().items():
+        # Prepara direto no cursor (e não pelo cache de preparados da conexão): o plano
+        # precisa refletir os índices atuais
+        try:
+            plano = conexao.cur.prep(sql).plan
+        except fdb.DatabaseError as e:
+            plano = f"erro ao preparar: {e}"
+        print(f"{nome}:\n  {plano}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Confere e cria os índices usados pelos filtros do dashboard.")
+    parser.add_argument("--aplicar", action="store_true", help="Cria/ativa os índices que faltam (sem isso, só mostra)")
+    args = parser.parse_args()
+
+    try:
+        pool = obter_pool(credenciais_env(), tamanho_maximo=1)
+        with pool.conexao() as conexao:
+            indices = listar_indices(conexao)
+            imprimir_planos(conexao, "atuais")
+
+            comandos = []
+            print("\n--- Índices ---")
+            for nome, tabela, colunas, descendente in INDICES_NECESSARIOS:
+                descricao = f"{tabela}({', '.join(colunas)}){' DESC' if descendente else ''}"
+                existente = indice_equivalente(indices, tabela, colunas, descendente)
+                if existente is None:
+                    print(f"Faltando: {descricao} -> {nome}")
+                    sentido = "DESCENDING " if descendente else ""
+                    comandos.append((f"CREATE {sentido}INDEX {nome} ON {tabela} ({', '.join(colunas)})", nome))
+                elif not indices[existente][3]:
+                    print(f"Inativo: {descricao} -> {existente}")
+                    comandos.append((f"ALTER INDEX {existente} ACTIVE", existente))
+                else:
+                    print(f"OK: {descricao} -> {existente}")
+
+            if not comandos:
+                print("\nNenhum índice faltando. ✅")
+                return
+            if not args.aplicar:
+                print("\nSimulação: nada foi alterado. Rode com --aplicar para executar:")
+                for comando, _ in comandos:
+                    print(f"  {comando};")
+                return
+
+            for comando, nome in comandos:
+                print(f"Executando: {comando}")
+                conexao.cur.execute(comando)
+                conexao.commit()
+            # Seletividade recalculada para o otimizador escolher os índices novos
+            for _, nome in comandos:
+                conexao.cur.execute(f"SET STATISTICS INDEX {nome}")
+            conexao.commit()
+
+            imprimir_planos(conexao, "depois da migração")
+            print(f"\n{len(comandos)} índice(s) criado(s) ou ativado(s). 🚀")
+
+    except fdb.DatabaseError as e:
+        print("Erro ao conectar ou alterar o Banco de Dados!")
+        print(f"Detalhes: {e}")
+
+    except Exception as e:
+        print(f"Erro inesperado: {e}")
+
+    finally:
+        fechar_pools()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import pandas as pd
+
+from filtros import SEM_FILTRO
+
+# Paginação por chave (keyset) sobre (DATA_PAGAMENTO, ID): cada página continua a
+# partir da última linha da anterior, em vez de usar deslocamento (SKIP), então
+# a página 1000 custa o mesmo que a primeira e só uma página fica em memória.
+# Pagamentos sem data não entram na navegação (não têm posição na ordenação).
+ORDENACOES = {
+    "Mais recentes primeiro": "DESC",
+    "Mais antigos primeiro": "ASC",
+}
+
+TAMANHOS_PAGINA = [25, 50, 100, 250, 500]
+
+CONSULTA_PAGINA = """
+    SELECT FIRST {limite}
+        cli.ID AS cliente_id,
+        cli.NOME AS cliente_nome,
+        pag.ID AS pagamento_id,
+        pag.DATA_PAGAMENTO AS data_pagamento,
+        pag.VALOR_PAGO AS valor_pago
+    FROM PAGAMENTOS pag
+    JOIN CONTRATOS con ON pag.CONTRATO_ID = con.ID
+    JOIN CLIENTES cli ON con.CLIENTE_ID = cli.ID
+    WHERE pag.DATA_PAGAMENTO IS NOT NULL{filtro}{cursor}
+    ORDER BY pag.DATA_PAGAMENTO {direcao}, pag.ID {direcao}
+"""
+
+# O Firebird não compara tuplas ((a, b) < (?, ?)): o primeiro termo usa o índice
+# de DATA_PAGAMENTO e o segundo desempata pelo ID dentro da mesma data
+CURSOR_PAGINA = " AND pag.DATA_PAGAMENTO {igual} ? AND (pag.DATA_PAGAMENTO {estrito} ? OR pag.ID {estrito} ?)"
+
+
+def consulta_pagina(direcao, tamanho, com_cursor, filtro=SEM_FILTRO):
+    """SQL de uma página; com cursor, começa depois da chave (data, id) informada."""
+    if direcao not in ("ASC", "DESC"):
+        raise ValueError(f"Direção de ordenação inválida: {direcao}")
+    cursor = ""
+    if com_cursor:
+        estrito, igual = ("<", "<=") if direcao == "DESC" else (">", ">=")
+        cursor = CURSOR_PAGINA.format(estrito=estrito, igual=igual)
+    # Uma linha a mais indica se existe próxima página
+    return CONSULTA_PAGINA.format(limite=int(tamanho) + 1, filtro=filtro.sql, cursor=cursor, direcao=direcao)
+
+
+def buscar_pagina(consultar, direcao, tamanho, cursor=None, filtro=SEM_FILTRO):
+    """Busca uma página. `consultar(sql, parametros)` retorna (colunas, linhas), como PoolConexoes.consultar.
+
+    Retorna (df_pagina, proximo_cursor); proximo_cursor é None na última página.
+    """
+    parametros = filtro.parametros
+    if cursor is not None:
+        data, identificador = cursor
+        parametros += (data, data, identificador)
+    colunas, linhas = consultar(consulta_pagina(direcao, tamanho, cursor is not None, filtro), parametros)
+
+    proximo_cursor = None
+    if len(linhas) > tamanho:
+        linhas = linhas[:tamanho]
+        ultima = linhas[-1]
+        proximo_cursor = (ultima[3], ultima[2])
+    df_pagina = pd.DataFrame(linhas, columns=[coluna.lower() for coluna in colunas])
+    return df_pagina, proximo_cursor
@@ -0,0 +1,179 @@
+"""Exportação dividida em arquivos (partes) gravados em processos paralelos.
+
+Uma planilha com milhões de linhas esbarra no limite do Excel e a gravação
+(compressão do xlsx) de um arquivo único roda em série. Aqui a saída é
+dividida em arquivos de até `limite_linhas` linhas (dados_parte001.xlsx,
+dados_parte002.xlsx, ...); cada parte completa é enviada a um processo do
+pool enquanto as próximas linhas continuam sendo lidas. Ao final, um
+manifesto JSON lista cada parte com a sua faixa de linhas.
+"""
+import glob
+import json
+import os
+import re
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+from exportadores import MOTORES, criar_exportador
+from instrumentacao import SEM_MEDICAO
+
+
+def caminho_manifesto(caminho):
+    """dados.xlsx -> dados.manifesto.json"""
+    return os.path.splitext(caminho)[0] + ".manifesto.json"
+
+
+def gravar_manifesto(caminho, formato, colunas, partes):
+    """Grava o manifesto (substitui o arquivo de forma atômica) e retorna o seu caminho."""
+    partes = [{**parte, "linhas": parte["ultima_linha"] - parte["primeira_linha"] + 1} for parte in partes]
+    manifesto = {
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "formato": formato,
+        "colunas": [str(coluna) for coluna in colunas],
+        "linhas": sum(parte["linhas"] for parte in partes),
+        "partes": partes,
+    }
+    destino = caminho_manifesto(caminho)
+    temporario = destino + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(manifesto, arquivo, ensure_ascii=False, indent=2)
+    os.replace(temporario, destino)
+    return destino
+
+
+def _gravar_parte(formato, caminho, colunas, larguras, df):
+    """Roda no processo do pool: grava uma parte completa e retorna o caminho gravado."""
+    exportador = criar_exportador(formato, caminho)
+    with exportador.abrir(colunas, larguras):
+        exportador.escrever(df)
+    return exportador.caminho
+
+
+class ExportadorPartes:
+    """Mesmo uso de um Exportador (abrir, escrever, fechar), com a saída dividida em arquivos.
+
+    As partes são gravadas com o sufixo `.novo` e só substituem as da
+    execução anterior quando todas terminam sem erro; partes antigas que
+    sobrarem (execução anterior com mais linhas) são removidas.
+    Com `processos` <= 1, as partes são gravadas no próprio processo.
+    """
+
+    suporta_acrescimo = False
+
+    def __init__(self, formato, caminho, limite_linhas, processos=2, medidor=SEM_MEDICAO):
+        self.formato = formato.strip().lower()
+        if self.formato not in MOTORES:
+            raise ValueError(f"Formato de saída '{formato}' não suportado. Use um de: {', '.join(MOTORES)}.")
+        self.extensao = MOTORES[self.formato].extensao
+        self.base = os.path.splitext(caminho)[0]
+        # O caminho informado ao usuário é o do manifesto
+        self.caminho = caminho_manifesto(caminho)
+        self.limite_linhas = int(limite_linhas)
+        self.processos = processos
+        self.medidor = medidor
+        self.colunas = []
+        self.linhas_escritas = 0
+
+    def caminho_parte(self, numero, novo=False):
+        return f"{self.base}_parte{numero:03d}{'.novo' if novo else ''}{self.extensao}"
+
+    def abrir(self, colunas, larguras=None):
+        self.colunas = list(colunas)
+        self.larguras = larguras
+        self.pendentes = []
+        self.futuros = []
+        self.partes = []
+        self.executor = ProcessPoolExecutor(max_workers=self.processos) if self.processos > 1 else None
+        return self
+
+    def escrever(self, df):
+        if df.empty:
+            return
+        with self.medidor.etapa("gravar", linhas=len(df)):
+            self.pendentes.append(df)
+            self.linhas_escritas += len(df)
+            while sum(len(parte) for parte in self.pendentes) >= self.limite_linhas:
+                self._enviar(self._recortar(self.limite_linhas))
+
+    def _recortar(self, quantidade):
+        """Retira as primeiras `quantidade` linhas dos lotes pendentes."""
+        lotes, total = [], 0
+        while self.pendentes and total < quantidade:
+            lote = self.pendentes.pop(0)
+            falta = quantidade - total
+            if len(lote) > falta:
+                self.pendentes.insert(0, lote.iloc[falta:])
+                lote = lote.iloc[:falta]
+            lotes.append(lote)
+            total += len(lote)
+        return pd.concat(lotes, ignore_index=True) if len(lotes) > 1 else lotes[0]
+
+    def _enviar(self, df):
+        numero = len(self.partes) + 1
+        primeira = self.partes[-1]["ultima_linha"] + 1 if self.partes else 1
+        self.partes.append({
+            "arquivo": os.path.basename(self.caminho_parte(numero)),
+            "primeira_linha": primeira,
+            "ultima_linha": primeira + len(df) - 1,
+        })
+        argumentos = (self.formato, self.caminho_parte(numero, novo=True), self.colunas, self.larguras, df)
+        if self.executor is None:
+            futuro = Future()
+            futuro.set_result(_gravar_parte(*argumentos))
+        else:
+            # No máximo uma parte por processo em andamento: limita a memória ocupada
+            while sum(not f.done() for f in self.futuros) >= self.processos:
+                next(f for f in self.futuros if not f.done()).result()
+            futuro = self.executor.submit(_gravar_parte, *argumentos)
+        self.futuros.append(futuro)
+
+    def fechar(self):
+        with self.medidor.etapa("salvar") as etapa:
+            if self.pendentes or not self.partes:
+                # Última parte (ou uma parte só com o cabeçalho, se não houver linhas)
+                restante = sum(len(parte) for parte in self.pendentes)
+                self._enviar(self._recortar(restante) if restante else pd.DataFrame(columns=self.colunas))
+            try:
+                for futuro in self.futuros:
+                    futuro.result()
+            finally:
+                self._encerrar_executor()
+
+            for numero in range(1, len(self.partes) + 1):
+                os.replace(self.caminho_parte(numero, novo=True), self.caminho_parte(numero))
+            self._remover_partes_antigas()
+            gravar_manifesto(self.base + self.extensao, self.formato, self.colunas, self.partes)
+            etapa.bytes = sum(os.path.getsize(self.caminho_parte(numero)) for numero in range(1, len(self.partes) + 1))
+
+    def descartar(self):
+        for futuro in self.futuros:
+            futuro.cancel()
+        self._encerrar_executor()
+        for numero in range(1, len(self.partes) + 1):
+            for caminho in (self.caminho_parte(numero, novo=True), self.caminho_parte(numero, novo=True) + ".tmp"):
+                if os.path.exists(caminho):
+                    os.remove(caminho)
+
+    def _encerrar_executor(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+    def _remover_partes_antigas(self):
+        padrao = re.compile(re.escape(os.path.basename(self.base)) + r"_parte(\d{3,})" + re.escape(self.extensao) + "$")
+        for caminho in glob.glob(f"{glob.escape(self.base)}_parte*{self.extensao}"):
+            encontrado = padrao.match(os.path.basename(caminho))
+            if encontrado and int(encontrado.group(1)) > len(self.partes):
+                os.remove(caminho)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.fechar()
+        else:
+            self.descartar()
+        return False
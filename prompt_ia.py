@@ -0,0 +1,134 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from insights_ia import montar_prompt
+
+# Aproximação usual para modelos como o Gemini: ~4 caracteres por token
+CARACTERES_POR_TOKEN = 4
+
+# Níveis de detalhe tentados em ordem, do mais completo ao mais resumido:
+# (meses recentes listados, clientes do ranking listados)
+NIVEIS_DETALHE = [(12, 10), (12, 5), (6, 5), (6, 3), (3, 3), (0, 3), (0, 0)]
+
+NOMES_MESES = ['jan', 'fev', 'mar', 'abr', 'mai', 'jun', 'jul', 'ago', 'set', 'out', 'nov', 'dez']
+
+
+def estimar_tokens(texto):
+    """Estimativa de tokens do texto (sem chamar a API de contagem)."""
+    return math.ceil(len(texto) / CARACTERES_POR_TOKEN)
+
+
+def _formatar_valor(valor):
+    return f"R$ {valor:,.2f}"
+
+
+def _variacao(atual, anterior):
+    if not anterior:
+        return "n/d"
+    return f"{(atual - anterior) / anterior:+.1%}"
+
+
+def resumo_mensal(df_mensal_sum, formatar=_formatar_valor):
+    """Estatísticas do total pago por mês: tendência, crescimento, quantis e sazonalidade."""
+    serie = df_mensal_sum['Total Pago'].astype(float).sort_index()
+    meses = pd.DatetimeIndex(serie.index)
+    valores = serie.to_numpy()
+    n = len(valores)
+
+    linhas = [
+        f"- Período: {meses[0]:%m/%Y} a {meses[-1]:%m/%Y} ({n} meses)",
+        f"- Média mensal: {formatar(valores.mean())}; mediana: {formatar(np.median(valores))}",
+        "- Quantis mensais (p10 / p50 / p90): " + " / ".join(formatar(q) for q in np.quantile(valores, [0.1, 0.5, 0.9])),
+        f"- Melhor mês: {meses[valores.argmax()]:%m/%Y} ({formatar(valores.max())}); "
+        f"pior mês: {meses[valores.argmin()]:%m/%Y} ({formatar(valores.min())})",
+    ]
+    if n >= 2:
+        # Inclinação da reta de tendência, relativa à média: crescimento médio por mês
+        inclinacao = np.polyfit(np.arange(n), valores, 1)[0]
+        linhas.append(f"- Tendência linear: {inclinacao / valores.mean():+.2%} da média por mês")
+        linhas.append(f"- Último mês vs. anterior: {_variacao(valores[-1], valores[-2])}")
+    if n >= 13:
+        linhas.append(f"- Último mês vs. mesmo mês do ano anterior: {_variacao(valores[-1], valores[-13])}")
+    if n >= 24:
+        linhas.append(f"- Últimos 12 meses vs. 12 anteriores: {_variacao(valores[-12:].sum(), valores[-24:-12].sum())}")
+    if n >= 12:
+        # Índice sazonal: média do mês do calendário / média geral
+        indice = serie.groupby(meses.month).mean() / valores.mean()
+        fortes = ", ".join(f"{NOMES_MESES[m - 1]} {v:.2f}" for m, v in indice.nlargest(3).items())
+        fracos = ", ".join(f"{NOMES_MESES[m - 1]} {v:.2f}" for m, v in indice.nsmallest(3).items())
+        linhas.append(f"- Sazonalidade (índice do mês / média): mais fortes {fortes}; mais fracos {fracos}")
+    return "\n".join(linhas)
+
+
+def meses_recentes(df_mensal_sum, quantidade, formatar=_formatar_valor):
+    """Os últimos meses com valor e variação sobre o mês anterior."""
+    serie = df_mensal_sum['Total Pago'].astype(float).sort_index()
+    variacoes = serie.pct_change()
+    linhas = []
+    for mes, valor in serie.tail(quantidade).items():
+        variacao = variacoes[mes]
+        texto_variacao = f" ({variacao:+.1%})" if pd.notna(variacao) and np.isfinite(variacao) else ""
+        linhas.append(f"{mes:%m/%Y}: {formatar(valor)}{texto_variacao}")
+    return "\n".join(linhas)
+
+
+def resumo_top_clientes(df_top_clients, total_revenue, quantidade, formatar=_formatar_valor):
+    """Concentração da receita nos maiores clientes e o ranking resumido."""
+    valores = df_top_clients['Total Pago'].astype(float)
+    linhas = []
+    if total_revenue:
+        for n in sorted({1, 3, len(valores)}):
+            if 0 < n <= len(valores):
+                grupo = "do maior cliente" if n == 1 else f"dos {n} maiores clientes"
+                linhas.append(f"- Participação {grupo} na receita: {valores.head(n).sum() / total_revenue:.1%}")
+    for posicao, (cliente, valor) in enumerate(valores.head(quantidade).items(), start=1):
+        linhas.append(f"{posicao}. {cliente}: {formatar(valor)}")
+    return "\n".join(linhas)
+
+
+class PromptCompacto:
+    """Prompt pronto para envio, com o tamanho e o custo estimados."""
+
+    def __init__(self, dados, texto, orcamento_tokens, preco_milhao_tokens):
+        self.dados = dados
+        self.texto = texto
+        self.tokens = estimar_tokens(texto)
+        self.orcamento_tokens = orcamento_tokens
+        self.custo_estimado = self.tokens * preco_milhao_tokens / 1_000_000
+
+    @property
+    def dentro_do_orcamento(self):
+        return self.tokens <= self.orcamento_tokens
+
+
+def compactar_prompt(df_mensal_sum, df_top_clients, total_revenue, num_unique_clients, avg_payment_value,
+                     orcamento_tokens=1500, preco_milhao_tokens=0.10, formatar=_formatar_valor):
+    """Monta o prompt da análise por IA dentro do orçamento de tokens.
+
+    Em vez das tabelas completas, envia estatísticas pré-calculadas (tendência,
+    crescimento, quantis, sazonalidade, concentração dos clientes) e só os
+    meses e clientes mais relevantes, reduzindo o detalhe até caber.
+    """
+    base = {
+        "Receita Total Geral": formatar(total_revenue),
+        "Número de Clientes Únicos com Pagamento": num_unique_clients,
+        "Valor Médio por Pagamento": formatar(avg_payment_value),
+        "Tendência do Total Pago por Mês": resumo_mensal(df_mensal_sum, formatar),
+    }
+
+    for quantidade_meses, quantidade_clientes in NIVEIS_DETALHE:
+        dados = dict(base)
+        if quantidade_meses:
+            dados[f"Total Pago nos Últimos {quantidade_meses} Meses (variação sobre o mês anterior)"] = (
+                meses_recentes(df_mensal_sum, quantidade_meses, formatar)
+            )
+        clientes = resumo_top_clientes(df_top_clients, total_revenue, quantidade_clientes, formatar)
+        if clientes:
+            dados["Maiores Clientes por Total Pago"] = clientes
+        prompt = PromptCompacto(dados, montar_prompt(dados), orcamento_tokens, preco_milhao_tokens)
+        if prompt.dentro_do_orcamento:
+            break
+    # Se nem o nível mais resumido couber, envia assim mesmo (o tamanho é informado)
+    return prompt
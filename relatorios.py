@@ -0,0 +1,289 @@
+"""Catálogo de relatórios: várias consultas exportadas em uma única execução.
+
+Cada relatório do catálogo (TOML) informa a consulta, as regras de tratamento
+e o arquivo/aba de saída:
+
+    [geral]
+    diretorio_saida = "C:/relatorios"    # base dos caminhos relativos
+    tipado = false                       # leitura tipada do colunar.py
+
+    [[relatorios]]
+    nome = "contratos"
+    consulta = "SELECT * FROM CONTRATOS"
+    arquivo = "relatorios.xlsx"
+    planilha = "Contratos"
+
+    [[relatorios]]
+    nome = "contratos_ativos"
+    consulta = "SELECT * FROM CONTRATOS"     # mesma consulta: buscada uma vez só
+    arquivo = "relatorios.xlsx"              # mesma pasta de trabalho: outra aba
+    planilha = "Ativos"
+    [relatorios.tratamento]
+    filtro = "STATUS == 'ativo'"             # expressão do DataFrame.query
+    colunas = ["ID", "CLIENTE_ID", "DATA_INICIO", "STATUS"]
+    ordenar = ["-DATA_INICIO"]               # "-" = decrescente
+
+    python relatorios.py --catalogo relatorios.toml
+
+Todas as consultas rodam na mesma transação snapshot somente leitura, então
+os relatórios enxergam o mesmo estado do banco e batem entre si. Consultas
+iguais (mesmo SQL, ignorando espaços, e mesmos parâmetros) são executadas uma
+vez, e o resultado fica em memória só até o último relatório que o usa. As
+abas de uma mesma pasta xlsx são gravadas em sequência em um único Workbook
+write-only.
+"""
+import argparse
+import os
+import time
+import tomllib
+from collections import Counter
+from contextlib import ExitStack
+
+import fdb
+import pandas as pd
+from dotenv import load_dotenv
+
+from banco import com_retentativa, credenciais_env, fechar_pools, obter_pool
+from colunar import ler_colunar
+from exportadores import MOTORES, criar_exportador, larguras_colunas
+from instrumentacao import (
+    METRICAS_MEMORIA,
+    METRICAS_PERFIL,
+    SEM_MEDICAO,
+    Instrumentacao,
+    imprimir_etapas,
+    perfil,
+    publicar_metricas,
+)
+
+# Carregar variáveis de ambiente do arquivo .env
+load_dotenv()
+
+RELATORIOS_CATALOGO = os.getenv("RELATORIOS_CATALOGO", "relatorios.toml")
+
+# Regras aceitas em [relatorios.tratamento]
+REGRAS_TRATAMENTO = ("remover_nulos", "remover_duplicadas", "filtro", "colunas", "renomear", "ordenar", "limite")
+
+# Restrições do Excel para nomes de abas
+CARACTERES_INVALIDOS_PLANILHA = set('[]:*?/\\')
+TAMANHO_MAXIMO_PLANILHA = 31
+
+
+class Relatorio:
+    def __init__(self, definicao, diretorio_saida=""):
+        self.nome = definicao["nome"]
+        self.consulta = definicao["consulta"]
+        self.parametros = tuple(definicao.get("parametros", ()))
+        self.arquivo = os.path.join(diretorio_saida, definicao["arquivo"])
+        self.formato = os.path.splitext(self.arquivo)[1].lstrip(".").lower()
+        if self.formato not in MOTORES:
+            raise ValueError(f"Relatório '{self.nome}': extensão de '{self.arquivo}' não suportada. Use um de: {', '.join(MOTORES)}.")
+        self.planilha = definicao.get("planilha", self.nome)
+        if len(self.planilha) > TAMANHO_MAXIMO_PLANILHA or CARACTERES_INVALIDOS_PLANILHA & set(self.planilha):
+            raise ValueError(f"Relatório '{self.nome}': nome de aba inválido '{self.planilha}' (até 31 caracteres, sem []:*?/\\).")
+        # Sem regras, o tratamento é o mesmo do main.py: linhas com nulos são removidas
+        self.tratamento = {"remover_nulos": True, **definicao.get("tratamento", {})}
+        desconhecidas = set(self.tratamento) - set(REGRAS_TRATAMENTO)
+        if desconhecidas:
+            raise ValueError(f"Relatório '{self.nome}': regra(s) de tratamento desconhecida(s): {', '.join(sorted(desconhecidas))}.")
+
+    @property
+    def chave_consulta(self):
+        """Identifica consultas iguais: SQL sem diferenças de espaços e quebras de linha, e os parâmetros."""
+        return " ".join(self.consulta.split()).rstrip(";"), self.parametros
+
+
+def carregar_catalogo(caminho):
+    """Lê o catálogo TOML e retorna (geral, relatorios)."""
+    with open(caminho, "rb") as arquivo:
+        catalogo = tomllib.load(arquivo)
+    geral = catalogo.get("geral", {})
+    relatorios = [Relatorio(definicao, geral.get("diretorio_saida", "")) for definicao in catalogo.get("relatorios", [])]
+    if not relatorios:
+        raise ValueError(f"Nenhum relatório definido em '{caminho}'.")
+
+    nomes = [relatorio.nome for relatorio in relatorios]
+    if len(set(nomes)) != len(nomes):
+        raise ValueError("Os nomes dos relatórios devem ser únicos.")
+    destinos = Counter((os.path.normcase(os.path.abspath(r.arquivo)), r.planilha.lower()) for r in relatorios)
+    for relatorio in relatorios:
+        if relatorio.formato != "xlsx" and sum(1 for r in relatorios if r.arquivo == relatorio.arquivo) > 1:
+            raise ValueError(f"Só arquivos xlsx recebem mais de um relatório (abas): '{relatorio.arquivo}'.")
+        if destinos[(os.path.normcase(os.path.abspath(relatorio.arquivo)), relatorio.planilha.lower())] > 1:
+            raise ValueError(f"Aba '{relatorio.planilha}' repetida em '{relatorio.arquivo}'.")
+    return geral, relatorios
+
+
+def tratar(df, tratamento):
+    """Aplica as regras de tratamento do relatório (sem alterar o DataFrame compartilhado)."""
+    filtro = tratamento.get("filtro")
+    if filtro:
+        df = df.query(filtro)
+    colunas = tratamento.get("colunas")
+    if colunas:
+        df = df[list(colunas)]
+    remover_nulos = tratamento.get("remover_nulos")
+    if remover_nulos:
+        df = df.dropna(subset=None if remover_nulos is True else list(remover_nulos))
+    remover_duplicadas = tratamento.get("remover_duplicadas")
+    if remover_duplicadas:
+        df = df.drop_duplicates(subset=None if remover_duplicadas is True else list(remover_duplicadas))
+    ordenar = tratamento.get("ordenar")
+    if ordenar:
+        df = df.sort_values(
+            [coluna.lstrip("-") for coluna in ordenar],
+            ascending=[not coluna.startswith("-") for coluna in ordenar],
+            kind="stable",
+        )
+    limite = tratamento.get("limite")
+    if limite is not None:
+        df = df.head(int(limite))
+    renomear = tratamento.get("renomear")
+    if renomear:
+        df = df.rename(columns=dict(renomear))
+    return df
+
+
+def _buscar(cur, relatorio, tipado, medidor):
+    with medidor.etapa("consultar"):
+        cur.execute(relatorio.consulta, relatorio.parametros)
+    with medidor.etapa("buscar") as etapa:
+        if tipado:
+            df = ler_colunar(cur)
+        else:
+            colunas = [desc[0] for desc in cur.description]
+            df = pd.DataFrame(cur.fetchall(), columns=colunas)
+        etapa.linhas = len(df)
+        etapa.bytes = int(df.memory_usage(index=True).sum())
+    return df
+
+
+def executar_catalogo(cur, relatorios, tipado=False, medidor=SEM_MEDICAO):
+    """Executa os relatórios no cursor informado (uma única transação) e grava as saídas.
+
+    Retorna uma lista com, para cada relatório, nome, arquivo, planilha, linhas
+    e se a consulta foi reaproveitada de outro relatório.
+    """
+    # Quantos relatórios ainda vão usar cada consulta: o resultado é liberado depois do último
+    usos = Counter(relatorio.chave_consulta for relatorio in relatorios)
+    resultados_consultas = {}
+
+    # Relatórios agrupados por arquivo, na ordem do catálogo
+    por_arquivo = {}
+    for relatorio in relatorios:
+        por_arquivo.setdefault(relatorio.arquivo, []).append(relatorio)
+
+    resultados = []
+    for arquivo, grupo in por_arquivo.items():
+        exportador = criar_exportador(grupo[0].formato, arquivo, medidor=medidor)
+        exportador.titulo_planilha = grupo[0].planilha
+        with ExitStack() as pilha:
+            for indice, relatorio in enumerate(grupo):
+                chave = relatorio.chave_consulta
+                reaproveitada = chave in resultados_consultas
+                if not reaproveitada:
+                    resultados_consultas[chave] = _buscar(cur, relatorio, tipado, medidor)
+                df = resultados_consultas[chave]
+                usos[chave] -= 1
+                if usos[chave] == 0:
+                    del resultados_consultas[chave]
+
+                with medidor.etapa("tratar") as etapa:
+                    df = tratar(df, relatorio.tratamento)
+                    etapa.linhas = len(df)
+                with medidor.etapa("larguras"):
+                    larguras = larguras_colunas(df)
+
+                linhas_antes = exportador.linhas_escritas
+                if indice == 0:
+                    pilha.enter_context(exportador.abrir(df.columns, larguras))
+                else:
+                    exportador.nova_planilha(relatorio.planilha, df.columns, larguras)
+                exportador.escrever(df)
+                resultados.append({
+                    "relatorio": relatorio.nome,
+                    "arquivo": exportador.caminho,
+                    "planilha": relatorio.planilha if relatorio.formato == "xlsx" else None,
+                    "linhas": exportador.linhas_escritas - linhas_antes,
+                    "reaproveitada": reaproveitada,
+                })
+                del df
+    return resultados
+
+
+def executar_pool(pool, relatorios, tipado=False, medidor=SEM_MEDICAO):
+    """Executa o catálogo em uma conexão do pool, em uma transação snapshot somente leitura."""
+    def executar():
+        with ExitStack() as pilha:
+            with medidor.etapa("conectar"):
+                conexao = pilha.enter_context(pool.leitura())
+            return executar_catalogo(conexao, relatorios, tipado, medidor)
+
+    # Erros transitórios refazem o catálogo inteiro, em um novo snapshot
+    return com_retentativa(executar)
+
+
+def imprimir_resultados(resultados, segundos):
+    print(f"\n{'Relatório':<24} {'Linhas':>10}  Arquivo")
+    for r in resultados:
+        destino = f"{r['arquivo']} [{r['planilha']}]" if r["planilha"] else r["arquivo"]
+        reaproveitada = " (consulta reaproveitada)" if r["reaproveitada"] else ""
+        print(f"{r['relatorio']:<24} {r['linhas']:>10}  {destino}{reaproveitada}")
+    consultas = sum(1 for r in resultados if not r["reaproveitada"])
+    arquivos = len({r["arquivo"] for r in resultados})
+    print(f"\n{len(resultados)} relatório(s), {consultas} consulta(s), {arquivos} arquivo(s) em {segundos:.1f}s. 🚀")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Executa um catálogo de relatórios em um único snapshot do banco.")
+    parser.add_argument("--catalogo", default=RELATORIOS_CATALOGO, help="Arquivo TOML com os relatórios")
+    parser.add_argument("--apenas", action="append", metavar="RELATORIO", help="Executa só os relatórios informados (pode repetir)")
+    parser.add_argument("--metricas", action="store_true", help="Mostra o tempo, as linhas e os bytes de cada etapa")
+    parser.add_argument("--perfil", default=METRICAS_PERFIL, metavar="ARQUIVO", help="Grava um perfil cProfile da execução")
+    args = parser.parse_args()
+
+    medidor = None
+    try:
+        geral, relatorios = carregar_catalogo(args.catalogo)
+        if args.apenas:
+            desconhecidos = set(args.apenas) - {relatorio.nome for relatorio in relatorios}
+            if desconhecidos:
+                print(f"Relatório(s) não encontrado(s) em '{args.catalogo}': {', '.join(sorted(desconhecidos))}")
+                return
+            relatorios = [relatorio for relatorio in relatorios if relatorio.nome in args.apenas]
+
+        medidor = Instrumentacao("relatorios", medir_memoria=METRICAS_MEMORIA)
+        inicio = time.perf_counter()
+        with perfil(args.perfil):
+            try:
+                pool = obter_pool(credenciais_env(), tamanho_maximo=1)
+                resultados = executar_pool(pool, relatorios, bool(geral.get("tipado", False)), medidor)
+            except BaseException:
+                medidor.finalizar(False)
+                raise
+            medidor.finalizar(True)
+        imprimir_resultados(resultados, time.perf_counter() - inicio)
+
+    except (OSError, ValueError, KeyError, tomllib.TOMLDecodeError) as e:
+        if isinstance(e, PermissionError):
+            print("Permissão negada ao tentar sobrescrever um arquivo de saída. Feche o arquivo se ele estiver aberto e tente novamente.")
+        else:
+            print(f"Erro no catálogo de relatórios: {e}")
+
+    except fdb.DatabaseError as e:
+        print("Erro ao conectar ou consultar o Banco de Dados!")
+        print(f"Detalhes: {e}")
+
+    except Exception as e:
+        print(f"Erro inesperado: {e}")
+
+    finally:
+        if medidor is not None:
+            if args.metricas:
+                imprimir_etapas(medidor)
+            publicar_metricas(medidor)
+        fechar_pools()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""Resumos materializados dos pagamentos, atualizados de forma incremental.
+
+Os resumos ficam em um diretório local em Parquet (requer o pacote `pyarrow`):
+
+* mensal_clientes: total e quantidade de pagamentos por cliente e mês, com o
+  valor acumulado do cliente até o mês;
+* mensal: receita total por mês;
+* clientes: total e quantidade de pagamentos por cliente.
+
+A atualização guarda o maior ID de PAGAMENTOS já resumido e, nas execuções
+seguintes, recalcula apenas os meses que receberam pagamentos novos. Como o
+controle é pelo ID, alterações e exclusões de pagamentos antigos só entram
+com uma reconstrução completa (`completo=True`).
+"""
+import json
+import os
+import shutil
+import time
+
+import pandas as pd
+
+from agregacoes import CONSULTA_RESUMO_CLIENTES, FILTRO_PERIODO
+
+# Índice da versão corrente dos resumos (lista os arquivos Parquet que a compõem)
+ARQUIVO_INDICE = "atual.json"
+# Mudanças no formato dos resumos forçam a reconstrução completa
+VERSAO_RESUMOS = 2
+
+CONSULTA_ULTIMO_PAGAMENTO = "SELECT MAX(ID) FROM PAGAMENTOS"
+CONSULTA_MESES_NOVOS = (
+    "SELECT DISTINCT EXTRACT(YEAR FROM DATA_PAGAMENTO), EXTRACT(MONTH FROM DATA_PAGAMENTO)"
+    " FROM PAGAMENTOS WHERE ID > ? AND ID <= ? AND DATA_PAGAMENTO IS NOT NULL"
+)
+
+COLUNAS_MENSAL_CLIENTES = ['cliente_id', 'cliente_nome', 'mes_pagamento', 'valor_pago', 'quantidade']
+
+
+class ArmazenamentoResumos:
+    """Diretório com os resumos em Parquet, trocados de forma atômica para os leitores.
+
+    Cada mês de mensal_clientes fica em um arquivo próprio, e o atual.json lista
+    os arquivos da versão corrente. Uma gravação só cria arquivos novos (nunca
+    altera os da versão corrente) e depois troca o atual.json com os.replace: o
+    dashboard lê a versão anterior inteira ou a nova inteira, nunca um diretório
+    vazio. Na atualização incremental só os meses alterados são regravados,
+    além de mensal e clientes, que são pequenos. Os arquivos de uma versão só são
+    apagados duas versões depois, para não sumirem durante uma leitura.
+    """
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+
+    def _caminho(self, nome):
+        return os.path.join(self.diretorio, nome)
+
+    def _ler_indice(self):
+        try:
+            with open(self._caminho(ARQUIVO_INDICE), encoding="utf-8") as arquivo:
+                indice = json.load(arquivo)
+        except (OSError, ValueError):
+            return None
+        return indice if indice.get("versao") == VERSAO_RESUMOS else None
+
+    def ler(self):
+        """Retorna o dicionário dos resumos ou None se não existirem (ou forem de outra versão)."""
+        for _ in range(2):
+            indice = self._ler_indice()
+            if indice is None:
+                return None
+            try:
+                return self._carregar(indice)
+            except FileNotFoundError:
+                # Versão substituída e apagada durante a leitura: relê o índice novo
+                continue
+            except (OSError, ValueError, ImportError):
+                return None
+        return None
+
+    def _carregar(self, indice):
+        partes = [pd.read_parquet(self._caminho(nome)) for _, nome in sorted(indice["meses"].items())]
+        mensal_clientes = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=COLUNAS_MENSAL_CLIENTES)
+        return {
+            'mensal_clientes': _acumular(mensal_clientes),
+            'mensal': pd.read_parquet(self._caminho(indice["mensal"])),
+            'clientes': pd.read_parquet(self._caminho(indice["clientes"])),
+            'ultimo_pagamento_id': indice["ultimo_pagamento_id"],
+            'atualizado_em': indice["atualizado_em"],
+            'versao': indice["versao"],
+        }
+
+    def gravar(self, resumos, meses=None):
+        """Grava uma nova versão; `meses` limita os meses regravados (None regrava todos).
+
+        Erros são repassados (um resumo que não foi gravado não pode ser dado como atualizado).
+        """
+        os.makedirs(self.diretorio, exist_ok=True)
+        anterior = self._ler_indice()
+        # Sufixo único por gravação: dois processos gravando ao mesmo tempo não se sobrescrevem
+        sufixo = f"{time.time_ns():x}_{os.getpid()}"
+
+        mensal_clientes = resumos['mensal_clientes']
+        chave_mes = mensal_clientes['mes_pagamento'].dt.strftime('%Y-%m')
+        presentes = set(chave_mes)
+        arquivos_meses = {}
+        if anterior is not None and meses is not None:
+            # Meses sem alteração continuam nos arquivos da versão anterior (se ainda existirem)
+            arquivos_meses = {
+                mes: nome for mes, nome in anterior["meses"].items()
+                if mes in presentes and os.path.exists(self._caminho(nome))
+            }
+        alterados = (presentes - set(arquivos_meses)) | ({mes.strftime('%Y-%m') for mes in meses or ()} & presentes)
+
+        criados = []
+        try:
+            for mes in sorted(alterados):
+                nome = f"mensal_clientes_{mes}_{sufixo}.parquet"
+                criados.append(nome)
+                mensal_clientes.loc[chave_mes == mes, COLUNAS_MENSAL_CLIENTES].to_parquet(self._caminho(nome), index=False)
+                arquivos_meses[mes] = nome
+            for chave in ('mensal', 'clientes'):
+                nome = f"{chave}_{sufixo}.parquet"
+                criados.append(nome)
+                resumos[chave].to_parquet(self._caminho(nome), index=False)
+
+            indice = {
+                "versao": VERSAO_RESUMOS,
+                "ultimo_pagamento_id": int(resumos['ultimo_pagamento_id']),
+                "atualizado_em": resumos['atualizado_em'],
+                "mensal": f"mensal_{sufixo}.parquet",
+                "clientes": f"clientes_{sufixo}.parquet",
+                "meses": arquivos_meses,
+                # Arquivos da versão substituída: apagados só na próxima gravação
+                "anteriores": sorted(_arquivos(anterior)) if anterior is not None else [],
+            }
+            temporario = self._caminho(f"{ARQUIVO_INDICE}.{sufixo}.tmp")
+            criados.append(os.path.basename(temporario))
+            with open(temporario, "w", encoding="utf-8") as arquivo:
+                json.dump(indice, arquivo, ensure_ascii=False)
+            os.replace(temporario, self._caminho(ARQUIVO_INDICE))
+        except BaseException:
+            for nome in criados:
+                try:
+                    os.remove(self._caminho(nome))
+                except OSError:
+                    pass
+            raise
+
+        # Versão de duas gravações atrás: nenhum leitor começa a lê-la a partir de agora
+        if anterior is not None:
+            for nome in set(anterior.get("anteriores", [])) - _arquivos(anterior) - _arquivos(indice):
+                try:
+                    os.remove(self._caminho(nome))
+                except OSError:
+                    pass
+
+    def invalidar(self):
+        shutil.rmtree(self.diretorio, ignore_errors=True)
+
+
+def _arquivos(indice):
+    return {indice["mensal"], indice["clientes"], *indice["meses"].values()}
+
+
+def _acumular(mensal_clientes):
+    """Ordena por cliente e mês e calcula o valor acumulado do cliente até cada mês."""
+    mensal_clientes = mensal_clientes.sort_values(['cliente_id', 'mes_pagamento'], ignore_index=True)
+    mensal_clientes['valor_acumulado'] = mensal_clientes.groupby('cliente_id')['valor_pago'].cumsum()
+    return mensal_clientes
+
+
+def _consultar_resumo(cur, inicio=None, fim=None):
+    """Totais por cliente e mês, do banco inteiro ou do período [inicio, fim)."""
+    if inicio is None:
+        cur.execute(CONSULTA_RESUMO_CLIENTES.format(filtro=""))
+    else:
+        cur.execute(CONSULTA_RESUMO_CLIENTES.format(filtro=FILTRO_PERIODO), (inicio.to_pydatetime(), fim.to_pydatetime()))
+    linhas = cur.fetchall()
+    return pd.DataFrame({
+        'cliente_id': [linha[0] for linha in linhas],
+        'cliente_nome': [linha[1] for linha in linhas],
+        'mes_pagamento': pd.to_datetime([pd.Timestamp(int(linha[2]), int(linha[3]), 1) for linha in linhas]),
+        'valor_pago': [float(linha[4]) for linha in linhas],
+        'quantidade': [int(linha[5]) for linha in linhas],
+    }, columns=COLUNAS_MENSAL_CLIENTES)
+
+
+def _periodos_contiguos(meses):
+    """Agrupa meses em intervalos [inicio, fim) de meses consecutivos (uma consulta por intervalo)."""
+    periodos = []
+    for mes in sorted(meses):
+        proximo = mes + pd.offsets.MonthBegin(1)
+        if periodos and periodos[-1][1] == mes:
+            periodos[-1][1] = proximo
+        else:
+            periodos.append([mes, proximo])
+    return periodos
+
+
+def derivar_resumos(mensal_clientes, ultimo_pagamento_id):
+    """Monta o conjunto completo de resumos a partir da tabela por cliente e mês."""
+    mensal_clientes = _acumular(mensal_clientes)
+
+    mensal = mensal_clientes.groupby('mes_pagamento', as_index=False)[['valor_pago', 'quantidade']].sum()
+    clientes = mensal_clientes.groupby(['cliente_id', 'cliente_nome'], as_index=False)[['valor_pago', 'quantidade']].sum()
+    return {
+        'mensal_clientes': mensal_clientes,
+        'mensal': mensal.sort_values('mes_pagamento', ignore_index=True),
+        'clientes': clientes,
+        'ultimo_pagamento_id': int(ultimo_pagamento_id),
+        'atualizado_em': time.time(),
+        'versao': VERSAO_RESUMOS,
+    }
+
+
+def atualizar_resumos(cur, armazenamento, completo=False):
+    """Atualiza os resumos com os pagamentos novos (ou reconstrói tudo).
+
+    Deve rodar em uma transação snapshot (pool.leitura()), para que o maior ID
+    e os totais recalculados enxerguem o mesmo estado do banco. Retorna um
+    dicionário com o que foi feito.
+    """
+    atuais = None if completo else armazenamento.ler()
+
+    cur.execute(CONSULTA_ULTIMO_PAGAMENTO)
+    ultimo_id = int(cur.fetchone()[0] or 0)
+
+    if atuais is None:
+        resumos = derivar_resumos(_consultar_resumo(cur), ultimo_id)
+        armazenamento.gravar(resumos)
+        return {'modo': 'completo', 'meses': len(resumos['mensal']), 'ultimo_pagamento_id': ultimo_id}
+
+    id_anterior = atuais['ultimo_pagamento_id']
+    if ultimo_id <= id_anterior:
+        return {'modo': 'sem_alteracoes', 'meses': 0, 'ultimo_pagamento_id': id_anterior}
+
+    cur.execute(CONSULTA_MESES_NOVOS, (id_anterior, ultimo_id))
+    meses = [pd.Timestamp(int(ano), int(mes), 1) for ano, mes in cur.fetchall()]
+
+    mensal_clientes = atuais['mensal_clientes'][COLUNAS_MENSAL_CLIENTES]
+    novos = []
+    for inicio, fim in _periodos_contiguos(meses):
+        # O mês inteiro é recalculado: soma corretamente pagamentos novos e já existentes
+        no_periodo = (mensal_clientes['mes_pagamento'] >= inicio) & (mensal_clientes['mes_pagamento'] < fim)
+        mensal_clientes = mensal_clientes[~no_periodo]
+        novos.append(_consultar_resumo(cur, inicio, fim))
+
+    resumos = derivar_resumos(pd.concat([mensal_clientes, *novos], ignore_index=True), ultimo_id)
+    armazenamento.gravar(resumos, meses)
+    return {'modo': 'incremental', 'meses': len(meses), 'ultimo_pagamento_id': ultimo_id}
@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+# Os módulos do projeto ficam na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import CursorSQLite, conectar_sqlite, criar_banco  # noqa: E402
+from gerador_dados import calcular_linhas  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def banco_sqlite(tmp_path_factory):
+    """Banco SQLite de teste com o esquema do Firebird (o mesmo do benchmark.py)."""
+    caminho = str(tmp_path_factory.mktemp("banco") / "teste.db")
+    criar_banco(caminho, calcular_linhas(40), semente=42)
+    return caminho
+
+
+@pytest.fixture
+def cur(banco_sqlite):
+    con = conectar_sqlite(banco_sqlite)
+    yield CursorSQLite(con.cursor())
+    con.close()
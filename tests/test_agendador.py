@@ -0,0 +1,48 @@
+import json
+import time
+
+from agendador import Agendador, Historico, Tarefa
+
+
+def tarefa_rapida(pool, valor):
+    return {"valor": valor}
+
+
+def tarefa_travada(pool):
+    time.sleep(600)
+
+
+def tarefa_com_erro(pool):
+    raise ValueError("consulta inválida")
+
+
+def executar(tmp_path, funcao, **definicao):
+    tarefa = Tarefa({"nome": "teste", "cron": "0 6 * * *", "funcao": f"{__name__}:{funcao}", **definicao})
+    caminho = tmp_path / "historico.jsonl"
+    agendador = Agendador([tarefa], Historico(str(caminho)), max_paralelo=1)
+    agendador.disparar(tarefa)
+    agendador.parar()
+    return [json.loads(linha) for linha in caminho.read_text(encoding="utf-8").splitlines()]
+
+
+def test_tarefa_travada_e_encerrada_no_timeout(tmp_path):
+    inicio = time.perf_counter()
+    historico = executar(tmp_path, "tarefa_travada", timeout_segundos=3)
+
+    assert [registro["status"] for registro in historico] == ["tempo_esgotado"]
+    assert time.perf_counter() - inicio < 60
+
+
+def test_resultado_e_erro_voltam_do_processo(tmp_path):
+    historico = executar(tmp_path, "tarefa_rapida", timeout_segundos=60, argumentos={"valor": 7})
+    assert historico[0]["status"] == "sucesso"
+    assert historico[0]["resultado"] == {"valor": 7}
+
+    historico = executar(tmp_path, "tarefa_com_erro", timeout_segundos=60)
+    assert historico[-1]["status"] == "erro"
+    assert "consulta inválida" in historico[-1]["erro"]
+
+
+def test_sem_timeout_roda_na_thread(tmp_path):
+    historico = executar(tmp_path, "tarefa_rapida", argumentos={"valor": 1})
+    assert historico[0]["resultado"] == {"valor": 1}
@@ -0,0 +1,68 @@
+import shutil
+
+import pandas as pd
+
+from agregacoes import CONSULTA_PAGAMENTOS, calcular_agregados_pandas, calcular_agregados_sql, diferencas_agregados
+from benchmark import CursorSQLite, conectar_sqlite
+from colunar import ler_colunar
+
+
+def pagamentos_dataframe(cur):
+    cur.execute(CONSULTA_PAGAMENTOS.format(filtro=""))
+    return pd.DataFrame(cur.fetchall(), columns=[desc[0] for desc in cur.description])
+
+
+def pagamentos_colunar(cur):
+    cur.execute(CONSULTA_PAGAMENTOS.format(filtro=""))
+    return ler_colunar(cur)
+
+
+def test_sql_e_pandas_iguais(cur):
+    agregados_sql = calcular_agregados_sql(cur)
+    agregados_pandas = calcular_agregados_pandas(pagamentos_dataframe(cur))
+
+    assert agregados_sql['total_revenue'] > 0
+    assert diferencas_agregados(agregados_sql, agregados_pandas) == []
+
+
+def test_sql_e_pandas_colunar_iguais(cur):
+    agregados_sql = calcular_agregados_sql(cur)
+    agregados_pandas = calcular_agregados_pandas(pagamentos_colunar(cur))
+
+    assert diferencas_agregados(agregados_sql, agregados_pandas) == []
+
+
+def test_mensal_clientes_mesmas_linhas_com_colunar(cur):
+    df_pagamentos = pagamentos_colunar(cur)
+    # O caso que importa: nome categórico (o groupby precisa de observed=True)
+    assert isinstance(df_pagamentos['cliente_nome'].dtype, pd.CategoricalDtype)
+
+    agregados_sql = calcular_agregados_sql(cur)
+    agregados_pandas = calcular_agregados_pandas(df_pagamentos)
+
+    assert len(agregados_pandas['df_mensal_clientes']) == len(agregados_sql['df_mensal_clientes'])
+    assert len(agregados_pandas['df_top_clients']) == len(agregados_sql['df_top_clients'])
+
+
+def test_ultimos_pagamentos_completos_com_nulos_recentes(banco_sqlite, tmp_path):
+    caminho = str(tmp_path / "banco.db")
+    shutil.copy(banco_sqlite, caminho)
+    con = conectar_sqlite(caminho)
+    try:
+        # Os pagamentos mais recentes sem valor: o FIRST N não pode contá-los
+        con.execute(
+            "UPDATE PAGAMENTOS SET VALOR_PAGO = NULL WHERE ID IN"
+            " (SELECT ID FROM PAGAMENTOS WHERE DATA_PAGAMENTO IS NOT NULL ORDER BY DATA_PAGAMENTO DESC LIMIT 5)"
+        )
+        cur = CursorSQLite(con.cursor())
+        agregados_sql = calcular_agregados_sql(cur, limite_ultimos=10, limite_brutos=10)
+        agregados_pandas = calcular_agregados_pandas(pagamentos_dataframe(cur), limite_ultimos=10)
+    finally:
+        con.close()
+
+    ultimos = agregados_sql['df_latest_payments']
+    assert len(ultimos) == 10
+    assert ultimos['valor_pago'].notna().all()
+    assert list(ultimos['data_pagamento']) == list(agregados_pandas['df_latest_payments']['data_pagamento'])
+    # Os dados brutos continuam mostrando as linhas incompletas
+    assert agregados_sql['df_brutos']['valor_pago'].isna().sum() == 5
@@ -0,0 +1,25 @@
+import os
+
+import main
+
+
+def exportar_ou_morrer(nome, dsn, credenciais):
+    if nome == "quebrado":
+        # Simula o processo morto pelo sistema (falta de memória, segfault)
+        os._exit(1)
+    return {"alvo": nome, "linhas": 1, "arquivo": f"{nome}.xlsx", "incremental": False, "erro": None,
+            "registros": main.Instrumentacao("main", {"alvo": nome}).finalizar(True).registros(), "segundos": 0.0}
+
+
+def test_processo_morto_vira_erro_do_alvo(monkeypatch, capsys):
+    monkeypatch.setattr(main, "exportar_alvo", exportar_ou_morrer)
+
+    resultados = main.exportar_alvos([("quebrado", "a"), ("filial1", "b")], {}, max_workers=1)
+
+    assert [r["alvo"] for r in resultados] == ["quebrado", "filial1"]
+    assert "BrokenProcessPool" in resultados[0]["erro"]
+    assert resultados[0]["linhas"] is None
+    # O resumo continua sendo impresso, e as métricas de cada alvo reconstruídas
+    main.imprimir_resumo(resultados, 1.0)
+    assert "ERRO" in capsys.readouterr().out
+    assert [main.Instrumentacao.de_registros(r["registros"]).rotulos for r in resultados] == [{"alvo": "quebrado"}, {"alvo": "filial1"}]
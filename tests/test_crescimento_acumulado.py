@@ -0,0 +1,19 @@
+import pandas as pd
+
+from crescimento_acumulado import calcular_crescimento_acumulado
+
+
+def test_nome_categorico_igual_ao_texto():
+    df = pd.DataFrame({
+        'cliente_id': [1, 1, 2, 3],
+        'cliente_nome': ['Ana', 'Ana', 'Bia', 'Caio'],
+        'mes_pagamento': pd.to_datetime(['2024-01-01', '2024-02-01', '2024-01-01', '2024-03-01']),
+        'valor_pago': [10.0, 5.0, 7.0, 1.0],
+    })
+    categorico = df.assign(cliente_nome=df['cliente_nome'].astype('category'))
+
+    esperado = calcular_crescimento_acumulado(df, top_n=2)
+    resultado = calcular_crescimento_acumulado(categorico, top_n=2)
+
+    pd.testing.assert_frame_equal(resultado, esperado)
+    assert list(resultado.columns) == ['Data Referência (Mês)', 'Ana', 'Bia', 'Outros']
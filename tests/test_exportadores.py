@@ -0,0 +1,35 @@
+from decimal import Decimal
+
+import pandas as pd
+
+from exportadores import criar_exportador
+
+
+def lotes_decimais():
+    return [
+        pd.DataFrame({"ID": [1, 2], "VALOR_PAGO": [Decimal("12.50"), Decimal("2.25")], "TAXA": [2.5, 1.0]}),
+        pd.DataFrame({"ID": [3], "VALOR_PAGO": [Decimal("123456.78")], "TAXA": [0.5]}),
+    ]
+
+
+def test_parquet_decimal_maior_em_lote_posterior(tmp_path):
+    exportador = criar_exportador("parquet", str(tmp_path / "saida.parquet"))
+    with exportador.abrir(["ID", "VALOR_PAGO", "TAXA"]):
+        for lote in lotes_decimais():
+            exportador.escrever(lote)
+
+    df = exportador.ler()
+    assert df["VALOR_PAGO"].tolist() == [12.5, 2.25, 123456.78]
+
+
+def test_csv_decimal_com_virgula(tmp_path):
+    exportador = criar_exportador("csv", str(tmp_path / "saida.csv"))
+    with exportador.abrir(["ID", "VALOR_PAGO", "TAXA"]):
+        exportador.escrever(lotes_decimais()[0])
+    exportador.acrescentar(lotes_decimais()[1])
+
+    with open(exportador.caminho, encoding="utf-8-sig") as arquivo:
+        linhas = arquivo.read().splitlines()
+    assert linhas[1] == "1;12,5;2,5"
+    assert linhas[3] == "3;123456,78;0,5"
+    assert exportador.ler()["VALOR_PAGO"].tolist() == [12.5, 2.25, 123456.78]
@@ -0,0 +1,77 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import main
+from benchmark import CursorSQLite, conectar_sqlite
+from exportadores import criar_exportador
+from incremental import consultar_maximo, exportar_incremental, ler_watermark, motivo_sem_incremental, salvar_watermark
+
+
+@pytest.fixture
+def con(banco_sqlite, tmp_path):
+    caminho = str(tmp_path / "banco.db")
+    shutil.copy(banco_sqlite, caminho)
+    con = conectar_sqlite(caminho)
+    yield con
+    con.close()
+
+
+def exportar_completo(cur, caminho, caminho_watermark):
+    cur.execute("SELECT * FROM CONTRATOS")
+    df = pd.DataFrame(cur.fetchall(), columns=[desc[0] for desc in cur.description]).dropna()
+    exportador = criar_exportador("csv", caminho)
+    with exportador.abrir(list(df.columns)):
+        exportador.escrever(df)
+    salvar_watermark(caminho_watermark, "CONTRATOS", "ID", consultar_maximo(cur, "CONTRATOS", "ID"), exportador.caminho)
+    return exportador
+
+
+def test_sem_linhas_novas_nao_regrava(con, tmp_path):
+    cur = CursorSQLite(con.cursor())
+    caminho_watermark = str(tmp_path / "watermark.json")
+    exportador = exportar_completo(cur, str(tmp_path / "contratos.csv"), caminho_watermark)
+    modificado = os.stat(exportador.caminho).st_mtime_ns
+
+    estado = ler_watermark(caminho_watermark)
+    assert exportar_incremental(cur, exportador, estado, "CONTRATOS", "ID") == (0, estado["valor"])
+    assert os.stat(exportador.caminho).st_mtime_ns == modificado
+
+
+def test_linhas_novas_acrescentadas(con, tmp_path):
+    cur = CursorSQLite(con.cursor())
+    caminho_watermark = str(tmp_path / "watermark.json")
+    exportador = exportar_completo(cur, str(tmp_path / "contratos.csv"), caminho_watermark)
+    estado = ler_watermark(caminho_watermark)
+    antes = exportador.ler()
+
+    con.execute("INSERT INTO CONTRATOS SELECT ID + 1000000, CLIENTE_ID, PRODUTO_ID, DATA_INICIO, DATA_FIM, STATUS FROM CONTRATOS WHERE ID <= 3")
+    linhas, valor = exportar_incremental(cur, exportador, estado, "CONTRATOS", "ID")
+
+    depois = exportador.ler()
+    assert linhas == 3
+    assert valor == 1000003
+    assert len(depois) == len(antes) + 3
+    assert depois["ID"].is_unique
+
+
+@pytest.mark.parametrize("formato, coluna", [("xlsx", "ID"), ("parquet", "ID"), ("csv", "DATA_INICIO")])
+def test_configuracao_sem_acrescimo_nao_e_incremental(formato, coluna, tmp_path):
+    exportador = criar_exportador(formato, str(tmp_path / "contratos"))
+    assert motivo_sem_incremental(exportador, coluna, "ID")
+
+
+def test_xlsx_avisa_e_faz_exportacao_completa(con, tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(main, "EXPORT_INCREMENTAL", True)
+    monkeypatch.setattr(main, "OUTPUT_FORMAT", "xlsx")
+    caminho = str(tmp_path / "contratos.xlsx")
+    caminho_watermark = str(tmp_path / "watermark.json")
+
+    for _ in range(2):
+        linhas, _, incremental = main.exportar_contratos(CursorSQLite(con.cursor()), caminho, caminho_watermark)
+        assert not incremental
+        assert linhas > 0
+    assert "exportação incremental desativada" in capsys.readouterr().out
+    assert not os.path.exists(caminho_watermark)
@@ -0,0 +1,21 @@
+import pickle
+
+from instrumentacao import Instrumentacao, gravar_prometheus
+
+
+def test_de_registros_reconstroi_a_medicao(tmp_path):
+    medidor = Instrumentacao("main", {"alvo": "filial1"})
+    with medidor.etapa("consultar", linhas=10) as etapa:
+        etapa.bytes = 2048
+    with medidor.etapa("consultar", linhas=5):
+        pass
+    medidor.finalizar(True)
+
+    # Os registros são o que volta do processo filho em exportar_alvos
+    copia = Instrumentacao.de_registros(pickle.loads(pickle.dumps(medidor.registros())))
+
+    assert copia.rotulos == {"alvo": "filial1"}
+    assert copia.etapas == medidor.etapas
+    gravar_prometheus(tmp_path / "original.prom", medidor)
+    gravar_prometheus(tmp_path / "copia.prom", copia)
+    assert (tmp_path / "copia.prom").read_text() == (tmp_path / "original.prom").read_text()
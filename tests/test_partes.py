@@ -0,0 +1,20 @@
+import os
+
+import main
+from partes import caminho_manifesto
+
+
+def test_manifesto_antigo_removido_com_uma_aba(cur, tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "OUTPUT_FORMAT", "xlsx")
+    monkeypatch.setattr(main, "EXPORT_INCREMENTAL", False)
+    caminho = str(tmp_path / "contratos.xlsx")
+
+    # Primeira execução com poucas linhas por aba: várias abas e um manifesto
+    monkeypatch.setattr(main, "LIMITE_LINHAS", 5)
+    main.exportar_contratos(cur, caminho)
+    assert os.path.exists(caminho_manifesto(caminho))
+
+    # Agora tudo cabe em uma aba: o manifesto anterior não vale mais
+    monkeypatch.setattr(main, "LIMITE_LINHAS", 1_000_000)
+    main.exportar_contratos(cur, caminho)
+    assert not os.path.exists(caminho_manifesto(caminho))
@@ -0,0 +1,85 @@
+import json
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from benchmark import CursorSQLite, conectar_sqlite
+from cache_dados import SnapshotDisco
+from resumos import ARQUIVO_INDICE, ArmazenamentoResumos, atualizar_resumos
+
+
+def test_atualizar_resumos_grava_e_le(cur, tmp_path):
+    armazenamento = ArmazenamentoResumos(str(tmp_path / "resumos"))
+    resultado = atualizar_resumos(cur, armazenamento)
+
+    assert resultado["modo"] == "completo"
+    assert armazenamento.ler()["ultimo_pagamento_id"] == resultado["ultimo_pagamento_id"]
+
+
+def test_falha_ao_gravar_resumos_chega_a_quem_chamou(cur, tmp_path):
+    # Um arquivo no lugar do diretório faz a gravação falhar
+    bloqueado = tmp_path / "resumos"
+    bloqueado.write_text("")
+
+    with pytest.raises(OSError):
+        atualizar_resumos(cur, ArmazenamentoResumos(str(bloqueado)))
+
+
+def test_snapshot_do_cache_continua_ignorando_a_falha(tmp_path, capsys):
+    bloqueado = tmp_path / "cache"
+    bloqueado.write_text("")
+
+    SnapshotDisco(str(bloqueado)).gravar("dados", {"total": 1})
+
+    assert "Não foi possível gravar o snapshot" in capsys.readouterr().out
+
+
+@pytest.fixture
+def con(banco_sqlite, tmp_path):
+    caminho = str(tmp_path / "banco.db")
+    shutil.copy(banco_sqlite, caminho)
+    con = conectar_sqlite(caminho)
+    yield con
+    con.close()
+
+
+def ler_indice(diretorio):
+    with open(os.path.join(diretorio, ARQUIVO_INDICE), encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+
+def test_incremental_regrava_so_os_meses_alterados(con, tmp_path):
+    cur = CursorSQLite(con.cursor())
+    diretorio = str(tmp_path / "resumos")
+    armazenamento = ArmazenamentoResumos(diretorio)
+    atualizar_resumos(cur, armazenamento)
+    antes = ler_indice(diretorio)
+
+    cur.execute("SELECT MAX(ID), MAX(DATA_PAGAMENTO) FROM PAGAMENTOS")
+    ultimo_id, ultima_data = cur.fetchone()
+    con.execute("INSERT INTO PAGAMENTOS VALUES (?, 1, 123.45, ?)", (ultimo_id + 1, ultima_data))
+    assert atualizar_resumos(cur, armazenamento)["modo"] == "incremental"
+    depois = ler_indice(diretorio)
+
+    mes_alterado = pd.Timestamp(ultima_data).strftime("%Y-%m")
+    regravados = {mes for mes, nome in depois["meses"].items() if antes["meses"].get(mes) != nome}
+    assert regravados == {mes_alterado}
+    # Quem leu o índice anterior ainda encontra todos os arquivos dele
+    assert all(os.path.exists(os.path.join(diretorio, nome)) for nome in antes["meses"].values())
+
+    completo = ArmazenamentoResumos(str(tmp_path / "completo"))
+    atualizar_resumos(cur, completo, completo=True)
+    pd.testing.assert_frame_equal(armazenamento.ler()["mensal_clientes"], completo.ler()["mensal_clientes"])
+
+
+def test_versoes_antigas_apagadas_duas_gravacoes_depois(cur, tmp_path):
+    diretorio = str(tmp_path / "resumos")
+    armazenamento = ArmazenamentoResumos(diretorio)
+    for _ in range(3):
+        atualizar_resumos(cur, armazenamento, completo=True)
+
+    indice = ler_indice(diretorio)
+    esperados = {indice["mensal"], indice["clientes"], *indice["meses"].values(), *indice["anteriores"], ARQUIVO_INDICE}
+    assert set(os.listdir(diretorio)) == esperados
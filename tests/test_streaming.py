@@ -0,0 +1,46 @@
+import threading
+
+import pytest
+
+import main
+from exportadores import criar_exportador
+
+
+class ExportadorComFalha:
+    """Falha no segundo lote, como um disco cheio no meio da gravação."""
+
+    def __init__(self, exportador):
+        self.exportador = exportador
+
+    def __getattr__(self, nome):
+        return getattr(self.exportador, nome)
+
+    def abrir(self, colunas, larguras=None):
+        self.exportador.abrir(colunas, larguras)
+        return self
+
+    def escrever(self, df):
+        if self.exportador.linhas_escritas:
+            raise OSError("disco cheio")
+        self.exportador.escrever(df)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *erro):
+        return self.exportador.__exit__(*erro)
+
+
+def test_leitor_para_quando_o_exportador_falha(cur, tmp_path):
+    cur.execute("SELECT * FROM contratos")
+    exportador = ExportadorComFalha(criar_exportador("csv", str(tmp_path / "contratos.csv")))
+
+    try:
+        main.exportar_streaming(cur, exportador, tamanho_lote=3)
+    except OSError:
+        # A traceback ainda mantém o gerador vivo: a thread só parou se ele foi fechado na saída
+        leitores = [thread for thread in threading.enumerate() if thread.name == "leitor-lotes"]
+    else:
+        pytest.fail("a falha do exportador deveria chegar a quem chamou")
+
+    assert leitores == []